@@ -0,0 +1 @@
+"""Benchmarks package for sterces library."""
@@ -0,0 +1,85 @@
+"""Benchmark group resolution over a deep hierarchy.
+
+Stores entries into a 10 level group hierarchy inside one transaction and
+compares _ensure_group with resolving every path prefix by XPath, which is
+what _ensure_group used to do. Run with::
+
+    python -m benchmarks.bench_groups [entries] [depth]
+"""
+
+import os
+import sys
+from contextlib import redirect_stdout
+from random import Random
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from sterces.db import StercesDatabase
+
+ENTRIES = 5000
+DEPTH = 10
+FANOUT = 3
+
+
+def group_paths(count: int, depth: int, seed: int = 42) -> list[list[str]]:
+    """Return count random group paths depth levels deep.
+
+    :param count: number of paths
+    :type count: int
+    :param depth: number of levels of each path
+    :type depth: int
+    :param seed: random seed
+    :type seed: int
+    :returns: list of group paths
+    :rtype: list[list[str]]
+    """
+    rnd = Random(seed)  # noqa: S311
+    return [
+        ["l{0}g{1}".format(level, rnd.randrange(FANOUT)) for level in range(depth)]
+        for _ in range(count)
+    ]
+
+
+def main(entries: int = ENTRIES, depth: int = DEPTH) -> None:
+    """Run the benchmark and print the timings.
+
+    :param entries: number of entries to store
+    :type entries: int
+    :param depth: depth of the group hierarchy
+    :type depth: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        ppf = os.path.join(td, ".ssapeek")
+        with open(ppf, "w") as fd:
+            fd.write("benchmark\n")
+        db = StercesDatabase(db_fn=os.path.join(td, "db.kdbx"), pwd_fn=ppf)
+        paths = group_paths(entries, depth)
+        start = perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            with db.transaction():
+                for idx, parts in enumerate(paths):
+                    db.store("/{0}/e{1}".format("/".join(parts), idx), None, None)
+        stored = perf_counter() - start
+        start = perf_counter()
+        for parts in paths:
+            db._ensure_group(parts)  # noqa: WPS437
+        ensured = perf_counter() - start
+        sample = paths[: max(1, entries // 50)]
+        start = perf_counter()
+        for parts in sample:
+            for end in range(1, len(parts) + 1):
+                db.kpo.find_groups(path=parts[:end])
+        xpath = (perf_counter() - start) * len(paths) / len(sample)
+        print("groups      {0}".format(len(db._index.groups)))  # noqa: WPS421
+        print("store+save  {0:.3f}s".format(stored))  # noqa: WPS421
+        print("ensure      {0:.3f}s".format(ensured))  # noqa: WPS421
+        print("xpath (est) {0:.3f}s".format(xpath))  # noqa: WPS421
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,114 @@
+"""Benchmark a streaming import against one store and save per row.
+
+The rows are generated on the fly, so the source itself holds no memory
+and the maximum resident set is the open vault plus the changes pending
+until the next checkpoint. The per row baseline is
+measured on a small sample and extrapolated, a save per row of a large
+import would run for hours. Run with::
+
+    python -m benchmarks.bench_import [rows] [sample]
+"""
+
+import json
+import os
+import resource
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from typing import Iterator
+
+from sterces.db import StercesDatabase
+from sterces.foos import str_to_date
+from sterces.importer import JSONL, Importer
+
+ROWS = 100000
+SAMPLE = 50
+PASSPHRASE = "benchmark-passphrase"
+
+
+class RowSource:
+    """Lines of generated JSON Lines rows.
+
+    :param rows: number of rows
+    :type rows: int
+    """
+
+    def __init__(self, rows: int) -> None:
+        """Construct a RowSource class."""
+        self._lines = self._generate(rows)
+
+    def __iter__(self) -> Iterator[str]:
+        """Return the generated lines.
+
+        :returns: iterator of lines
+        :rtype: Iterator[str]
+        """
+        return self._lines
+
+    def _generate(self, rows: int) -> Iterator[str]:
+        for idx in range(rows):
+            yield "{0}\n".format(
+                json.dumps(
+                    {
+                        "path": "/l{0}/g{1}/entry{2}".format(idx % 5, idx % 25, idx),
+                        "username": "user{0}".format(idx),
+                        "password": "pw{0:016x}".format(idx),
+                        "tags": "prod,web",
+                        "expiry": "2031-01-{0:02d}".format(idx % 28 + 1),
+                    }
+                )
+            )
+
+
+def main(rows: int = ROWS, sample: int = SAMPLE) -> None:
+    """Run the benchmark and print the timings.
+
+    :param rows: number of rows of the streaming import
+    :type rows: int
+    :param sample: number of rows stored one save at a time
+    :type sample: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        pwd_fn = os.path.join(td, ".ssapeek")
+        with open(pwd_fn, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        database = StercesDatabase(
+            db_fn=os.path.join(td, "legacy.kdbx"), pwd_fn=pwd_fn, quiet=True
+        )
+        start = perf_counter()
+        for line in RowSource(sample):
+            row = json.loads(line)
+            expiry = str_to_date(row.pop("expiry"))
+            database.store(row.pop("path"), expiry, row.pop("tags").split(","), **row)
+        per_row = (perf_counter() - start) / sample
+        database = StercesDatabase(
+            db_fn=os.path.join(td, "import.kdbx"), pwd_fn=pwd_fn, quiet=True
+        )
+        start = perf_counter()
+        stats = Importer(database).run(RowSource(rows), JSONL)
+        import_time = perf_counter() - start
+        if stats.added != rows:
+            raise ValueError("import incomplete")
+        print("rows        {0}".format(rows))  # noqa: WPS421
+        print(  # noqa: WPS421
+            "store each  {0:.1f}s (extrapolated)".format(per_row * rows)
+        )
+        print(  # noqa: WPS421
+            "import      {0:.1f}s, {1:.0f} rows/s".format(
+                import_time, rows / import_time
+            )
+        )
+        print(  # noqa: WPS421
+            "max rss     {0:.1f} MiB".format(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            )
+        )
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,56 @@
+"""Benchmark open and save of a vault before and after a KDF rekey.
+
+The vault is created with the pykeepass default key derivation, then
+rekeyed to parameters calibrated for the target unlock time. Run with::
+
+    python -m benchmarks.bench_kdf [target_ms] [memory_mib]
+"""
+
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from benchmarks.vaultgen import VaultSpec, generate_vault
+from sterces.db import StercesDatabase
+
+TARGET_MS = 200
+MEMORY_MIB = 64
+ENTRIES = 1000
+PASSPHRASE = "benchmark-passphrase"
+
+
+def main(target_ms: int = TARGET_MS, memory_mib: int = MEMORY_MIB) -> None:
+    """Run the benchmark and print the timings.
+
+    :param target_ms: unlock time to calibrate for in milliseconds
+    :type target_ms: int
+    :param memory_mib: most Argon2 memory in MiB
+    :type memory_mib: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        db_fn = os.path.join(td, "db.kdbx")
+        pwd_fn = os.path.join(td, ".ssapeek")
+        with open(pwd_fn, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        generate_vault(db_fn, PASSPHRASE, VaultSpec(entries=ENTRIES))
+        database = StercesDatabase(db_fn=db_fn, pwd_fn=pwd_fn, quiet=True)
+        report = database.rekey(target_ms / 1000, memory_mib * 2**20)
+        print("target      {0} ms".format(target_ms))  # noqa: WPS421
+        for label, params, timings in (
+            ("before", report.old_params, report.old_timings),
+            ("after", report.new_params, report.new_timings),
+        ):
+            print(  # noqa: WPS421
+                "{0:<11} open {1:6.3f}s  save {2:6.3f}s  {3}".format(
+                    label, timings.open, timings.save, params
+                )
+            )
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
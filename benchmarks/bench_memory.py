@@ -0,0 +1,124 @@
+"""Benchmark resident memory of an open database, full against read_only.
+
+Every mode opens the vault in a fresh interpreter, the resident set size
+is read after a garbage collection and, on glibc, a malloc_trim so freed
+XML nodes are not counted. Python allocations are traced as well. Run
+with::
+
+    python -m benchmarks.bench_memory [entries] [history]
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import json
+import os
+import subprocess  # noqa: S404
+import sys
+import tracemalloc
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from benchmarks.vaultgen import VaultSpec, generate_vault
+from sterces.db import StercesDatabase
+
+ENTRIES = 10000
+HISTORY = 3
+PASSPHRASE = "benchmark-passphrase"
+
+
+def resident_bytes() -> int:
+    """Return the resident set size of this process after a collection.
+
+    :returns: bytes, 0 when /proc is not available
+    :rtype: int
+    """
+    gc.collect()
+    libc_fn = ctypes.util.find_library("c")
+    if libc_fn:
+        trim = getattr(ctypes.CDLL(libc_fn), "malloc_trim", None)
+        if trim is not None:
+            trim(0)
+    try:
+        with open("/proc/self/statm") as fd:
+            pages = int(fd.read().split()[1])
+    except OSError:
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(db_fn: str, pwd_fn: str, read_only: bool) -> dict[str, int]:
+    """Open the database and return the memory it holds.
+
+    :param db_fn: path of the database
+    :type db_fn: str
+    :param pwd_fn: path of the passphrase file
+    :type pwd_fn: str
+    :param read_only: open in read only mode
+    :type read_only: bool
+    :returns: resident and traced bytes held by the open database
+    :rtype: dict[str, int]
+    """
+    before = resident_bytes()
+    tracemalloc.start()
+    database = StercesDatabase(
+        db_fn=db_fn, pwd_fn=pwd_fn, read_only=read_only, tf_cache=True
+    )
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resident = resident_bytes() - before
+    if database.lookup("/l0g0/missing", "password") is not None:
+        raise ValueError("unexpected entry")
+    return {"resident": resident, "traced": traced}
+
+
+def main(entries: int = ENTRIES, history: int = HISTORY) -> None:
+    """Run the benchmark and print the memory of both modes.
+
+    :param entries: number of entries of the vault
+    :type entries: int
+    :param history: history items per entry
+    :type history: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        db_fn = os.path.join(td, "db.kdbx")
+        pwd_fn = os.path.join(td, ".ssapeek")
+        with open(pwd_fn, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        generate_vault(db_fn, PASSPHRASE, VaultSpec(entries=entries, history=history))
+        StercesDatabase(db_fn=db_fn, pwd_fn=pwd_fn, tf_cache=True)  # caches key
+        results = {}
+        for mode in ("full", "read_only"):
+            child = subprocess.run(  # noqa: S603
+                [sys.executable, "-m", "benchmarks.bench_memory", "--child"]
+                + [mode, db_fn, pwd_fn],
+                capture_output=True,
+                check=True,
+                text=True,
+            )
+            results[mode] = json.loads(child.stdout)
+        print("entries     {0} x {1} history".format(entries, history))  # noqa: WPS421
+        for mode, held in results.items():
+            print(  # noqa: WPS421
+                "{0:<11} resident {1:7.1f} MiB  traced {2:7.1f} MiB".format(
+                    mode, held["resident"] / 2**20, held["traced"] / 2**20
+                )
+            )
+        print(  # noqa: WPS421
+            "reduction   resident {0:.1f}x".format(
+                results["full"]["resident"] / max(results["read_only"]["resident"], 1)
+            )
+        )
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        mode, db_fn, pwd_fn = sys.argv[2:5]
+        print(json.dumps(measure(db_fn, pwd_fn, mode == "read_only")))  # noqa: WPS421
+    else:
+        main(*(int(arg) for arg in sys.argv[1:3]))
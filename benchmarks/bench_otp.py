@@ -0,0 +1,73 @@
+"""Benchmark TOTP codes, parsing every lookup against otp_many.
+
+Polls the codes of many service accounts several times, the way a
+monitoring job does every time step. Run with::
+
+    python -m benchmarks.bench_otp [accounts] [rounds]
+"""
+
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+import pyotp
+
+from sterces.db import OTP, StercesDatabase
+
+ACCOUNTS = 50
+ROUNDS = 100
+PASSPHRASE = "benchmark-passphrase"
+
+
+def main(accounts: int = ACCOUNTS, rounds: int = ROUNDS) -> None:
+    """Run the benchmark and print the timings.
+
+    :param accounts: number of entries with an otpauth URI
+    :type accounts: int
+    :param rounds: number of polls of every entry
+    :type rounds: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        pwd_fn = os.path.join(td, ".ssapeek")
+        with open(pwd_fn, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        database = StercesDatabase(db_fn=os.path.join(td, "db.kdbx"), pwd_fn=pwd_fn)
+        paths = ["/svc/account{0}".format(idx) for idx in range(accounts)]
+        with database.transaction(), redirect_stdout(io.StringIO()):
+            for path in paths:
+                uri = pyotp.TOTP(pyotp.random_base32()).provisioning_uri(path)
+                database.store(path, None, None, otp=uri)
+        start = perf_counter()
+        for _ in range(rounds):
+            found = database.lookup_many(paths, [OTP])
+            legacy = {path: _legacy_now(str(found[path][OTP].value)) for path in paths}
+        legacy_time = perf_counter() - start
+        start = perf_counter()
+        for _ in range(rounds):  # noqa: WPS440
+            batch = database.otp_many(paths)
+        batch_time = perf_counter() - start
+        if legacy != {path: res.value for path, res in batch.items()}:
+            raise ValueError("codes disagree")
+        print("accounts    {0} x {1}".format(accounts, rounds))  # noqa: WPS421
+        print("parse each  {0:.3f}s".format(legacy_time))  # noqa: WPS421
+        print("otp_many    {0:.3f}s".format(batch_time))  # noqa: WPS421
+        print("speedup     {0:.1f}x".format(legacy_time / batch_time))  # noqa: WPS421
+    finally:
+        rmtree(td)
+
+
+def _legacy_now(uri: str) -> str:
+    otp = pyotp.parse_uri(uri)
+    if not isinstance(otp, pyotp.TOTP):
+        raise ValueError("Not a TOTP uri")
+    return otp.now()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,57 @@
+"""Benchmark opening several vaults sequentially and through DatabasePool.
+
+Run with::
+
+    python -m benchmarks.bench_pool [vaults] [entries]
+"""
+
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from benchmarks.vaultgen import VaultSpec, generate_vault
+from sterces.db import StercesDatabase
+from sterces.pool import DatabasePool
+
+VAULTS = 4
+ENTRIES = 1000
+PASSPHRASE = "benchmark-passphrase"
+
+
+def main(vaults: int = VAULTS, entries: int = ENTRIES) -> None:
+    """Run the benchmark and print the timings.
+
+    :param vaults: number of vaults
+    :type vaults: int
+    :param entries: number of entries of each vault
+    :type entries: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        ppf = os.path.join(td, ".ssapeek")
+        with open(ppf, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        configs = {}
+        for idx in range(vaults):
+            db_fn = os.path.join(td, "vault{0}.kdbx".format(idx))
+            generate_vault(db_fn, PASSPHRASE, VaultSpec(entries=entries, seed=idx))
+            configs["vault{0}".format(idx)] = {"db_fn": db_fn, "pwd_fn": ppf}
+        start = perf_counter()
+        for config in configs.values():
+            StercesDatabase(**config)
+        sequential = perf_counter() - start
+        start = perf_counter()
+        DatabasePool(configs).open()
+        pooled = perf_counter() - start
+        print("cpus        {0}".format(os.cpu_count()))  # noqa: WPS421
+        print("sequential  {0:.3f}s".format(sequential))  # noqa: WPS421
+        print("pool        {0:.3f}s".format(pooled))  # noqa: WPS421
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
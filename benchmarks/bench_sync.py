@@ -0,0 +1,77 @@
+"""Benchmark diff and sync of two large vaults.
+
+The other vault is a copy of the first one with a share of its entries
+changed and some added, the way a second device drifts. Run with::
+
+    python -m benchmarks.bench_sync [entries] [changed]
+"""
+
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from benchmarks.vaultgen import VaultSpec, entry_paths, generate_vault
+from sterces.db import StercesDatabase
+
+ENTRIES = 50000
+CHANGED = 500
+PASSPHRASE = "benchmark-passphrase"
+
+
+def main(entries: int = ENTRIES, changed: int = CHANGED) -> None:
+    """Run the benchmark and print the timings.
+
+    :param entries: number of entries of the vault
+    :type entries: int
+    :param changed: number of entries changed and added in the other vault
+    :type changed: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        pwd_fn = os.path.join(td, ".ssapeek")
+        with open(pwd_fn, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        ours_fn = os.path.join(td, "ours.kdbx")
+        theirs_fn = os.path.join(td, "theirs.kdbx")
+        spec = VaultSpec(entries=entries)
+        generate_vault(ours_fn, PASSPHRASE, spec)
+        shutil.copy(ours_fn, theirs_fn)
+        ours = StercesDatabase(db_fn=ours_fn, pwd_fn=pwd_fn, quiet=True)
+        theirs = StercesDatabase(db_fn=theirs_fn, pwd_fn=pwd_fn, quiet=True)
+        later = datetime.now(timezone.utc) + timedelta(hours=1)
+        with theirs.transaction():
+            for path in entry_paths(spec)[:changed]:
+                theirs.update(path, password="changed")
+                entry = theirs._find_entry(path)  # noqa: WPS437
+                if entry is None:
+                    raise ValueError("entry missing")
+                entry.mtime = later
+            for idx in range(changed):
+                theirs.store("/new/g{0}/entry{1}".format(idx % 10, idx), None, None)
+        start = perf_counter()
+        diff = ours.diff(theirs)
+        diff_time = perf_counter() - start
+        start = perf_counter()
+        synced = ours.sync(theirs)
+        sync_time = perf_counter() - start
+        if synced != diff or ours.diff(theirs).changed:
+            raise ValueError("sync incomplete")
+        print("entries     {0}".format(entries))  # noqa: WPS421
+        print(  # noqa: WPS421
+            "differences {0} added, {1} changed".format(
+                len(diff.added), len(diff.changed)
+            )
+        )
+        print("diff        {0:.3f}s".format(diff_time))  # noqa: WPS421
+        print("sync        {0:.3f}s (one save)".format(sync_time))  # noqa: WPS421
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
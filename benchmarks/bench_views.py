@@ -0,0 +1,100 @@
+"""Benchmark entry serialization, pykeepass properties against EntryView.
+
+The legacy path is the former StercesDatabase._entry_to_dict: one XPath
+query per property and a quadratic password mask. Run with::
+
+    python -m benchmarks.bench_views [entries]
+"""
+
+import io
+import json
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from pykeepass.entry import Entry  # type: ignore[import-untyped]
+
+from benchmarks.vaultgen import VaultSpec, generate_vault
+from sterces.index import entry_elements
+from sterces.view import EntryView, write_json
+
+ENTRIES = 10000
+PASSPHRASE = "benchmark-passphrase"
+
+
+# a deliberate copy of the old code, simplifying it would change the baseline
+def legacy_entry_to_dict(  # noqa: C901
+    entry: Entry, mask: bool = True
+) -> dict[str, str]:
+    """Return the entry dictionary the way sterces 0.1 built it.
+
+    :param entry: entry to serialize
+    :type entry: Entry
+    :param mask: mask the password when True
+    :type mask: bool
+    :returns: entry dictionary
+    :rtype: dict[str, str]
+    """
+    ed: dict[str, str] = {}
+    ed["path"] = entry.path
+    ed["title"] = entry.title
+    ed["username"] = entry.username
+    if mask:
+        masked = ""
+        cnt = len(entry.password)
+        while cnt > 0:
+            masked = masked + "*"  # noqa: WPS336
+            cnt -= 1
+        ed["password"] = masked
+    else:
+        ed["password"] = entry.password
+    if entry.tags:
+        ed["tags"] = ",".join(entry.tags)
+    if entry.url is not None:
+        ed["url"] = entry.url
+    if entry.notes is not None:
+        ed["notes"] = entry.notes
+    if entry.expires:
+        ed["expiry"] = entry.expiry_time.strftime("%Y-%m-%d %H:%M:%S")
+    return ed
+
+
+def main(entries: int = ENTRIES) -> None:
+    """Run the benchmark and print the timings.
+
+    :param entries: number of entries of the vault
+    :type entries: int
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        kpo = generate_vault(
+            os.path.join(td, "db.kdbx"), PASSPHRASE, VaultSpec(entries=entries)
+        )
+        root = kpo.root_group._element  # noqa: WPS437
+        start = perf_counter()
+        legacy = json.dumps(
+            [
+                legacy_entry_to_dict(Entry(element=element, kp=kpo))
+                for element in entry_elements(root)
+            ]
+        )
+        legacy_time = perf_counter() - start
+        out = io.StringIO()
+        start = perf_counter()
+        write_json(out, (EntryView(element, kpo) for element in entry_elements(root)))
+        view_time = perf_counter() - start
+        if json.loads(legacy) != json.loads(out.getvalue()):
+            raise ValueError("serializers disagree")
+        print("entries     {0}".format(entries))  # noqa: WPS421
+        print("legacy      {0:.3f}s".format(legacy_time))  # noqa: WPS421
+        print("entry view  {0:.3f}s".format(view_time))  # noqa: WPS421
+        print("speedup     {0:.1f}x".format(legacy_time / view_time))  # noqa: WPS421
+    finally:
+        rmtree(td)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
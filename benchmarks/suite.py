@@ -0,0 +1,223 @@
+"""Benchmark suite for the StercesDatabase API.
+
+Generates synthetic vaults of the requested sizes and times open (KDF and
+parse), lookup, dump, show, find, expiring, store, update and remove
+through StercesDatabase. Results are written as JSON so runs of different
+releases can be compared::
+
+    python -m benchmarks.suite --sizes 100,1000,10000 --output new.json
+    python -m benchmarks.suite --compare old.json new.json
+"""
+
+# mypy: disable-error-code="explicit-any"
+
+import argparse
+import json
+import os
+import platform
+import sys
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from random import Random
+from shutil import rmtree
+from statistics import mean
+from tempfile import mkdtemp
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+from benchmarks.vaultgen import VaultSpec, entry_paths, generate_vault
+from sterces.constants import VERSION
+from sterces.db import PASSWORD, StercesDatabase
+
+PASSPHRASE = "benchmark-passphrase"
+Metric = dict[str, float]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Metric:
+    """Run fn repeat times and return timing statistics in seconds.
+
+    :param fn: function to time
+    :type fn: Callable[[], Any]
+    :param repeat: number of runs
+    :type repeat: int
+    :returns: count, min, mean and max duration
+    :rtype: Metric
+    """
+    timings = []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = perf_counter()
+            fn()
+            timings.append(perf_counter() - start)
+    return {
+        "n": repeat,
+        "min": min(timings),
+        "mean": mean(timings),
+        "max": max(timings),
+    }
+
+
+def run_spec(spec: VaultSpec, repeat: int, lookups: int) -> dict[str, Metric]:
+    """Generate a vault for spec and time the API against it.
+
+    :param spec: vault shape
+    :type spec: VaultSpec
+    :param repeat: runs of the slow operations
+    :type repeat: int
+    :param lookups: number of lookups to time
+    :type lookups: int
+    :returns: metrics keyed by operation
+    :rtype: dict[str, Metric]
+    """
+    td = mkdtemp()
+    os.chmod(td, 0o700)
+    try:
+        db_fn = os.path.join(td, "db.kdbx")
+        pwd_fn = os.path.join(td, ".ssapeek")
+        with open(pwd_fn, "w") as fd:
+            fd.write("{0}\n".format(PASSPHRASE))
+        metrics = {
+            "generate": measure(lambda: generate_vault(db_fn, PASSPHRASE, spec), 1),
+        }
+        return _run_ops(metrics, db_fn, pwd_fn, spec, repeat, lookups)
+    finally:
+        rmtree(td)
+
+
+def compare(old_fn: str, new_fn: str) -> None:
+    """Print the mean duration ratio new/old of every shared metric.
+
+    :param old_fn: results of the baseline run
+    :type old_fn: str
+    :param new_fn: results of the new run
+    :type new_fn: str
+    """
+    with open(old_fn) as fd:
+        old = _by_spec(json.load(fd))
+    with open(new_fn) as fd:
+        new = _by_spec(json.load(fd))
+    for spec_key, metrics in new.items():
+        baseline = old.get(spec_key)
+        if baseline is None:
+            continue
+        header = "entries={0} depth={1} history={2}".format(*spec_key)
+        print(header)  # noqa: WPS421
+        for name, metric in metrics.items():
+            if name in baseline and baseline[name]["mean"]:
+                ratio = metric["mean"] / baseline[name]["mean"]
+                print(  # noqa: WPS421
+                    "  {0:<12} {1:>10.6f}s {2:>7.2f}x".format(
+                        name, metric["mean"], ratio
+                    )
+                )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the benchmark suite from the command line.
+
+    :param argv: command line arguments
+    :type argv: Optional[list[str]]
+    """
+    parser = argparse.ArgumentParser(description="sterces benchmark suite")
+    parser.add_argument("--sizes", default="100,1000,10000", help="entry counts")
+    parser.add_argument("--depth", type=int, default=VaultSpec.depth)
+    parser.add_argument("--tags", type=int, default=VaultSpec.tags)
+    parser.add_argument("--notes-size", type=int, default=VaultSpec.notes_size)
+    parser.add_argument("--history", type=int, default=VaultSpec.history)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of slow ops")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    runs = []
+    for size in args.sizes.split(","):
+        spec = VaultSpec(
+            entries=int(size),
+            depth=args.depth,
+            tags=args.tags,
+            notes_size=args.notes_size,
+            history=args.history,
+        )
+        metrics = run_spec(spec, args.repeat, args.lookups)
+        runs.append({"spec": asdict(spec), "metrics": metrics})
+        print(  # noqa: WPS421
+            "{0:>6} entries: {1}".format(
+                spec.entries,
+                " ".join(
+                    "{0}={1:.4f}s".format(name, metric["mean"])
+                    for name, metric in metrics.items()
+                ),
+            )
+        )
+    with open(args.output, "w") as fd:
+        json.dump(
+            {
+                "version": VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "runs": runs,
+            },
+            fd,
+            indent=2,
+        )
+
+
+def _by_spec(results: dict[str, Any]) -> dict[tuple[int, int, int], Any]:
+    return {
+        (run["spec"]["entries"], run["spec"]["depth"], run["spec"]["history"]): run[
+            "metrics"
+        ]
+        for run in results["runs"]
+    }
+
+
+def _run_ops(
+    metrics: dict[str, Metric],
+    db_fn: str,
+    pwd_fn: str,
+    spec: VaultSpec,
+    repeat: int,
+    lookups: int,
+) -> dict[str, Metric]:
+    def open_db() -> StercesDatabase:
+        return StercesDatabase(db_fn=db_fn, pwd_fn=pwd_fn)
+
+    metrics["open"] = measure(open_db, repeat)
+    db = open_db()
+    paths = entry_paths(spec)
+    rnd = Random(spec.seed)  # noqa: S311
+    sample = [rnd.choice(paths) for _ in range(lookups)]
+    sample_iter = iter(sample)
+    metrics["lookup"] = measure(
+        lambda: db.lookup(next(sample_iter), PASSWORD), len(sample)
+    )
+    metrics["dump"] = measure(lambda: db.dump(None), repeat)
+    with open(os.devnull, "w") as devnull:
+        metrics["dump_jsonl"] = measure(lambda: db.dump_jsonl(devnull), repeat)
+    metrics["show"] = measure(db.show, repeat)
+    metrics["find"] = measure(lambda: db.find(tags=["prod", "db"]), repeat)
+    metrics["expiring"] = measure(lambda: db.expiring(timedelta(days=7)), repeat)
+    new_paths = iter("/bench/new{0}".format(idx) for idx in range(repeat))
+    metrics["store"] = measure(
+        lambda: db.store(next(new_paths), None, ["bench"], password="x"), repeat
+    )
+    targets = iter(paths[:repeat])
+    metrics["update"] = measure(
+        lambda: db.update(next(targets), password="rotated"), repeat
+    )
+    victims = iter(paths[-repeat:])
+    metrics["remove"] = measure(lambda: db.remove(next(victims)), repeat)
+    return metrics
+
+
+if __name__ == "__main__":
+    main()
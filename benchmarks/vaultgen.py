@@ -0,0 +1,140 @@
+"""Synthetic KDBX vault generator for the benchmarks.
+
+Run standalone to write a vault::
+
+    python -m benchmarks.vaultgen db.kdbx passphrase-file --entries 10000
+"""
+
+import argparse
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from random import Random
+from typing import Optional
+
+from pykeepass.group import Group  # type: ignore[import-untyped]
+from pykeepass.pykeepass import (  # type: ignore[import-untyped]
+    PyKeePass,
+    create_database,
+)
+
+TAG_POOL = ("prod", "dev", "stage", "db", "web", "api", "ssh", "vpn", "ops", "dr")
+
+
+@dataclass(frozen=True)
+class VaultSpec:
+    """Shape of a synthetic vault.
+
+    :ivar entries: number of entries
+    :ivar depth: depth of the group hierarchy
+    :ivar fanout: subgroups per group
+    :ivar tags: tags per entry
+    :ivar notes_size: characters of notes per entry
+    :ivar history: history items per entry
+    :ivar seed: random seed
+    """
+
+    entries: int = 1000
+    depth: int = 3
+    fanout: int = 5
+    tags: int = 2
+    notes_size: int = 64
+    history: int = 0
+    seed: int = 42
+
+
+def entry_paths(spec: VaultSpec) -> list[str]:
+    """Return the entry paths generate_vault creates for spec.
+
+    :param spec: vault shape
+    :type spec: VaultSpec
+    :returns: list of entry paths
+    :rtype: list[str]
+    """
+    rnd = Random(spec.seed)  # noqa: S311
+    paths = []
+    for idx in range(spec.entries):
+        parts = [
+            "l{0}g{1}".format(level, rnd.randrange(spec.fanout))
+            for level in range(spec.depth)
+        ]
+        parts.append("entry{0}".format(idx))
+        paths.append("/" + "/".join(parts))
+    return paths
+
+
+def generate_vault(
+    db_fn: str, password: str, spec: VaultSpec, key_fn: Optional[str] = None
+) -> PyKeePass:
+    """Create a synthetic vault at db_fn and save it once.
+
+    :param db_fn: path of the database to create
+    :type db_fn: str
+    :param password: passphrase of the database
+    :type password: str
+    :param spec: vault shape
+    :type spec: VaultSpec
+    :param key_fn: path of a key file
+    :type key_fn: Optional[str]
+    :returns: the open database
+    :rtype: PyKeePass
+    """
+    kpo = create_database(db_fn, password, key_fn)
+    rnd = Random(spec.seed + 1)  # noqa: S311
+    groups: dict[tuple[str, ...], Group] = {(): kpo.root_group}
+    expiry = datetime.now(timezone.utc)
+    notes = "n" * spec.notes_size
+    for path in entry_paths(spec):
+        parts = path.strip("/").split("/")
+        title = parts.pop()
+        for end in range(1, len(parts) + 1):
+            key = tuple(parts[:end])
+            if key not in groups:
+                groups[key] = kpo.add_group(groups[key[:-1]], parts[end - 1])
+        entry = kpo.add_entry(
+            groups[tuple(parts)],
+            title,
+            "user{0}".format(rnd.randrange(spec.entries)),
+            "pw{0:016x}".format(rnd.getrandbits(64)),
+            url="https://host{0}.example.com/".format(rnd.randrange(100)),
+            notes=notes or None,
+            expiry_time=expiry + timedelta(days=rnd.randrange(1, 365)),
+            tags=rnd.sample(TAG_POOL, min(spec.tags, len(TAG_POOL))),
+            force_creation=True,
+        )
+        for _ in range(spec.history):
+            entry.save_history()
+            entry.password = "pw{0:016x}".format(rnd.getrandbits(64))
+    kpo.save()
+    return kpo
+
+
+def main() -> None:
+    """Write a synthetic vault from the command line."""
+    parser = argparse.ArgumentParser(description="generate a synthetic vault")
+    parser.add_argument("db_fn", help="database file to create")
+    parser.add_argument("pwd_fn", help="passphrase file")
+    parser.add_argument("--entries", type=int, default=VaultSpec.entries)
+    parser.add_argument("--depth", type=int, default=VaultSpec.depth)
+    parser.add_argument("--fanout", type=int, default=VaultSpec.fanout)
+    parser.add_argument("--tags", type=int, default=VaultSpec.tags)
+    parser.add_argument("--notes-size", type=int, default=VaultSpec.notes_size)
+    parser.add_argument("--history", type=int, default=VaultSpec.history)
+    args = parser.parse_args()
+    if os.path.exists(args.db_fn):
+        parser.error("{0} already exists".format(args.db_fn))
+    with open(args.pwd_fn) as fd:
+        password = fd.readline().strip()
+    spec = VaultSpec(
+        entries=args.entries,
+        depth=args.depth,
+        fanout=args.fanout,
+        tags=args.tags,
+        notes_size=args.notes_size,
+        history=args.history,
+    )
+    generate_vault(args.db_fn, password, spec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""Run a batch of JSON Lines operations: python -m sterces."""
+
+import sys
+
+from sterces.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Agent module for package sterces."""
+
+# mypy: disable-error-code="explicit-any"
+
+import argparse
+import os
+import socket
+import struct
+from datetime import datetime, timedelta, timezone
+from io import BufferedIOBase
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Optional, Union
+
+from loguru import logger
+
+from sterces.client import read_message, write_message
+from sterces.constants import (
+    AGENT_CONN_TIMEOUT,
+    AGENT_IDLE_TIMEOUT,
+    DEFAULT_AGENT_FN,
+    DEFAULT_DB_FN,
+    DEFAULT_PWD_FN,
+)
+from sterces.db import StercesDatabase
+from sterces.foos import str_to_date
+
+
+class StercesAgent:
+    """Serve an open StercesDatabase over a Unix domain socket.
+
+    The database is opened once, so clients skip the key derivation and the
+    XML parse. Only connections from the same user are served, one at a
+    time, a connection silent for conn_timeout seconds is dropped. The agent
+    exits after idle_timeout seconds without requests. The database is
+    opened with auto_reload, so writes of other processes are picked up.
+
+    :param `**kwargs`: StercesDatabase keyword arguments plus
+    :ivar sock_fn: path of the agent socket
+    :vartype sock_fn: str, default ~/.sterces/agent.sock
+    :ivar idle_timeout: seconds without requests before exiting
+    :vartype idle_timeout: float, default 900
+    :ivar conn_timeout: seconds a connection may stay silent
+    :vartype conn_timeout: float, default 10
+    """
+
+    sock_fn: str
+    idle_timeout: float
+    conn_timeout: float
+    _db: StercesDatabase
+    _db_fn: str
+    _lock: Lock
+    _server: Optional[socket.socket]
+    _stopping: bool
+
+    def __init__(self, **kwargs: Union[bool, int, float, str]) -> None:
+        """Construct a StercesAgent class."""
+        self.sock_fn = str(kwargs.pop("sock_fn", DEFAULT_AGENT_FN))
+        self.idle_timeout = float(kwargs.pop("idle_timeout", AGENT_IDLE_TIMEOUT))
+        self.conn_timeout = float(kwargs.pop("conn_timeout", AGENT_CONN_TIMEOUT))
+        kwargs.pop("agent", None)
+        kwargs["auto_reload"] = True
+        self._db_fn = str(kwargs.get("db_fn", DEFAULT_DB_FN))
+        self._server = None
+        # stop may come between the bind and the accept loop of serve
+        self._lock = Lock()
+        self._stopping = False
+        self._db = StercesDatabase(**kwargs)
+        self._ops: dict[str, Callable[..., Any]] = {
+            "ping": self._ping,
+            "expiring": self._expiring,
+            "find": self._find,
+            "lookup": self._lookup,
+            "lookup_many": self._lookup_many,
+            "otp_many": self._otp_many,
+            "remove": self._remove,
+            "store": self._store,
+            "update": self._update,
+        }
+
+    def serve(self) -> None:
+        """Serve requests until stopped or idle for idle_timeout seconds."""
+        with self._lock:
+            self._stopping = False
+        server = self._listen()
+        with self._lock:
+            self._server = server
+            stopping = self._stopping
+        last = monotonic()
+        try:
+            while not stopping and self._server is server:
+                remaining = last + self.idle_timeout - monotonic()
+                if remaining <= 0:
+                    logger.info("agent idle, exiting")
+                    break
+                conn = self._accept(server, remaining)
+                if conn is not None:
+                    with conn:
+                        self._handle(conn)
+                    last = monotonic()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop serving and remove the socket."""
+        with self._lock:
+            self._stopping = True
+            server = self._server
+            self._server = None
+        if server is not None:
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # noqa: WPS420
+            server.close()
+            Path(self.sock_fn).unlink(missing_ok=True)
+
+    def _accept(
+        self, server: socket.socket, remaining: float
+    ) -> Optional[socket.socket]:
+        try:
+            server.settimeout(remaining)
+            conn, _ = server.accept()
+        except socket.timeout:
+            return None
+        except OSError:
+            self.stop()  # stopped, or the socket failed
+            return None
+        return conn
+
+    def _handle(self, conn: socket.socket) -> None:
+        if not self._peer_allowed(conn):
+            logger.warning("agent rejected connection from another user")
+            return
+        conn.settimeout(self.conn_timeout)
+        try:
+            with conn.makefile("rwb") as fd:
+                self._converse(fd)
+        except OSError as ex:
+            logger.warning("agent dropped connection: {0}".format(ex))
+
+    def _converse(self, fd: BufferedIOBase) -> None:
+        while True:
+            try:
+                request = read_message(fd)
+            except ValueError as ex:
+                write_message(fd, {"ok": False, "error": str(ex)})
+                continue
+            if request is None:
+                return
+            write_message(fd, self._dispatch(request))
+
+    def _dispatch(self, request: dict[str, Any]) -> dict[str, Any]:
+        op = self._ops.get(str(request.pop("op", "")))
+        if op is None:
+            return {"ok": False, "error": "Invalid operation"}
+        try:
+            result = op(**request)
+        except Exception as ex:  # noqa: B902
+            return {"ok": False, "error": str(ex)}
+        return {"ok": True, "result": result}
+
+    def _listen(self) -> socket.socket:
+        sp = Path(self.sock_fn)
+        self._db._check_file(str(sp), True, missing_ok=True)  # noqa: WPS437
+        if sp.exists():
+            sp.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            server.bind(str(sp))
+        finally:
+            os.umask(umask)
+        server.listen()
+        logger.info("agent listening on {0}".format(sp))
+        return server
+
+    def _peer_allowed(self, conn: socket.socket) -> bool:
+        peercred = getattr(socket, "SO_PEERCRED", None)
+        if peercred is None:
+            return True  # rely on the socket file permissions
+        creds = conn.getsockopt(socket.SOL_SOCKET, peercred, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return bool(uid == os.getuid())
+
+    def _ping(self) -> str:
+        return str(Path(self._db_fn).resolve())
+
+    def _expiring(
+        self, within: float, include_expired: bool = False
+    ) -> list[dict[str, str]]:
+        return self._db.expiring(timedelta(seconds=within), include_expired)
+
+    def _find(self, **kwargs: Any) -> list[str]:
+        return self._db.find(**kwargs)
+
+    def _lookup(self, path: str, attr: str) -> Optional[str]:
+        result = self._db.lookup_many([(path, attr)])[path][attr]
+        if result.error:
+            raise ValueError(result.error)
+        return result.value
+
+    def _lookup_many(
+        self, paths: list[Any], attrs: Optional[list[str]] = None
+    ) -> dict[str, dict[str, Any]]:
+        items = [item if isinstance(item, str) else tuple(item) for item in paths]
+        results = self._db.lookup_many(items, attrs)
+        return {
+            path: {attr: list(found) for attr, found in attr_results.items()}
+            for path, attr_results in results.items()
+        }
+
+    def _otp_many(
+        self, paths: list[str], for_time: Optional[float] = None
+    ) -> dict[str, list[Optional[str]]]:
+        when = None
+        if for_time is not None:
+            when = datetime.fromtimestamp(for_time, timezone.utc)
+        results = self._db.otp_many(paths, when)
+        return {path: list(found) for path, found in results.items()}
+
+    def _remove(self, path: str) -> int:
+        return self._db.remove(path)
+
+    def _store(
+        self,
+        path: str,
+        expiry: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> int:
+        when = str_to_date(expiry) if expiry else None
+        return self._db.store(path, when, tags, **kwargs)
+
+    def _update(self, path: str, **kwargs: Any) -> int:
+        return self._db.update(path, **kwargs)
+
+
+def main() -> None:
+    """Run a sterces agent in the foreground."""
+    parser = argparse.ArgumentParser(description="sterces unlock agent")
+    parser.add_argument("--db", default=DEFAULT_DB_FN, help="database file")
+    parser.add_argument("--pwd", default=DEFAULT_PWD_FN, help="passphrase file")
+    parser.add_argument("--key", default="", help="key file")
+    parser.add_argument("--socket", default=DEFAULT_AGENT_FN, help="socket path")
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=AGENT_IDLE_TIMEOUT,
+        help="seconds without requests before exiting",
+    )
+    args = parser.parse_args()
+    StercesAgent(
+        db_fn=args.db,
+        pwd_fn=args.pwd,
+        key_fn=args.key,
+        sock_fn=args.socket,
+        idle_timeout=args.idle_timeout,
+    ).serve()
+
+
+if __name__ == "__main__":
+    main()
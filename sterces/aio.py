@@ -0,0 +1,202 @@
+"""Aio module for package sterces."""
+
+# mypy: disable-error-code="explicit-any"
+
+import asyncio
+from concurrent.futures import Executor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Iterable, Optional, TextIO, Tuple, TypeVar, Union
+
+from sterces.db import LookupResult, StercesDatabase
+
+ResultT = TypeVar("ResultT")
+
+
+class AsyncStercesDatabase:
+    """Asyncio facade of a StercesDatabase.
+
+    Opening and saving derive the master key and compress and write the
+    whole database, so everything touching the database runs on an
+    executor. Writers are serialized by an asyncio lock held until their
+    save has finished. Lookups never wait for that lock, nor for a save:
+    the database only holds its tree lock while a mutation or a merge of
+    another writer's changes is applied in memory, not while the file is
+    written.
+
+    :param database: open database
+    :type database: StercesDatabase
+    :param executor: executor for the blocking work, defaults to the loop's
+    :type executor: Optional[Executor]
+    """
+
+    database: StercesDatabase
+    _executor: Optional[Executor]
+    _lock: asyncio.Lock
+
+    def __init__(
+        self, database: StercesDatabase, executor: Optional[Executor] = None
+    ) -> None:
+        """Construct an AsyncStercesDatabase class."""
+        self.database = database
+        self._executor = executor
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def open(
+        cls,
+        executor: Optional[Executor] = None,
+        **kwargs: Union[bool, int, float, str, bytes],
+    ) -> "AsyncStercesDatabase":
+        """Open a database on the executor.
+
+        :param executor: executor for the blocking work, defaults to the loop's
+        :type executor: Optional[Executor]
+        :param `**kwargs`: keyword arguments of StercesDatabase
+        :raises ValueError: When the agent client mode is requested
+        :returns: the asyncio facade of the opened database
+        :rtype: AsyncStercesDatabase
+        """
+        if kwargs.get("agent"):
+            raise ValueError("agent client mode is not supported by asyncio")
+        loop = asyncio.get_running_loop()
+        database = await loop.run_in_executor(
+            executor, partial(StercesDatabase, **kwargs)
+        )
+        return cls(database, executor)
+
+    async def close(self) -> None:
+        """Save pending changes on the executor and close the database."""
+        async with self._lock:
+            await self._run(self.database.close)
+
+    async def dump_jsonl(
+        self,
+        fd: TextIO,
+        prefix: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+        mask: bool = True,
+    ) -> int:
+        """Stream entries to a file object as JSON Lines on the executor.
+
+        Writers wait until the dump is complete.
+
+        :param fd: text file object to write to
+        :type fd: TextIO
+        :param prefix: only dump entries below this group path
+        :type prefix: Optional[str]
+        :param fields: only include these fields, defaults to all
+        :type fields: Optional[Iterable[str]]
+        :param mask: mask password fields when True
+        :type mask: bool
+        :returns: return code
+        :rtype: int
+        """
+        async with self._lock:
+            return await self._run(
+                partial(self.database.dump_jsonl, fd, prefix, fields, mask)
+            )
+
+    async def flush(self) -> None:
+        """Save pending changes on the executor."""
+        async with self._lock:
+            await self._run(self.database.flush)
+
+    async def group(self, path: Optional[str], action: str) -> int:
+        """Manage groups, see StercesDatabase.group.
+
+        :param path: path of the group
+        :type path: Optional[str]
+        :param action: action to perform (ADD, REMOVE)
+        :type action: str
+        :returns: return code
+        :rtype: int
+        """
+        return await self._mutate(self.database.group, path, action)
+
+    async def lookup(self, path: str, attr: str) -> Optional[str]:
+        """Return the value of the attribute, see StercesDatabase.lookup.
+
+        :param path: path of the entry
+        :type path: str
+        :param attr: attribute to lookup
+        :type attr: str
+        :returns: value of found attribute or None
+        :rtype: Optional[str]
+        """
+        return await self._run(partial(self.database.lookup, path, attr))
+
+    async def lookup_many(
+        self,
+        paths: Iterable[Union[str, Tuple[str, str]]],
+        attrs: Optional[Iterable[str]] = None,
+    ) -> dict[str, dict[str, LookupResult]]:
+        """Return the values of many attributes of many entries.
+
+        :param paths: entry paths or (path, attribute) pairs
+        :type paths: Iterable[Union[str, Tuple[str, str]]]
+        :param attrs: attributes to lookup for every plain path
+        :type attrs: Optional[Iterable[str]]
+        :returns: results keyed by path then attribute
+        :rtype: dict[str, dict[str, LookupResult]]
+        """
+        return await self._run(partial(self.database.lookup_many, list(paths), attrs))
+
+    async def remove(self, path: str) -> int:
+        """Remove an entry, see StercesDatabase.remove.
+
+        :param path: path of the entry to remove
+        :type path: str
+        :returns: return code
+        :rtype: int
+        """
+        return await self._mutate(self.database.remove, path)
+
+    async def store(
+        self,
+        path: str,
+        expiry: Optional[datetime],
+        tags: Optional[list[str]],
+        **kwargs: Any,
+    ) -> int:
+        """Add a new entry, see StercesDatabase.store.
+
+        :param path: path of the entry to add
+        :type path: str
+        :param expiry: datetime of expiration
+        :type expiry: Optional[datetime]
+        :param tags: list of tag strings
+        :type tags: Optional[list[str]]
+        :param `**kwargs`: attributes of the entry
+        :returns: return code
+        :rtype: int
+        """
+        return await self._mutate(self.database.store, path, expiry, tags, **kwargs)
+
+    async def update(self, path: str, **kwargs: Any) -> int:
+        """Update an entry, see StercesDatabase.update.
+
+        :param path: path of the entry to update
+        :type path: str
+        :param `**kwargs`: attributes to change
+        :returns: return code
+        :rtype: int
+        """
+        return await self._mutate(self.database.update, path, **kwargs)
+
+    async def _mutate(
+        self, fn: Callable[..., ResultT], *args: Any, **kwargs: Any
+    ) -> ResultT:
+        async with self._lock:
+            return await self._run(partial(self._apply, fn, *args, **kwargs))
+
+    def _apply(self, fn: Callable[..., ResultT], *args: Any, **kwargs: Any) -> ResultT:
+        # on the executor, the database locks are threading locks
+        with self.database.defer_save():
+            rc = fn(*args, **kwargs)
+        self.database.flush()
+        return rc
+
+    async def _run(self, fn: Callable[[], ResultT]) -> ResultT:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn)
@@ -0,0 +1,215 @@
+"""Batch module for package sterces."""
+
+# mypy: disable-error-code="explicit-any"
+
+import argparse
+import json
+import sys
+from typing import Any, Callable, Iterator, Optional, TextIO, Union
+
+from loguru import logger
+
+from sterces.constants import DEFAULT_DB_FN, DEFAULT_PWD_FN
+from sterces.db import ENTRY_NOT_EXIST, StercesDatabase
+from sterces.foos import str_to_date
+
+
+class BatchRunner:
+    """Run a stream of JSON Lines operations against one open database.
+
+    Every line is a JSON object with an ``op`` of lookup, store, update,
+    remove or group and the keyword arguments of that method. An optional
+    ``id`` is echoed back. One reply per line is written as soon as the
+    operation finished: ``{"ok": true, "result": ...}`` or ``{"ok": false,
+    "error": ...}``. Changes are kept in memory and saved every checkpoint
+    operations and at the end, so a whole batch costs a single open.
+
+    :param database: open database, quiet so replies are the only output
+    :type database: StercesDatabase
+    :param checkpoint: save after this many operations, 0 saves at the end
+    :type checkpoint: int
+    """
+
+    database: StercesDatabase
+    checkpoint: int
+    failed: int
+    _ops: dict[str, Callable[..., Any]]
+
+    def __init__(self, database: StercesDatabase, checkpoint: int = 0) -> None:
+        """Construct a BatchRunner class."""
+        self.database = database
+        self.checkpoint = checkpoint
+        self.failed = 0
+        self._ops = {
+            "group": self._group,
+            "lookup": self._lookup,
+            "remove": self._remove,
+            "store": self._store,
+            "update": self._update,
+        }
+
+    def run(self, source: TextIO, sink: TextIO) -> int:
+        """Run every operation of source and write the replies to sink.
+
+        :param source: JSON Lines operations
+        :type source: TextIO
+        :param sink: text file object receiving one reply per operation
+        :type sink: TextIO
+        :returns: number of operations run
+        :rtype: int
+        """
+        lines = (line for line in source if line.strip())
+        total = 0
+        while True:
+            with self.database.defer_save():
+                count = self._run_chunk(lines, sink)
+            self.database.flush()
+            total += count
+            if not self.checkpoint or count < self.checkpoint:
+                return total
+            logger.debug("checkpoint after {0} operations".format(total))
+
+    def _dispatch(self, line: str) -> dict[str, Any]:
+        try:
+            request = _request(line)
+        except ValueError as ex:
+            return {"ok": False, "error": str(ex)}
+        ident = request.pop("id", None)
+        reply: dict[str, Any] = {} if ident is None else {"id": ident}
+        reply.update(self._invoke(request))
+        return reply
+
+    def _group(self, path: str, action: str) -> dict[str, Any]:
+        return _status(self.database.group(path, action), "")
+
+    def _invoke(self, request: dict[str, Any]) -> dict[str, Any]:
+        op = self._ops.get(str(request.pop("op", "")))
+        if op is None:
+            return {"ok": False, "error": "Invalid operation"}
+        try:
+            reply: dict[str, Any] = op(**request)
+        except Exception as ex:  # noqa: B902
+            return {"ok": False, "error": str(ex)}
+        return reply
+
+    def _lookup(
+        self, path: str, attr: Optional[str] = None, attrs: Optional[list[str]] = None
+    ) -> dict[str, Any]:
+        if attr is not None:
+            found = self.database.lookup_many([(path, attr)])[path][attr]
+            if found.error:
+                return {"ok": False, "error": found.error}
+            return {"ok": True, "result": found.value}
+        results = self.database.lookup_many([path], attrs)[path]
+        errors = [found.error for found in results.values() if found.error]
+        if errors:
+            return {"ok": False, "error": errors[0]}
+        return {
+            "ok": True,
+            "result": {name: found.value for name, found in results.items()},
+        }
+
+    def _remove(self, path: str) -> dict[str, Any]:
+        return _status(self.database.remove(path), ENTRY_NOT_EXIST.format(path))
+
+    def _run_chunk(self, lines: Iterator[str], sink: TextIO) -> int:
+        count = 0
+        for line in lines:
+            reply = self._dispatch(line)
+            if not reply["ok"]:
+                self.failed += 1
+            sink.write(json.dumps(reply))
+            sink.write("\n")
+            sink.flush()
+            count += 1
+            if count == self.checkpoint:
+                break
+        return count
+
+    def _store(
+        self,
+        path: str,
+        expiry: Optional[str] = None,
+        tags: Optional[Union[str, list[str]]] = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        when = None
+        if expiry:
+            when = str_to_date(expiry)
+            if when is None:
+                raise ValueError("Invalid date time string: {0}".format(expiry))
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        return _status(
+            self.database.store(path, when, tags, **kwargs),
+            "Entry {0} already exists".format(path),
+        )
+
+    def _update(self, path: str, **kwargs: Any) -> dict[str, Any]:
+        return _status(
+            self.database.update(path, **kwargs), ENTRY_NOT_EXIST.format(path)
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run a batch of JSON Lines operations through a single open.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: Optional[list[str]]
+    :returns: 0 when every operation succeeded, 1 otherwise
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(
+        prog="sterces", description="sterces batch operations"
+    )
+    parser.add_argument(
+        "ops",
+        nargs="?",
+        default="-",
+        help="JSON Lines operations file, - for stdin",
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_FN, help="database file")
+    parser.add_argument("--pwd", default=DEFAULT_PWD_FN, help="passphrase file")
+    parser.add_argument("--key", default="", help="key file")
+    parser.add_argument(
+        "--checkpoint",
+        type=int,
+        default=0,
+        help="save after this many operations, 0 saves once at the end",
+    )
+    parser.add_argument(
+        "--tf-cache", action="store_true", help="cache the transformed key"
+    )
+    args = parser.parse_args(argv)
+    database = StercesDatabase(
+        db_fn=args.db,
+        pwd_fn=args.pwd,
+        key_fn=args.key,
+        tf_cache=args.tf_cache,
+        quiet=True,
+    )
+    runner = BatchRunner(database, args.checkpoint)
+    with database:
+        if args.ops == "-":
+            runner.run(sys.stdin, sys.stdout)
+        else:
+            with open(args.ops) as source:
+                runner.run(source, sys.stdout)
+    return 1 if runner.failed else 0
+
+
+def _request(line: str) -> dict[str, Any]:
+    try:
+        request = json.loads(line)
+    except ValueError as ex:
+        raise ValueError("Invalid JSON: {0}".format(ex)) from ex
+    if not isinstance(request, dict):
+        raise ValueError("Invalid operation")
+    return request
+
+
+def _status(rc: int, error: str) -> dict[str, Any]:
+    # the database methods log their error and return 1
+    if rc:
+        return {"ok": False, "error": error}
+    return {"ok": True, "result": rc}
@@ -0,0 +1,132 @@
+"""Client module for package sterces."""
+
+# mypy: disable-error-code="explicit-any"
+
+import json
+import os
+import socket
+import stat
+from io import BufferedIOBase
+from pathlib import Path
+from typing import Any, Optional
+
+from loguru import logger
+
+ENCODING = "utf-8"
+
+
+def read_message(fd: BufferedIOBase) -> Optional[dict[str, Any]]:
+    """Read one newline terminated JSON message.
+
+    :param fd: binary stream to read from
+    :type fd: BufferedIOBase
+    :raises ValueError: When the line is not a JSON object
+    :returns: decoded message or None at end of stream
+    :rtype: Optional[dict[str, Any]]
+    """
+    line = fd.readline()
+    if not line:
+        return None
+    message = json.loads(line.decode(ENCODING))
+    if not isinstance(message, dict):
+        raise ValueError("Invalid message, not a JSON object")
+    return message
+
+
+def write_message(fd: BufferedIOBase, message: dict[str, Any]) -> None:
+    """Write one newline terminated JSON message.
+
+    :param fd: binary stream to write to
+    :type fd: BufferedIOBase
+    :param message: message to send
+    :type message: dict[str, Any]
+    """
+    fd.write(json.dumps(message).encode(ENCODING) + b"\n")
+    fd.flush()
+
+
+def socket_is_safe(sock_fn: str) -> bool:
+    """Return True when the agent socket is owned by us and not shared.
+
+    :param sock_fn: path of the agent socket
+    :type sock_fn: str
+    :returns: True when socket and its directory are private to this user
+    :rtype: bool
+    """
+    sp = Path(sock_fn)
+    try:
+        sock_st = sp.stat()
+        dir_st = sp.parent.stat()
+    except OSError:
+        return False
+    uid = os.getuid()
+    if not stat.S_ISSOCK(sock_st.st_mode):
+        return False
+    if sock_st.st_uid != uid or dir_st.st_uid != uid:
+        return False
+    return not dir_st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+
+
+class AgentClient:
+    """Client of a running sterces agent.
+
+    :param sock_fn: path of the agent socket
+    :type sock_fn: str
+    :param timeout: socket timeout in seconds
+    :type timeout: float
+    """
+
+    sock_fn: str
+    timeout: float
+
+    def __init__(self, sock_fn: str, timeout: float = 30) -> None:
+        """Construct an AgentClient class."""
+        self.sock_fn = sock_fn
+        self.timeout = timeout
+
+    @classmethod
+    def connect(cls, sock_fn: str, db_fn: str) -> Optional["AgentClient"]:
+        """Return a client when an agent serving db_fn answers on sock_fn.
+
+        :param sock_fn: path of the agent socket
+        :type sock_fn: str
+        :param db_fn: path of the database the agent must be serving
+        :type db_fn: str
+        :returns: client or None when no usable agent is running
+        :rtype: Optional[AgentClient]
+        """
+        if not socket_is_safe(sock_fn):
+            return None
+        client = cls(sock_fn)
+        try:
+            served = client.call("ping")
+        except (OSError, ValueError) as ex:
+            logger.debug("agent not available: {0}".format(ex))
+            return None
+        if served != str(Path(db_fn).resolve()):
+            logger.debug("agent serves another database: {0}".format(served))
+            return None
+        return client
+
+    def call(self, op: str, **params: Any) -> Any:
+        """Send a request to the agent and return its result.
+
+        :param op: operation name
+        :type op: str
+        :param `**params`: parameters of the operation
+        :raises ValueError: When the agent reports an error
+        :returns: result of the operation
+        :rtype: Any
+        """
+        params["op"] = op
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.sock_fn)
+            with sock.makefile("rwb") as fd:
+                write_message(fd, params)
+                response = read_message(fd)
+        if response is None:
+            raise ValueError("agent closed the connection")
+        if not response.get("ok"):
+            raise ValueError(response.get("error"))
+        return response.get("result")
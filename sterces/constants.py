@@ -12,3 +12,6 @@ SHOW = "show"
 STERCES_DN = Path().home() / ".sterces"
 DEFAULT_DB_FN = str(STERCES_DN / "db.kdbx")
 DEFAULT_PWD_FN = str(STERCES_DN / ".ssapeek")
+DEFAULT_AGENT_FN = str(STERCES_DN / "agent.sock")
+AGENT_IDLE_TIMEOUT = 900
+AGENT_CONN_TIMEOUT = 10
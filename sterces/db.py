@@ -6,29 +6,90 @@ import errno
 import json
 import os
 import re
-from datetime import datetime
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from stat import filemode
-from typing import Any, Optional, Tuple, Union
+from types import TracebackType
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 from loguru import logger
+from lxml.etree import _Element  # type: ignore[import-untyped]  # noqa: WPS450
 from pykeepass.entry import Entry  # type: ignore[import-untyped]
+from pykeepass.exceptions import CredentialsError  # type: ignore[import-untyped]
 from pykeepass.group import Group  # type: ignore[import-untyped]
 from pykeepass.pykeepass import (  # type: ignore[import-untyped]
     PyKeePass,
     create_database,
 )
 
+from sterces.client import AgentClient
 from sterces.constants import (
     ADD,
+    DEFAULT_AGENT_FN,
     DEFAULT_DB_FN,
     DEFAULT_PWD_FN,
     REMOVE,
     VERSION,
 )
-from sterces.foos import add_arg_if, str_to_date
+from sterces.foos import FileStamp, file_lock, file_stamp, str_to_date
+from sterces.index import (
+    AttributeIndex,
+    PathIndex,
+    PathKey,
+    element_path,
+    entry_elements,
+)
+from sterces.instrument import Instrument, SpanStats
+from sterces.kdf import (
+    DEFAULT_MEMORY,
+    DEFAULT_PARALLELISM,
+    DEFAULT_TARGET,
+    KdfParams,
+    KdfTimings,
+    RekeyReport,
+    calibrate,
+)
+from sterces.kdf import create_database as create_calibrated
+from sterces.kdf import read_params, time_open, time_save, write_params
+from sterces.keycache import KeyCache
+from sterces.otp import OtpCache
+from sterces.sync import (
+    NEWER,
+    OURS,
+    STRATEGIES,
+    DiffResult,
+    EntryPrint,
+    compare,
+    entry_copy,
+    fingerprints,
+    is_newer,
+    key_path,
+)
+from sterces.view import EntryView, ViewIndex, write_json, write_reprs
 
 ENTRY_NOT_EXIST = "Entry {0} does not exist"
+ENTRY_NO_OTP = "Entry {0} has no otp"
+READ_ONLY = "{0} is not available on a read only database"
+AGENT_UNSUPPORTED = "{0} is not supported through the agent"
+CLOSED = "{0} is not available on a closed database"
+GROUP_NOT_FOUND = "Group not found: {0}"
+MERGE_CONFLICT = "Changes conflict with another writer and were dropped: {0}"
+FILE_MODE = r"-rw-------$"
+INVALID_ATTRIBUTE = "Invalid attribute '{0}' not one of ({1})."
 # attributes
 USERNAME = "username"
 PASSWORD = "password"
@@ -38,6 +99,23 @@ EXPIRY = "expiry"
 TAGS = "tags"
 OTP = "otp"
 ATTRIBUTES = frozenset((USERNAME, PASSWORD, URL, NOTES, EXPIRY, TAGS, OTP))
+# keyword arguments update accepts
+UPDATE_FIELDS = (ATTRIBUTES - {EXPIRY}) | {"title", "expires"}
+# method name, positional and keyword arguments of a mutation
+JournalItem = Tuple[str, Tuple[Any, ...], dict[str, Any]]
+
+
+class LookupResult(NamedTuple):
+    """Result of one path/attribute pair of StercesDatabase.lookup_many.
+
+    :ivar value: value of the attribute, None when unset or on error
+    :vartype value: Optional[str]
+    :ivar error: error message when the attribute could not be looked up
+    :vartype error: Optional[str]
+    """
+
+    value: Optional[str]
+    error: Optional[str] = None
 
 
 class StercesDatabase:
@@ -54,10 +132,34 @@ class StercesDatabase:
     :vartype pwd_fn: str, default ~/.sterces/.ssapeek
     :ivar key_fn: path of key_fn
     :vartype key_fn: str, optional
-    :ivar tf_key: transformation_key
-    :vartype tf_key: str, optional
+    :ivar tf_key: transformation_key, bytes or hex string
+    :vartype tf_key: Union[bytes, str], optional
+    :ivar tf_cache: cache the transformation key (True or cache file path)
+    :vartype tf_cache: Union[bool, str], default False
     :ivar warn: warn if permission are inadequate
     :vartype warn: bool, default True
+    :ivar check_index: verify path index results against XPath queries
+    :vartype check_index: bool, default False
+    :ivar agent: use a running agent (True or socket path) when available
+    :vartype agent: Union[bool, str], default False
+    :ivar instrument: record timing spans of the hot paths, see stats
+    :vartype instrument: bool, default False
+    :ivar autosave_delay: save once no change happened for this many seconds
+    :vartype autosave_delay: float, default 0 (save after every change)
+    :ivar autosave_changes: save as soon as this many changes are pending
+    :vartype autosave_changes: int, default 0 (no limit)
+    :ivar auto_reload: reload before each operation when the file changed
+    :vartype auto_reload: bool, default False
+    :ivar quiet: don't print stored and updated entries
+    :vartype quiet: bool, default False
+    :ivar read_only: keep compact entry records and release the XML tree,
+        mutating methods, find and expiring raise ValueError
+    :vartype read_only: bool, default False
+    :ivar kdf_target: calibrate the key derivation of a new database to
+        unlock in this many seconds on this machine
+    :vartype kdf_target: float, default 0 (pykeepass defaults)
+    :ivar kdf_memory: most Argon2 memory of the calibration in bytes
+    :vartype kdf_memory: int, default 64 MiB
     """
 
     debug: int
@@ -65,21 +167,113 @@ class StercesDatabase:
     _kpobj: Optional[PyKeePass]
     _check_status: dict[str, int]
     _dirty: int
+    _index: PathIndex
+    _attrs: AttributeIndex
+    _otp: OtpCache
+    _txn_depth: int
+    _deferred: int
+    _agent: Optional[AgentClient]
+    _key_cache: Optional[KeyCache]
+    _tf_key: Optional[bytes]
+    _instrument: Instrument
+    _autosave_delay: float
+    _autosave_changes: int
+    _lock: threading.RLock
+    _tree_lock: threading.RLock
+    _writing_depth: int
+    _timer: Optional[threading.Timer]
+    _auto_reload: bool
+    _stamp: Optional[FileStamp]
+    _journal: list[JournalItem]
+    _replaying: bool
+    _quiet: bool
+    _records: Optional[ViewIndex]
+    _kdf_target: float
+    _kdf_memory: int
 
-    def __init__(self, **kwargs: Union[bool, int, str]) -> None:
+    def __init__(self, **kwargs: Union[bool, int, float, str, bytes]) -> None:
         """Construct a StercesDatabase class."""
         self._dirty = False
+        self._txn_depth = 0
+        self._deferred = 0
+        self._autosave_delay = float(kwargs.get("autosave_delay", 0))
+        self._autosave_changes = int(kwargs.get("autosave_changes", 0))
+        # _lock serializes writers and saves, _tree_lock is held while the
+        # tree and its indexes change, readers only wait for the latter
+        self._lock = threading.RLock()
+        self._tree_lock = threading.RLock()
+        self._writing_depth = 0
+        self._timer = None
+        self._auto_reload = bool(kwargs.get("auto_reload", False))
+        self._stamp = None
+        self._journal = []
+        self._replaying = False
+        self._quiet = bool(kwargs.get("quiet", False))
+        self._records = None
+        self._kdf_target = float(kwargs.get("kdf_target", 0))
+        self._kdf_memory = int(kwargs.get("kdf_memory", DEFAULT_MEMORY))
         self.debug = int(kwargs.get("debug", 0))
         self.verbose = int(kwargs.get("verbose", 0))
         self._check_status = {}
+        self._instrument = Instrument(bool(kwargs.get("instrument", False)))
+        self._check_index = bool(kwargs.get("check_index", False))
+        self._index = PathIndex()
+        self._attrs = AttributeIndex()
+        self._otp = OtpCache()
+        agent = kwargs.get("agent", False)
+        self._agent = self._connect_agent(
+            agent if isinstance(agent, str) else bool(agent),
+            str(kwargs.get("db_fn", DEFAULT_DB_FN)),
+        )
+        if self._agent is not None:
+            self._kpobj = None
+            return
+        db_fn = str(kwargs.get("db_fn", DEFAULT_DB_FN))
+        read_only = bool(kwargs.get("read_only", False))
+        if read_only and not os.path.exists(db_fn):
+            raise ValueError("Database {0} does not exist".format(db_fn))
+        tf_cache = kwargs.get("tf_cache", False)
+        self._key_cache = None
+        if tf_cache:
+            self._key_cache = KeyCache(
+                KeyCache.default_fn(db_fn) if tf_cache is True else str(tf_cache)
+            )
+        self._tf_key = None
         valor = kwargs.get("tf_key")
+        if isinstance(valor, str):
+            valor = bytes.fromhex(valor)
         self._kpobj = self._initialize_kpdb(
-            str(kwargs.get("db_fn", DEFAULT_DB_FN)),
+            db_fn,
             str(kwargs.get("pwd_fn", DEFAULT_PWD_FN)),
             str(kwargs.get("key_fn", "")),
-            str(valor) if valor is not None else None,  # noqa: WPS504
+            valor if isinstance(valor, bytes) else None,
             bool(kwargs.get("warn", True)),
         )
+        self._stamp = file_stamp(db_fn)
+        if read_only:
+            # lookups are answered from the records, drop the tree
+            with self._instrument.span("index_build"):
+                self._records = ViewIndex(self.kpo)
+            self._kpobj = None
+        else:
+            self._build_indexes()
+
+    def __enter__(self) -> "StercesDatabase":
+        """Return this database, closed when the block exits.
+
+        :returns: this database
+        :rtype: StercesDatabase
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        """Save pending changes and close the database, even on error."""
+        self.close()
 
     @property
     def kpo(self) -> PyKeePass:
@@ -99,6 +293,73 @@ class StercesDatabase:
         """Return the version of the sterces library."""
         return VERSION
 
+    def close(self) -> None:
+        """Save pending changes and release the database.
+
+        Methods that need the open database raise ValueError afterwards,
+        closing again does nothing.
+        """
+        with self._lock:
+            if self._is_closed():
+                return
+            self.flush()
+            with self._tree_lock:
+                self._kpobj = None
+                self._records = None
+                self._agent = None
+                self._index = PathIndex()
+                self._attrs = AttributeIndex()
+
+    @contextmanager
+    def defer_save(self) -> Iterator["StercesDatabase"]:
+        """Keep changes in memory until flush is called.
+
+        Unlike transaction nothing is rolled back when the block raises and
+        nothing is saved when it exits, which lets the caller choose where
+        the expensive save runs. A transaction cannot be opened inside it.
+
+        :yields: this database
+        :ytype: StercesDatabase
+        """
+        self._require_tree("defer_save")
+        self._txn_depth += 1
+        self._deferred += 1
+        try:
+            yield self
+        finally:
+            self._deferred -= 1
+            self._txn_depth -= 1
+
+    def diff(self, other: "StercesDatabase") -> DiffResult:
+        """Compare the entries of this database with another one.
+
+        Every entry gets a fingerprint of its path, fields, times and UUID,
+        so only fingerprints are compared, not the entries themselves.
+
+        :param other: database to compare with
+        :type other: StercesDatabase
+        :raises ValueError: When either database is closed, read only or
+            connected to an agent
+        :returns: paths only other has, only this has and that differ
+        :rtype: DiffResult
+        """
+        for database in (self, other):
+            # an empty index would look like a database without entries
+            database._require_local("diff")  # noqa: WPS437
+            database._require_tree("diff")  # noqa: WPS437
+        self._reload_if_stale()
+        # one lock at a time, a diff the other way round must not deadlock
+        with self._tree_lock:
+            ours = self._fingerprints()
+        with other._tree_lock:  # noqa: WPS437
+            theirs = other._fingerprints()  # noqa: WPS437
+        added, removed, changed = compare(ours, theirs)
+        return DiffResult(
+            [key_path(key) for key in added],
+            [key_path(key) for key in removed],
+            [key_path(key) for key in changed],
+        )
+
     def dump(self, path: Optional[str], mask: bool = True, indent: int = 0) -> int:
         """Dump the database to stdout.
 
@@ -108,27 +369,179 @@ class StercesDatabase:
         :type mask: bool
         :param indent: indent size when > 0 defaults to 0
         :type indent: int
+        :raises ValueError: When connected to an agent
         :returns: return code
         :rtype: int
         """
-        e_list: list[dict[str, str]] = []
-        if path:
-            entry = self.kpo.find_entries(path=self._str_to_path(path))
-            if not entry:
-                logger.error(ENTRY_NOT_EXIST.format(path))
-                return 1
-            e_list.append(self._entry_to_dict(entry, mask))
-        else:
-            entries = self.kpo.entries
-            if entries:
-                for entry in entries:
-                    e_list.append(self._entry_to_dict(entry, mask))
-        if indent > 0:
-            print(json.dumps(e_list, indent=4))
-        else:
-            print(json.dumps(e_list))
+        self._require_local("dump")
+        self._reload_if_stale()
+        with self._tree_lock:
+            if path:
+                view = self._find_view(path)
+                views = [] if view is None else [view]
+            else:
+                views = self._entry_views(())
+        if path and not views:
+            logger.error(ENTRY_NOT_EXIST.format(path))
+            return 1
+        with self._instrument.span("serialize"):
+            write_json(sys.stdout, views, mask, indent)
+        return 0
+
+    def dump_jsonl(
+        self,
+        fd: TextIO,
+        prefix: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+        mask: bool = True,
+    ) -> int:
+        """Stream entries to a file object as JSON Lines.
+
+        One JSON object is written per entry as soon as it is serialized, so
+        the serialized entries are never held in memory together.
+
+        :param fd: text file object to write to
+        :type fd: TextIO
+        :param prefix: only dump entries below this group path
+        :type prefix: Optional[str]
+        :param fields: only include these fields, defaults to all
+        :type fields: Optional[Iterable[str]]
+        :param mask: mask password fields when True
+        :type mask: bool
+        :raises ValueError: When connected to an agent
+        :returns: return code
+        :rtype: int
+        """
+        self._require_local("dump_jsonl")
+        try:
+            entries = self.iter_entries(prefix, fields, mask)
+        except ValueError as ex:
+            logger.error(str(ex))
+            return 1
+        for ed in entries:
+            fd.write(json.dumps(ed))
+            fd.write("\n")
         return 0
 
+    def expiring(
+        self, within: timedelta, include_expired: bool = False, quiet: bool = True
+    ) -> list[dict[str, str]]:
+        """Return the entries expiring within a period, soonest first.
+
+        The range is answered from the expiry ordered index by bisection,
+        entries expiring outside of it are not looked at.
+
+        :param within: period from now
+        :type within: timedelta
+        :param include_expired: include entries that expired already
+        :type include_expired: bool
+        :param quiet: don't print the entries when True
+        :type quiet: bool
+        :returns: path and expiry of the entries
+        :rtype: list[dict[str, str]]
+        """
+        self._require_tree("expiring")
+        if self._agent is not None:
+            return list(
+                self._agent.call(
+                    "expiring",
+                    within=within.total_seconds(),
+                    include_expired=include_expired,
+                )
+            )
+        self._reload_if_stale()
+        with self._tree_lock:
+            now = datetime.now(timezone.utc)
+            start = float("-inf") if include_expired else now.timestamp()
+            found = [
+                {
+                    "path": "/{0}".format("/".join(element_path(element))),
+                    "expiry": datetime.fromtimestamp(stamp, timezone.utc).strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    ),
+                }
+                for stamp, element in self._attrs.expiring(
+                    start, (now + within).timestamp()
+                )
+            ]
+        if not quiet:
+            print(json.dumps(found))
+        return found
+
+    def find(
+        self,
+        tags: Optional[Union[str, Iterable[str]]] = None,
+        username: Optional[str] = None,
+        url_host: Optional[str] = None,
+        group_prefix: Optional[str] = None,
+    ) -> list[str]:
+        """Return the paths of the entries matching every given criterion.
+
+        Tags, usernames and URL hosts are answered from in-memory inverted
+        indexes by intersecting their posting sets, smallest first.
+
+        :param tags: tags the entries must all carry, list or comma separated
+        :type tags: Optional[Union[str, Iterable[str]]]
+        :param username: exact username
+        :type username: Optional[str]
+        :param url_host: host name of the URL, case insensitive
+        :type url_host: Optional[str]
+        :param group_prefix: only entries below this group path
+        :type group_prefix: Optional[str]
+        :returns: sorted paths of the matching entries
+        :rtype: list[str]
+        """
+        self._require_tree("find")
+        if isinstance(tags, str):
+            tags = [tag for tag in tags.split(",") if tag]
+        if self._agent is not None:
+            return list(
+                self._agent.call(
+                    "find",
+                    tags=list(tags or ()),
+                    username=username,
+                    url_host=url_host,
+                    group_prefix=group_prefix,
+                )
+            )
+        self._reload_if_stale()
+        with self._tree_lock:
+            matches = self._attrs.query(tags or (), username, url_host)
+            prefix: Tuple[str, ...] = ()
+            if group_prefix and group_prefix.strip("/"):
+                prefix = tuple(self._str_to_path(group_prefix))
+            if matches is None:
+                group = self._find_group(list(prefix))
+                if group is None:
+                    return []
+                matches = set(entry_elements(group._element))  # noqa: WPS437
+            keys = (element_path(element) for element in matches)
+            return sorted(
+                "/{0}".format("/".join(key))
+                for key in keys
+                if key[: len(prefix)] == prefix
+            )
+
+    def flush(self) -> None:
+        """Save pending changes to the database file now.
+
+        Inside defer_save the changes are written, changes made inside an
+        open transaction are saved when the transaction ends. When another
+        writer saved the file meanwhile, the
+        pending changes are replayed onto its version first, see reload;
+        changes that conflict with it are dropped, the others are saved and
+        ValueError names the dropped ones.
+
+        :raises ValueError: When the database is closed or pending changes
+            conflict with another writer
+        """
+        self._require_open("flush")
+        with self._lock:
+            self._cancel_timer()
+            # defer_save blocks count as transactions, but only hold saves back
+            if self._dirty > 0 and self._txn_depth == self._deferred:
+                self._write()
+
     def group(self, path: Optional[str], action: str, quiet: bool = True) -> int:
         """Manage groups.
 
@@ -138,28 +551,74 @@ class StercesDatabase:
         :type action: str
         :param quiet: don't show groups when True
         :type quiet: bool
+        :raises ValueError: When connected to an agent
         :returns: return code
         :rtype: int
         """
-        if path:
-            if action == ADD:
-                self._option_required_for(path, "path", ADD)
-                self._ensure_group(str(path))
-                self._dirty += 1
-            elif action == REMOVE:
-                self._option_required_for(path, "path", REMOVE)
-                group = self.kpo.find_groups(path=self._str_to_path(str(path)))
-                if group:
-                    self.kpo.delete_group(group)
+        self._require_local("group")
+        self._require_tree("group")
+        with self._writing():
+            self._reload_if_stale()
+            if path:
+                if action == ADD:
+                    self._option_required_for(path, "path", ADD)
+                    self._ensure_group(str(path))
                     self._dirty += 1
+                    self._record("group", path, action)
+                elif action == REMOVE:
+                    self._option_required_for(path, "path", REMOVE)
+                    parts = self._str_to_path(str(path))
+                    group = self._find_group(parts)
+                    if group:
+                        self._index.drop_group(tuple(parts), group)
+                        self._attrs.discard_tree(group._element)  # noqa: WPS437
+                        self.kpo.delete_group(group)
+                        self._dirty += 1
+                        self._record("group", path, action)
+                    else:
+                        logger.warning(GROUP_NOT_FOUND.format(path))
                 else:
-                    logger.warning("Group not found: {0}".format(path))
-            else:
-                logger.warning("Invalid action: {0}".format(action))
-        if not quiet:
-            print(self.kpo.groups)
-        self._save()
-        return 0
+                    logger.warning("Invalid action: {0}".format(action))
+            if not quiet:
+                print(self.kpo.groups)
+            return 0
+
+    def iter_entries(
+        self,
+        prefix: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+        mask: bool = True,
+    ) -> Iterator[dict[str, str]]:
+        """Return an iterator yielding entries as dictionaries one at a time.
+
+        :param prefix: only yield entries below this group path
+        :type prefix: Optional[str]
+        :param fields: only include these fields, defaults to all
+        :type fields: Optional[Iterable[str]]
+        :param mask: mask password fields when True
+        :type mask: bool
+        :raises ValueError: When the prefix group does not exist or connected
+            to an agent
+        :returns: iterator of entry dictionaries
+        :rtype: Iterator[dict[str, str]]
+        """
+        self._require_local("iter_entries")
+        self._reload_if_stale()
+        parts = self._str_to_path(prefix) if prefix and prefix.strip("/") else []
+        if self._records is not None:
+            if tuple(parts) not in self._records.groups:
+                raise ValueError(GROUP_NOT_FOUND.format(prefix))
+            views: Iterable[EntryView] = self._records.below(tuple(parts))
+            return self._entry_dicts(views, frozenset(fields or ()), mask)
+        with self._tree_lock:
+            group = self._find_group(parts)
+            if group is None:
+                raise ValueError(GROUP_NOT_FOUND.format(prefix))
+            # references only, each view is read under the lock when its
+            # turn comes, see _locked_views
+            elements = list(entry_elements(group._element))  # noqa: WPS437
+        views = self._locked_views(elements, self.kpo)
+        return self._entry_dicts(views, frozenset(fields or ()), mask)
 
     def lookup(self, path: str, attr: str) -> Optional[str]:  # noqa: WPS231
         """Return the value of the attribute.
@@ -168,30 +627,181 @@ class StercesDatabase:
         :type path: str
         :param attr: attribute to lookup
         :type attr: str
+        :raises ValueError: When the database is closed
         :returns: value of found attribute or None
         :rtype: Optional[str]
         """
-        if attr in ATTRIBUTES:
-            entry = self.kpo.find_entries(path=self._str_to_path(path))
-            if entry:
-                if attr == TAGS:
-                    return ",".join(entry.tags)
-                elif attr == EXPIRY:
-                    return (
-                        entry.expiry_time.strftime("%Y-%m-%d %H:%M:%S")
-                        if entry.expires
-                        else None
-                    )
-                else:
-                    return str(eval("entry.{0}".format(attr)))
-            logger.error(ENTRY_NOT_EXIST.format(path))
-        else:
-            logger.error(
-                "Invalid attribute '{0}' not one of ({1}).".format(
-                    attr, ",".join(ATTRIBUTES)
-                )
+        self._require_open("lookup")
+        if self._agent is not None:
+            return self._agent_lookup(path, attr)
+        self._reload_if_stale()
+        with self._tree_lock:
+            if attr in ATTRIBUTES:
+                view = self._find_view(path)
+                if view is not None:
+                    return self._attr_value(view, attr)
+                logger.error(ENTRY_NOT_EXIST.format(path))
+            else:
+                logger.error(INVALID_ATTRIBUTE.format(attr, ",".join(ATTRIBUTES)))
+            return None
+
+    def lookup_many(
+        self,
+        paths: Iterable[Union[str, Tuple[str, str]]],
+        attrs: Optional[Iterable[str]] = None,
+    ) -> dict[str, dict[str, LookupResult]]:
+        """Return the values of many attributes of many entries.
+
+        Each entry is resolved once and all of its requested attributes are
+        read in the same pass. Failures are reported per item in the result
+        instead of being logged.
+
+        :param paths: entry paths or (path, attribute) pairs
+        :type paths: Iterable[Union[str, Tuple[str, str]]]
+        :param attrs: attributes to lookup for every plain path
+        :type attrs: Optional[Iterable[str]]
+        :raises ValueError: When the database is closed
+        :returns: results keyed by path then attribute
+        :rtype: dict[str, dict[str, LookupResult]]
+        """
+        self._require_open("lookup_many")
+        if self._agent is not None:
+            found_many = self._agent.call(
+                "lookup_many", paths=list(paths), attrs=list(attrs or ())
+            )
+            return {
+                path: {attr: LookupResult(*found) for attr, found in res.items()}
+                for path, res in found_many.items()
+            }
+        self._reload_if_stale()
+        wanted = self._wanted_attrs(paths, attrs)
+        with self._tree_lock:
+            results: dict[str, dict[str, LookupResult]] = {}
+            for path, names in wanted.items():
+                view = self._find_view(path)
+                found: dict[str, LookupResult] = {}
+                for attr in names:
+                    if attr not in ATTRIBUTES:
+                        found[attr] = LookupResult(
+                            None, INVALID_ATTRIBUTE.format(attr, ",".join(ATTRIBUTES))
+                        )
+                    elif view is None:
+                        found[attr] = LookupResult(None, ENTRY_NOT_EXIST.format(path))
+                    else:
+                        found[attr] = LookupResult(self._attr_value(view, attr))
+                results[path] = found
+            return results
+
+    def otp_many(
+        self, paths: Iterable[str], for_time: Optional[datetime] = None
+    ) -> dict[str, LookupResult]:
+        """Return the current TOTP codes of many entries.
+
+        Every otpauth URI is parsed once and its TOTP object cached by URI,
+        all codes are computed for the same point in time. Failures are
+        reported per path in the result instead of being logged.
+
+        :param paths: entry paths
+        :type paths: Iterable[str]
+        :param for_time: point in time, defaults to now
+        :type for_time: Optional[datetime]
+        :raises ValueError: When the database is closed
+        :returns: results keyed by path
+        :rtype: dict[str, LookupResult]
+        """
+        self._require_open("otp_many")
+        if self._agent is not None:
+            return self._agent_otp_many(paths, for_time)
+        self._reload_if_stale()
+        with self._tree_lock:
+            now = (for_time or datetime.now(timezone.utc)).timestamp()
+            return {path: self._otp_result(path, now) for path in paths}
+
+    def otp_now(self, path: str) -> Optional[str]:
+        """Return the current TOTP code of an entry.
+
+        :param path: path of the entry
+        :type path: str
+        :returns: the one time password or None
+        :rtype: Optional[str]
+        """
+        found = self.otp_many([path])[path]
+        if found.error:
+            logger.error(found.error)
+        return found.value
+
+    def rekey(
+        self, target: float = DEFAULT_TARGET, memory_cap: int = DEFAULT_MEMORY
+    ) -> RekeyReport:
+        """Derive the key with parameters calibrated to unlock in target seconds.
+
+        The kind of key derivation, Argon2 or AES-KDF, and the Argon2
+        parallelism are kept. Open and save are timed before and after,
+        both deriving the key, which is what an unlock costs without the
+        transformed key cache.
+
+        :param target: seconds an unlock should take on this machine
+        :type target: float
+        :param memory_cap: most Argon2 memory in bytes
+        :type memory_cap: int
+        :raises ValueError: When a transaction or defer_save block is open or
+            connected to an agent
+        :returns: parameters and timings before and after
+        :rtype: RekeyReport
+        """
+        self._require_local("rekey")
+        self._require_tree("rekey")
+        with self._lock:
+            if self._txn_depth:
+                raise ValueError("rekey needs to save, not inside a transaction")
+            self.flush()
+            kpo = self.kpo
+            old_params = read_params(kpo)
+            opened, probe = time_open(kpo.filename, kpo.password, kpo.keyfile)
+            old_timings = KdfTimings(opened, time_save(probe))
+            params = calibrate(
+                target,
+                memory_cap,
+                old_params.kdf,
+                old_params.parallelism or DEFAULT_PARALLELISM,
             )
-        return None
+            self._set_kdf(params)
+            self.flush()
+            opened, probe = time_open(kpo.filename, kpo.password, kpo.keyfile)
+            # the save derived the key for a new salt, keep it for the next
+            self._tf_key = probe.transformed_key
+            if self._key_cache is not None:
+                self._key_cache.save(kpo.filename, probe.transformed_key, kpo.keyfile)
+            new_timings = KdfTimings(opened, time_save(probe))
+            logger.info("rekeyed {0}: {1}".format(kpo.filename, params))
+            return RekeyReport(old_params, params, old_timings, new_timings)
+
+    def reload(self) -> bool:
+        """Reload the database when its file was changed by another writer.
+
+        A stat of the file decides whether it changed. The reload reuses the
+        transformed key, so it skips the key derivation unless the writer
+        changed the KDF parameters or salt. Pending changes are replayed
+        onto the reloaded database. A store of a path the other writer
+        created meanwhile, or an update of an entry it removed, cannot be
+        replayed: it is dropped and reported by ValueError once the reload
+        is complete. While a transaction is open the file is not reloaded,
+        the save at its end merges the changes.
+
+        :raises ValueError: When the database is closed or pending changes
+            conflict with the other writer
+        :returns: True when the database was reloaded
+        :rtype: bool
+        """
+        self._require_open("reload")
+        with self._lock:
+            if self._agent is not None or self._records is not None:
+                return False
+            if self._txn_depth:
+                return False
+            conflicts = self._merge()
+        self._raise_conflicts(conflicts)
+        return conflicts is not None
 
     def remove(self, path: str) -> int:
         """Remove an entry.
@@ -201,15 +811,23 @@ class StercesDatabase:
         :returns: return code
         :rtype: int
         """
-        entry = self.kpo.find_entries(path=self._str_to_path(path))
-        if not entry:
-            logger.warning(ENTRY_NOT_EXIST.format(path))
-            return 1
-        self.kpo.delete_entry(entry)
-        self._dirty += 1
-        self._save()
-        logger.info("Entry {0} has been removed".format(path))
-        return 0
+        self._require_tree("remove")
+        with self._writing():
+            if self._agent is not None:
+                return int(self._agent.call("remove", path=path))
+            self._reload_if_stale()
+            entry = self._find_entry(path)
+            if not entry:
+                logger.warning(ENTRY_NOT_EXIST.format(path))
+                return 1
+            self._index.drop_entry(tuple(self._str_to_path(path)), entry)
+            self._attrs.discard(entry._element)  # noqa: WPS437
+            self._otp.discard(entry.otp)
+            self.kpo.delete_entry(entry)
+            self._dirty += 1
+            self._record("remove", path)
+            logger.info("Entry {0} has been removed".format(path))
+            return 0
 
     def show(self, path: Optional[str] = None, mask: bool = True) -> int:
         """Show one or all entries.
@@ -218,21 +836,25 @@ class StercesDatabase:
         :type path: Optional[str], optional
         :param mask: mask password, defaults to True
         :type mask: bool, optional
+        :raises ValueError: When connected to an agent
         :returns: return code
         :rtype: int
         """
+        self._require_local("show")
+        self._reload_if_stale()
         if path:
-            entry = self.kpo.find_entries(path=self._str_to_path(path))
-            if not entry:
+            with self._tree_lock:
+                view = self._find_view(path)
+            if view is None:
                 logger.error(ENTRY_NOT_EXIST.format(path))
                 return 1
-            self._print_entry(entry, mask)
+            print(view.to_dict(mask))
             return 0
-        entries = self.kpo.entries
-        if entries:
-            for entry in entries:
-                self._print_entry(entry, mask)
-        else:
+        with self._tree_lock:
+            views = self._entry_views(())
+        with self._instrument.span("serialize"):
+            shown = write_reprs(sys.stdout, views, mask)
+        if not shown:
             logger.warning("No entries found")
         return 0
 
@@ -266,28 +888,158 @@ class StercesDatabase:
         :returns: return code
         :rtype: int
         """
-        keywords: list[str] = tags if tags else []
-        entry = self.kpo.find_entries(path=self._str_to_path(path))
-        if entry:
-            logger.error("Entry {0} already exists".format(path))
-            return 1
-        group_path, title = self._entry_path(path)
-        group = self._ensure_group(group_path)
-        entry = self.kpo.add_entry(
-            group,
-            title,
-            kwargs.pop(USERNAME, "undef"),
-            kwargs.pop(PASSWORD, "undef"),
-            kwargs.pop(URL, None),
-            kwargs.pop(NOTES, None),
-            expiry,
-            keywords,
-            kwargs.pop(OTP, None),
+        self._require_tree("store")
+        with self._writing():
+            if self._agent is not None:
+                return int(
+                    self._agent.call(
+                        "store",
+                        path=path,
+                        expiry=expiry.isoformat() if expiry else None,
+                        tags=tags,
+                        **kwargs,
+                    )
+                )
+            self._reload_if_stale()
+            fields = dict(kwargs)
+            keywords: list[str] = tags if tags else []
+            entry = self._find_entry(path)
+            if entry:
+                logger.error("Entry {0} already exists".format(path))
+                return 1
+            group_path, title = self._entry_path(path)
+            group = self._ensure_group(group_path)
+            # not kpo.add_entry, its duplicate check is an XPath query over
+            # the whole tree and the path index already answered it
+            entry = Entry(
+                title=title,
+                username=kwargs.pop(USERNAME, "undef"),
+                password=kwargs.pop(PASSWORD, "undef"),
+                url=kwargs.pop(URL, None),
+                notes=kwargs.pop(NOTES, None),
+                otp=kwargs.pop(OTP, None),
+                tags=keywords,
+                expires=expiry is not None,
+                expiry_time=expiry,
+                kp=self.kpo,
+            )
+            group.append(entry)
+            self._index.add_entry((*group_path, title), entry)
+            self._attrs.add(entry._element)  # noqa: WPS437
+            self._dirty += 1
+            self._record("store", path, expiry, list(keywords), **fields)
+            self._print_entry(entry)
+            return 0
+
+    def stats(self) -> dict[str, SpanStats]:
+        """Return timing statistics of the instrumented hot paths.
+
+        Spans are only recorded when the database was created with
+        ``instrument=True``; use span_hook to receive every span as well.
+
+        :returns: calls, total and max duration keyed by span name
+        :rtype: dict[str, SpanStats]
+        """
+        return self._instrument.stats()
+
+    def sync(  # noqa: WPS210
+        self, other: "StercesDatabase", strategy: str = NEWER, prune: bool = False
+    ) -> DiffResult:
+        """Copy the entries of another database that differ into this one.
+
+        Only entries whose fingerprints differ are compared, see diff. Entries
+        missing here are always copied, for changed entries the strategy
+        decides: newer copies theirs when it was modified later, theirs
+        always copies and ours keeps this entry. Missing groups are created
+        and the whole sync is saved once.
+
+        :param other: database to copy from
+        :type other: StercesDatabase
+        :param strategy: newer, theirs or ours, defaults to newer
+        :type strategy: str
+        :param prune: remove entries other does not have, defaults to False
+        :type prune: bool
+        :raises ValueError: When strategy is invalid or either database is
+            closed, read only or connected to an agent
+        :returns: paths added, removed and replaced in this database
+        :rtype: DiffResult
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                "Invalid strategy '{0}' not one of ({1}).".format(
+                    strategy, ",".join(STRATEGIES)
+                )
+            )
+        for database in (self, other):
+            # an empty index would look like a database without entries
+            database._require_local("sync")  # noqa: WPS437
+            database._require_tree("sync")  # noqa: WPS437
+        with self._writing():
+            self._reload_if_stale()
+            ours = self._fingerprints()
+            theirs = other._fingerprints()
+            added, removed, changed = compare(ours, theirs)
+            changed = self._selected_changes(other, strategy, changed, ours, theirs)
+            if not prune:
+                removed = []
+            if added or removed or changed:
+                with self.transaction():
+                    self._copy_entries(added + changed, ours, theirs)
+                    for key in removed:
+                        self.remove(key_path(key))
+            logger.info(
+                "synced {0} added, {1} removed, {2} changed".format(
+                    len(added), len(removed), len(changed)
+                )
+            )
+        return DiffResult(
+            [key_path(key) for key in added],
+            [key_path(key) for key in removed],
+            [key_path(key) for key in changed],
         )
-        self._dirty += 1
-        self._print_entry(entry)
+
+    @contextmanager
+    def transaction(self) -> Iterator["StercesDatabase"]:
+        """Group several mutations into a single save.
+
+        Saving is deferred until the outermost block exits and the whole
+        batch counts as one change. When the block raises, every change made
+        inside it is rolled back and nothing is saved. Nested blocks join
+        the outer one. Inside defer_save there is no snapshot to roll back
+        to, so opening a transaction there raises.
+
+        :raises ValueError: When called inside defer_save or connected to an
+            agent
+        :yields: this database
+        :ytype: StercesDatabase
+        """
+        self._require_local("transaction")
+        self._require_tree("transaction")
+        if self._deferred:
+            raise ValueError("Cannot open a transaction inside defer_save")
+        if self._txn_depth:
+            yield self
+            return
+        self._reload_if_stale()
+        snapshot = deepcopy(self.kpo.tree)
+        dirty = self._dirty
+        journal = len(self._journal)
+        self._txn_depth += 1
+        try:
+            yield self
+        except BaseException:
+            with self._tree_lock:
+                self.kpo.payload.xml = snapshot
+                self._build_indexes()
+            self._dirty = dirty
+            del self._journal[journal:]  # noqa: WPS420
+            logger.warning("transaction rolled back")
+            raise
+        finally:
+            self._txn_depth -= 1
+        if self._dirty > dirty:
+            self._dirty = dirty + 1
         self._save()
-        return 0
 
     def update(  # noqa: WPS231, C901
         self,
@@ -312,37 +1064,119 @@ class StercesDatabase:
         :ivar expires: Value of expiration datetime
         :vartype expires: str, optional
 
-        :raises ValueError: When expires is not parsable
+        :raises ValueError: When a field is invalid or expires is not parsable
 
         :returns: return code
         :rtype: int
         """
-        entry = self.kpo.find_entries(path=self._str_to_path(path))
-        if not entry:
-            logger.error(ENTRY_NOT_EXIST.format(path))
-            return 1
-        for key, valor in kwargs.items():
-            if key == "expires":
-                if valor is None:
-                    entry.expires = False
+        self._require_tree("update")
+        invalid = sorted(set(kwargs) - UPDATE_FIELDS)
+        if invalid:
+            raise ValueError("Invalid update fields: {0}".format(",".join(invalid)))
+        with self._writing():
+            if self._agent is not None:
+                return int(self._agent.call("update", path=path, **kwargs))
+            self._reload_if_stale()
+            entry = self._find_entry(path)
+            if not entry:
+                logger.error(ENTRY_NOT_EXIST.format(path))
+                return 1
+            entry_key = tuple(self._str_to_path(path))
+            if "title" in kwargs:
+                self._index.drop_entry(entry_key, entry)
+            if OTP in kwargs:
+                self._otp.discard(entry.otp)
+            for key, valor in kwargs.items():
+                if key == "expires":
+                    if valor is None:
+                        entry.expires = False
+                    else:
+                        expiry = str_to_date(valor)
+                        if expiry is None:
+                            raise ValueError(
+                                "Invalid date time string: {0}".format(expiry)
+                            )
+                        entry.expiry_time = expiry
+                        entry.expires = True
+                elif key == TAGS:
+                    entry.tags = valor.split(",")
                 else:
-                    expiry = str_to_date(valor)
-                    if expiry is None:
-                        raise ValueError("Invalid date time string: {0}".format(expiry))
-                    entry.expiry_time = expiry
-                    entry.expires = True
-            elif key == TAGS:
-                entry.tags = valor.split(",")
-            else:
-                exec("entry.{0} = valor".format(key))
-        self._dirty += 1
-        self._print_entry(entry)
-        self._save()
-        return 0
+                    setattr(entry, key, valor)
+            if "title" in kwargs:
+                self._index.add_entry((*entry_key[:-1], entry.title), entry)
+            self._attrs.add(entry._element)  # noqa: WPS437
+            self._dirty += 1
+            self._record("update", path, **kwargs)
+            self._print_entry(entry)
+            return 0
+
+    def _agent_lookup(self, path: str, attr: str) -> Optional[str]:
+        if self._agent is None:
+            raise ValueError("Instance of StercesDatabase has no agent")
+        try:
+            valor = self._agent.call("lookup", path=path, attr=attr)
+        except ValueError as ex:
+            logger.error(str(ex))
+            return None
+        return None if valor is None else str(valor)
+
+    def _agent_otp_many(
+        self, paths: Iterable[str], for_time: Optional[datetime]
+    ) -> dict[str, LookupResult]:
+        if self._agent is None:
+            raise ValueError("Instance of StercesDatabase has no agent")
+        found_many = self._agent.call(
+            "otp_many",
+            paths=list(paths),
+            for_time=None if for_time is None else for_time.timestamp(),
+        )
+        return {path: LookupResult(*found) for path, found in found_many.items()}
+
+    def _attr_value(self, view: EntryView, attr: str) -> Optional[str]:
+        if attr == TAGS:
+            # same as pykeepass Entry.tags joined by commas
+            return ",".join(view.tags.replace(",", ";").split(";")) if view.tags else ""
+        valor = getattr(view, attr)
+        return None if valor is None else str(valor)
+
+    def _autosave(self) -> None:
+        # timer target, a close may have won the race for the lock
+        with self._lock:
+            if self._is_closed():
+                return
+            try:
+                self.flush()
+            except ValueError as ex:
+                logger.error(ex)
+
+    def _cached_tf_key(
+        self, db_fn: str, key_fn: Optional[str], warn: bool
+    ) -> Optional[bytes]:
+        if self._key_cache is None:
+            return None
+        cache_fn = self._key_cache.cache_fn
+        if self._check_file(cache_fn, warn, missing_ok=True):
+            return None
+        mode = Path(cache_fn).stat().st_mode
+        if not re.search(FILE_MODE, filemode(mode)):
+            self._check_mode(cache_fn, mode, FILE_MODE, warn)
+            logger.warning("discarding transformed key cache '{0}'".format(cache_fn))
+            self._key_cache.discard()
+            return None
+        return self._key_cache.load(db_fn, key_fn)
+
+    def _build_indexes(self) -> None:
+        with self._instrument.span("index_build"):
+            self._index.build(self.kpo)
+            self._attrs.build(self.kpo)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
 
     def _check_file(self, fn: str, warn: bool, missing_ok: bool) -> bool:
         DIR_MODE = r"rwx------$"
-        # FILE_MODE = r"-rw-------$"
         fp = Path(fn)
         exists = fp.exists()
         if not exists:
@@ -375,73 +1209,211 @@ class StercesDatabase:
                 "{0} permission are unsafe for '{1}' recommend '{2}'".format(pt, fn, rr)
             )
 
-    def _ensure_group(self, path: Union[str, list[str]]) -> Group:  # noqa: C901, WPS231
+    def _connect_agent(
+        self, agent: Union[bool, str], db_fn: str
+    ) -> Optional[AgentClient]:
+        if not agent:
+            return None
+        sock_fn = DEFAULT_AGENT_FN if agent is True else str(agent)
+        client = AgentClient.connect(sock_fn, db_fn)
+        if client is None:
+            logger.debug("no agent on {0}, opening database".format(sock_fn))
+        return client
+
+    def _copy_entries(
+        self,
+        keys: list[PathKey],
+        ours: dict[PathKey, EntryPrint],
+        theirs: dict[PathKey, EntryPrint],
+    ) -> None:
+        uuids = {fp.uuid for fp in ours.values()}
+        for key in keys:
+            found = theirs[key]
+            # a UUID used by another entry here must not repeat
+            clash = found.uuid in uuids and (
+                key not in ours or ours[key].uuid != found.uuid
+            )
+            self._put_entry(key, entry_copy(found.element, clash))
+
+    def _create_kpdb(
+        self, db_fn: str, pwd: str, key_fn: Optional[str], tf_key: Optional[bytes]
+    ) -> PyKeePass:
+        if self._kdf_target and tf_key is None:
+            params = calibrate(self._kdf_target, self._kdf_memory)
+            logger.debug("calibrated key derivation: {0}".format(params))
+            with self._instrument.span("initialize_kpdb"):
+                return create_calibrated(db_fn, pwd, key_fn, params)
+        with self._instrument.span("initialize_kpdb"):
+            return create_database(db_fn, pwd, key_fn, tf_key)
+
+    def _ensure_group(self, path: Union[str, list[str]]) -> Group:
         if isinstance(path, str):
             parts = self._str_to_path(path)
         else:
             parts = path.copy()
-        end = 1
-        cur_grp = self.kpo.root_group
-        while parts:
-            pl = parts[0:end]  # noqa: WPS349
-            found = self.kpo.find_groups(path=pl)
-            if found:
-                cur_grp = found
-                end += 1
-                if end > len(parts):
-                    break
-                continue
-            logger.info("creating group '{0}'".format(pl[-1]))
-            cur_grp = self.kpo.add_group(cur_grp, pl[-1])
-            if cur_grp is not None:
-                self._dirty += 1
-            end += 1
-            if end > len(parts):
-                break
+        # resolve the deepest existing prefix from the group index, then
+        # create only the missing levels below it
+        depth = len(parts)
+        cur_grp = self._find_group(parts)
+        while cur_grp is None and depth > 0:
+            depth -= 1
+            cur_grp = self._find_group(parts[:depth])
+        if cur_grp is None:
+            # an empty index, the root group is always there
+            cur_grp = self.kpo.root_group
+        for end in range(depth + 1, len(parts) + 1):
+            logger.info("creating group '{0}'".format(parts[end - 1]))
+            cur_grp = self.kpo.add_group(cur_grp, parts[end - 1])
+            self._index.add_group(tuple(parts[:end]), cur_grp)
+            self._dirty += 1
         return cur_grp
 
+    def _entry_dicts(
+        self, views: Iterable[EntryView], fields: frozenset[str], mask: bool
+    ) -> Iterator[dict[str, str]]:
+        for view in views:
+            ed = view.to_dict(mask)
+            if fields:
+                ed = {key: valor for key, valor in ed.items() if key in fields}
+            yield ed
+
     def _entry_path(self, path: str) -> Tuple[list[str], str]:
         group_path = self._str_to_path(path)
         title = group_path.pop()
         return group_path, title
 
-    def _entry_to_dict(
-        self, entry: Entry, mask: bool = True
-    ) -> dict[str, str]:  # noqa: C901
-        ed: dict[str, str] = {}
-        ed["path"] = entry.path
-        ed["title"] = entry.title
-        ed["username"] = entry.username
-        if mask:
-            masked = ""
-            cnt = len(entry.password)
-            while cnt > 0:
-                masked = masked + "*"  # noqa: WPS336
-                cnt -= 1
-            ed["password"] = masked
-        else:
-            ed["password"] = entry.password
-        if entry.tags:
-            ed["tags"] = ",".join(entry.tags)
-        add_arg_if(ed, "url", entry.url)
-        add_arg_if(ed, "notes", entry.notes)
-        if entry.expires:
-            ed["expiry"] = entry.expiry_time.strftime("%Y-%m-%d %H:%M:%S")
-        add_arg_if(ed, "notes", entry.otp)
-        return ed
+    def _entry_to_dict(self, entry: Entry, mask: bool = True) -> dict[str, str]:
+        return self._entry_view(entry).to_dict(mask)
+
+    def _entry_view(self, entry: Entry) -> EntryView:
+        with self._instrument.span("entry_to_dict"):
+            return EntryView(entry._element, self.kpo)  # noqa: WPS437
+
+    def _entry_views(self, prefix: PathKey) -> list[EntryView]:
+        with self._instrument.span("entry_views"):
+            if self._records is not None:
+                return self._records.below(prefix)
+            group = self._find_group(list(prefix)) if prefix else self.kpo.root_group
+            if group is None:
+                return []
+            return [
+                EntryView(element, self.kpo)
+                for element in entry_elements(group._element)  # noqa: WPS437
+            ]
+
+    def _find_entry(self, path: str) -> Optional[Entry]:
+        parts = self._str_to_path(path)
+        with self._instrument.span("find_entry"):
+            entry = self._index.entry(tuple(parts))
+        if self._check_index:
+            with self._instrument.span("find_entries"):
+                found = self.kpo.find_entries(path=parts)
+            self._verify_index(entry, found, path)
+        return entry
+
+    def _find_group(self, parts: list[str]) -> Optional[Group]:
+        with self._instrument.span("find_group"):
+            group = self._index.group(tuple(parts))
+        if self._check_index:
+            with self._instrument.span("find_groups"):
+                found = self.kpo.find_groups(path=parts)
+            self._verify_index(group, found, parts)
+        return group
+
+    def _find_view(self, path: str) -> Optional[EntryView]:
+        if self._records is not None:
+            return self._records.entries.get(tuple(self._str_to_path(path)))
+        entry = self._find_entry(path)
+        return None if entry is None else self._entry_view(entry)
+
+    def _fingerprints(self) -> dict[PathKey, EntryPrint]:
+        with self._instrument.span("fingerprint"):
+            return fingerprints(self._index.entries)
 
     def _initialize_kpdb(
         self,
         db_fn: str,
         pwd_fn: str,
         key_fn: Optional[str],
-        tf_key: Optional[str],
+        tf_key: Optional[bytes],
         warn: bool,
     ) -> PyKeePass:
-        create, pwd = self._pre_flight(db_fn, pwd_fn, key_fn, warn)
+        with self._instrument.span("pre_flight"):
+            create, pwd = self._pre_flight(db_fn, pwd_fn, key_fn, warn)
         if create:
-            return create_database(db_fn, pwd, key_fn, tf_key)
-        return PyKeePass(db_fn, pwd, key_fn, tf_key)
+            return self._create_kpdb(db_fn, pwd, key_fn, tf_key)
+        cached = None
+        if tf_key is None:
+            cached = self._cached_tf_key(db_fn, key_fn, warn)
+        kpo = self._open_kpdb(db_fn, pwd, key_fn, tf_key or cached, cached is not None)
+        self._tf_key = kpo.transformed_key
+        if self._key_cache is not None and kpo.transformed_key != cached:
+            self._key_cache.save(db_fn, kpo.transformed_key, key_fn)
+        return kpo
+
+    def _is_closed(self) -> bool:
+        return self._kpobj is None and self._records is None and self._agent is None
+
+    def _locked_views(
+        self, elements: list[_Element], kpo: PyKeePass
+    ) -> Iterator[EntryView]:
+        for element in elements:
+            with self._tree_lock:
+                view = EntryView(element, kpo)
+            yield view
+
+    def _merge(self) -> Optional[list[JournalItem]]:
+        # when another writer replaced the file since it was loaded, load
+        # its version and replay the journal of pending changes onto it;
+        # returns the changes that failed to replay, None without a reload
+        stamp = file_stamp(self.kpo.filename)
+        if stamp is None or stamp == self._stamp:
+            return None
+        pending = self._journal
+        dirty = self._dirty
+        with self._tree_lock, self._instrument.span("reload"):
+            self._kpobj = self._reopen(self.kpo)
+            self._stamp = stamp
+            self._build_indexes()
+            self._otp.clear()
+            self._journal = []
+            conflicts = []
+            self._replaying = True
+            try:
+                for item in pending:
+                    if self._replay(item):
+                        self._journal.append(item)
+                    else:
+                        conflicts.append(item)
+            finally:
+                self._replaying = False
+        self._dirty = dirty
+        logger.info(
+            "database changed on disk, reloaded and replayed {0} changes".format(
+                len(self._journal)
+            )
+        )
+        return conflicts
+
+    def _open_kpdb(
+        self,
+        db_fn: str,
+        pwd: str,
+        key_fn: Optional[str],
+        tf_key: Optional[bytes],
+        cached: bool,
+    ) -> PyKeePass:
+        try:
+            with self._instrument.span("initialize_kpdb"):
+                return PyKeePass(db_fn, pwd, key_fn, tf_key)
+        except CredentialsError:
+            if not cached or self._key_cache is None:
+                raise
+        # a stale cached key, derive the key from the passphrase again
+        logger.debug("cached transformed key rejected")
+        self._key_cache.discard()
+        with self._instrument.span("initialize_kpdb"):
+            return PyKeePass(db_fn, pwd, key_fn)
 
     def _option_required_for(
         self, option: Optional[str], name: str, action: str
@@ -451,6 +1423,18 @@ class StercesDatabase:
                 "option {0} is required for {1} action".format(name, action)
             )
 
+    def _otp_result(self, path: str, now: float) -> LookupResult:
+        view = self._find_view(path)
+        if view is None:
+            return LookupResult(None, ENTRY_NOT_EXIST.format(path))
+        uri = view.otp
+        if not uri:
+            return LookupResult(None, ENTRY_NO_OTP.format(path))
+        try:
+            return LookupResult(self._otp.code(uri, now))
+        except ValueError as ex:
+            return LookupResult(None, "{0}: {1}".format(path, ex))
+
     def _pre_flight(
         self, database: str, passphrase: str, key_file: Optional[str], warn: bool
     ) -> Tuple[bool, str]:
@@ -462,14 +1446,207 @@ class StercesDatabase:
             return create, fd.readline().strip()
 
     def _print_entry(self, entry: Entry, mask: bool = True) -> None:
+        if self._quiet or self._replaying:
+            return
         ed = self._entry_to_dict(entry, mask)
         print(ed)
 
+    def _put_entry(self, key: PathKey, element: _Element) -> None:
+        # insert a detached entry element at key, replacing the entry there
+        entry = self._index.entry(key)
+        if entry is None:
+            group = self._ensure_group(list(key[:-1]))
+            group._element.append(element)  # noqa: WPS437
+        else:
+            self._attrs.discard(entry._element)  # noqa: WPS437
+            self._otp.discard(entry.otp)
+            entry._element.getparent().replace(  # noqa: WPS437
+                entry._element, element  # noqa: WPS437
+            )
+        self._index.entries[key] = Entry(element=element, kp=self.kpo)
+        self._attrs.add(element)
+        self._dirty += 1
+        self._record("_put_entry", key, element)
+
+    def _raise_conflicts(self, conflicts: Optional[list[JournalItem]]) -> None:
+        if conflicts:
+            raise ValueError(
+                MERGE_CONFLICT.format(
+                    ", ".join(
+                        "{0} {1}".format(op, args[0]) for op, args, _ in conflicts
+                    )
+                )
+            )
+
+    def _record(self, op: str, *args: Any, **kwargs: Any) -> None:
+        # journal of the mutations since the last save, see _merge
+        if not self._replaying:
+            self._journal.append((op, args, kwargs))
+
+    def _reload_if_stale(self) -> None:
+        if self._auto_reload:
+            self.reload()
+
+    def _replay(self, item: JournalItem) -> bool:
+        # a remove of an entry the other writer removed as well is no conflict
+        op, args, kwargs = item
+        rc = getattr(self, op)(*args, **kwargs)
+        return not rc or op == "remove"
+
+    def _reopen(self, kpo: PyKeePass) -> PyKeePass:
+        if self._tf_key is not None:
+            try:
+                return PyKeePass(kpo.filename, kpo.password, kpo.keyfile, self._tf_key)
+            except CredentialsError:
+                logger.debug("kdf parameters changed, deriving the key again")
+        reopened = PyKeePass(kpo.filename, kpo.password, kpo.keyfile)
+        self._tf_key = reopened.transformed_key
+        if self._key_cache is not None:
+            self._key_cache.save(kpo.filename, self._tf_key, kpo.keyfile)
+        return reopened
+
+    def _require_local(self, op: str) -> None:
+        self._require_open(op)
+        if self._agent is not None:
+            raise ValueError(AGENT_UNSUPPORTED.format(op))
+
+    def _require_open(self, op: str) -> None:
+        if self._is_closed():
+            raise ValueError(CLOSED.format(op))
+
+    def _require_tree(self, op: str) -> None:
+        self._require_open(op)
+        if self._records is not None:
+            raise ValueError(READ_ONLY.format(op))
+
     def _save(self) -> None:
-        if self._dirty > 0:
-            self.kpo.save()
-            self._dirty = 0
-            logger.debug("saved database")
+        # write-behind: coalesce changes until autosave_changes are pending
+        # or nothing changed for autosave_delay seconds
+        if self._dirty <= 0 or self._txn_depth or self._replaying:
+            return
+        if self._writing_depth:
+            return  # saved when the outermost _writing block exits
+        if self._autosave_changes and self._dirty >= self._autosave_changes:
+            self.flush()
+        elif self._autosave_delay > 0:
+            self._schedule_flush()
+        elif not self._autosave_changes:
+            self.flush()
+
+    def _schedule_flush(self) -> None:
+        with self._lock:
+            self._cancel_timer()
+            # not a daemon, so a pending save still runs at interpreter exit
+            self._timer = threading.Timer(self._autosave_delay, self._autosave)
+            self._timer.start()
+
+    def _selected_changes(
+        self,
+        other: "StercesDatabase",
+        strategy: str,
+        changed: list[PathKey],
+        ours: dict[PathKey, EntryPrint],
+        theirs: dict[PathKey, EntryPrint],
+    ) -> list[PathKey]:
+        if strategy == OURS:
+            return []
+        if strategy == NEWER:
+            return [
+                key
+                for key in changed
+                if is_newer(theirs[key], other.kpo, ours[key], self.kpo)
+            ]
+        return changed
+
+    def _set_kdf(self, params: KdfParams) -> None:
+        # a cached transformed key does not open the next save
+        write_params(self.kpo, params)
+        self._tf_key = None
+        if self._key_cache is not None:
+            self._key_cache.discard()
+        self._dirty += 1
+        self._record("_set_kdf", params)
 
     def _str_to_path(self, path: str) -> list[str]:
         return path.strip("/").split("/")
+
+    def _verify_index(
+        self,
+        indexed: Union[Entry, Group, None],
+        found: Union[Entry, Group, None],
+        path: Union[str, list[str]],
+    ) -> None:
+        if indexed != found:
+            raise ValueError(
+                "Index mismatch for {0}: {1} != {2}".format(path, indexed, found)
+            )
+
+    def _wanted_attrs(
+        self,
+        paths: Iterable[Union[str, Tuple[str, str]]],
+        attrs: Optional[Iterable[str]],
+    ) -> dict[str, list[str]]:
+        common = list(attrs) if attrs else []
+        wanted: dict[str, list[str]] = {}
+        for item in paths:
+            if isinstance(item, str):
+                wanted.setdefault(item, []).extend(common)
+            else:
+                wanted.setdefault(item[0], []).append(item[1])
+        return wanted
+
+    def _write(self) -> None:
+        # the lock is held for the merge and the write only, it lives in a
+        # file of its own because the database file is replaced
+        db_fp = Path(self.kpo.filename)
+        with file_lock(str(db_fp.parent / ".{0}.lock".format(db_fp.name))):
+            conflicts = self._merge()
+            self._write_file()
+        self._journal = []
+        self._raise_conflicts(conflicts)
+
+    def _write_file(self) -> None:
+        db_fp = Path(self.kpo.filename)
+        fd, tmp_fn = tempfile.mkstemp(
+            prefix=".{0}.".format(db_fp.name), suffix=".tmp", dir=db_fp.parent
+        )
+        try:
+            with os.fdopen(fd, "wb") as stream:
+                # keeping the kdf salt keeps a cached transformed key valid
+                with self._instrument.span("save"):
+                    self.kpo.save(
+                        stream,
+                        transformed_key=self._tf_key if self._key_cache else None,
+                    )
+                stream.flush()
+                os.fsync(stream.fileno())
+            os.replace(tmp_fn, db_fp)
+        except BaseException:
+            Path(tmp_fn).unlink(missing_ok=True)
+            raise
+        self._stamp = file_stamp(str(db_fp))
+        if self._key_cache is None:
+            # the save rotated the kdf salt, the transformed key is stale
+            self._tf_key = None
+        dir_fd = os.open(db_fp.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._dirty = 0
+        logger.debug("saved database")
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        # a mutation holds the tree lock, its save runs after releasing it,
+        # so lookups of other threads do not wait for the file write
+        with self._lock:
+            dirty = self._dirty
+            with self._tree_lock:
+                self._writing_depth += 1
+                try:
+                    yield
+                finally:
+                    self._writing_depth -= 1
+            if self._dirty != dirty:
+                self._save()
@@ -1,20 +1,54 @@
 """Foos module for package sterces."""
 
-from datetime import datetime
-from typing import Optional
+import os
+import re
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
 
-import dateparser
+if sys.platform != "win32":
+    import fcntl
+
+FileStamp = Tuple[int, int, int]
+
+ISO_DATE = re.compile(
+    r"\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?"
+)
+EPOCH = re.compile(r"\d{9,11}")
+# distinct relative bases, chosen so that month and year arithmetic
+# yields different offsets from each of them
+RELATIVE_BASES = (
+    datetime(2001, 1, 31, 12, 0, 0),
+    datetime(2003, 3, 30, 1, 2, 3),
+    datetime(2010, 7, 15, 23, 59, 58),
+)
 
 
 def str_to_date(date: str) -> Optional[datetime]:
     """Convert a string to a datetime object.
 
+    ISO-8601 dates, ``YYYY-MM-DD HH:MM:SS`` and epoch seconds are parsed
+    directly. Anything else goes to dateparser, which is imported on first
+    use, and the outcome is memoized: absolute dates as the datetime,
+    relative expressions such as ``in 2 days`` as an offset from now.
+
     :param date: str representation of a datetime
     :type date: str
     :returns: datetime when date is parsable
     :rtype: Optional[datetime]
     """
-    return dateparser.parse(date)
+    text = date.strip()
+    fast = _parse_fast(text)
+    if fast is not None:
+        return fast
+    absolute, offset = _parse_memo(text)
+    if absolute is not None:
+        return absolute
+    if offset is not None:
+        return datetime.now() + offset
+    return _dateparser_parse(text)
 
 
 def add_arg_if(sgrawk: dict[str, str], key: str, valor: Optional[str]) -> None:
@@ -29,3 +63,78 @@ def add_arg_if(sgrawk: dict[str, str], key: str, valor: Optional[str]) -> None:
     """
     if valor is not None:
         sgrawk[key] = valor
+
+
+@contextmanager
+def file_lock(fn: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on a lock file while the block runs.
+
+    The lock file is created with mode 0600 and never removed. Without
+    fcntl the block runs unlocked.
+
+    :param fn: path of the lock file
+    :type fn: str
+    :yields: None once the lock is held
+    """
+    if sys.platform == "win32":  # pragma: no cover - no fcntl on Windows
+        yield
+        return
+    fd = os.open(fn, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def file_stamp(fn: str) -> Optional[FileStamp]:
+    """Return a cheap change stamp (inode, size, mtime) of a file.
+
+    :param fn: path of the file
+    :type fn: str
+    :returns: stamp or None when the file does not exist
+    :rtype: Optional[FileStamp]
+    """
+    try:
+        st = os.stat(fn)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _dateparser_parse(date: str, base: Optional[datetime] = None) -> Optional[datetime]:
+    import dateparser  # noqa: WPS433 - slow import, load on demand
+
+    if base is None:
+        return dateparser.parse(date)
+    return dateparser.parse(date, settings={"RELATIVE_BASE": base})
+
+
+def _parse_fast(date: str) -> Optional[datetime]:
+    if ISO_DATE.fullmatch(date):
+        try:
+            return datetime.fromisoformat(
+                "{0}+00:00".format(date[:-1]) if date.endswith("Z") else date
+            )
+        except ValueError:
+            return None
+    if EPOCH.fullmatch(date):
+        return datetime.fromtimestamp(int(date))
+    return None
+
+
+@lru_cache(maxsize=256)
+def _parse_memo(date: str) -> Tuple[Optional[datetime], Optional[timedelta]]:
+    parsed: list[datetime] = []
+    for base in RELATIVE_BASES:
+        when = _dateparser_parse(date, base)
+        if when is None:
+            return None, None
+        parsed.append(when)
+    if all(when == parsed[0] for when in parsed):
+        return parsed[0], None
+    if parsed[0].tzinfo is None:
+        offsets = {when - base for when, base in zip(parsed, RELATIVE_BASES)}
+        if len(offsets) == 1:
+            return None, offsets.pop()
+    return None, None  # calendar dependent, parse every time
@@ -0,0 +1,318 @@
+"""Importer module for package sterces."""
+
+# mypy: disable-error-code="explicit-any"
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from loguru import logger
+
+from sterces.constants import DEFAULT_DB_FN, DEFAULT_PWD_FN
+from sterces.db import NOTES, OTP, PASSWORD, URL, USERNAME, StercesDatabase
+from sterces.foos import str_to_date
+
+SKIP = "skip"
+OVERWRITE = "overwrite"
+ERROR = "error"
+POLICIES = (SKIP, OVERWRITE, ERROR)
+CSV = "csv"
+JSONL = "jsonl"
+KEEPASSXC = "keepassxc"
+FORMATS = (CSV, JSONL, KEEPASSXC)
+PROGRESS_EVERY = 1000
+# rows between two saves, each save also drops the journal of pending changes
+CHECKPOINT = 10000
+FIELDS = (USERNAME, PASSWORD, URL, NOTES, OTP)
+# columns of a KeePassXC CSV export and the entry field they fill
+KEEPASSXC_COLUMNS = {
+    "Username": USERNAME,
+    "Password": PASSWORD,
+    "URL": URL,
+    "Notes": NOTES,
+    "TOTP": OTP,
+}
+
+# line number and record of one row, or why it could not be read
+Row = Tuple[int, Union[dict[str, Any], str]]
+Fields = dict[str, str]
+
+
+class ImportStats(NamedTuple):
+    """Counters of an import.
+
+    :ivar rows: rows read
+    :ivar added: entries stored
+    :ivar overwritten: existing entries updated
+    :ivar skipped: existing entries left alone
+    :ivar failed: invalid rows
+    """
+
+    rows: int
+    added: int
+    overwritten: int
+    skipped: int
+    failed: int
+
+
+class Importer:
+    """Stream the rows of a CSV, JSON Lines or KeePassXC CSV file into a database.
+
+    Rows are read one at a time. CSV and JSON Lines rows carry a ``path``
+    and any of username, password, url, notes, otp, tags (comma separated
+    or a JSON list) and expiry. A KeePassXC export is mapped from its
+    Group, Title, Username, Password, URL, Notes and TOTP columns. Changes
+    are kept in memory and saved every checkpoint rows and at the end. The
+    database journals every pending change, passwords included, until the
+    next save, so the checkpoint also bounds what an import holds besides
+    the open vault.
+
+    :param database: open database, quiet so stored entries are not printed
+    :type database: StercesDatabase
+    :param policy: skip, overwrite or error when an entry already exists
+    :type policy: str
+    :param checkpoint: save after this many rows, defaults to 10000
+    :type checkpoint: int
+    :param progress: called with the counters every few rows and at the end
+    :type progress: Optional[Callable[[ImportStats], None]]
+    :param every: rows between two progress calls
+    :type every: int
+    :raises ValueError: When policy is invalid or checkpoint is not positive
+    """
+
+    database: StercesDatabase
+    policy: str
+    checkpoint: int
+    progress: Optional[Callable[[ImportStats], None]]
+    every: int
+    _counts: dict[str, int]
+    _readers: dict[str, Callable[[Iterable[str]], Iterator[Row]]]
+
+    def __init__(
+        self,
+        database: StercesDatabase,
+        policy: str = SKIP,
+        checkpoint: int = CHECKPOINT,
+        progress: Optional[Callable[[ImportStats], None]] = None,
+        every: int = PROGRESS_EVERY,
+    ) -> None:
+        """Construct an Importer class."""
+        if policy not in POLICIES:
+            raise ValueError(
+                "Invalid policy '{0}' not one of ({1}).".format(
+                    policy, ",".join(POLICIES)
+                )
+            )
+        if checkpoint < 1:
+            raise ValueError("Invalid checkpoint {0}, not positive.".format(checkpoint))
+        self.database = database
+        self.policy = policy
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.every = every
+        self._counts = dict.fromkeys(ImportStats._fields, 0)
+        self._readers = {
+            CSV: self._read_csv,
+            JSONL: self._read_jsonl,
+            KEEPASSXC: self._read_keepassxc,
+        }
+
+    @property
+    def stats(self) -> ImportStats:
+        """Return the counters of the rows imported so far."""
+        return ImportStats(**self._counts)
+
+    def run(self, source: Iterable[str], fmt: str = CSV) -> ImportStats:
+        """Import every row of source.
+
+        With the error policy the first existing entry raises ValueError,
+        the rows before it stay imported.
+
+        :param source: text file object or other iterable of the lines
+        :type source: Iterable[str]
+        :param fmt: csv, jsonl or keepassxc, defaults to csv
+        :type fmt: str
+        :raises ValueError: When fmt is invalid
+        :returns: counters of the import
+        :rtype: ImportStats
+        """
+        reader = self._readers.get(fmt)
+        if reader is None:
+            raise ValueError(
+                "Invalid format '{0}' not one of ({1}).".format(fmt, ",".join(FORMATS))
+            )
+        rows = reader(source)
+        while True:
+            with self.database.defer_save():
+                count = self._run_chunk(rows)
+            self.database.flush()
+            if count < self.checkpoint:
+                break
+            logger.debug("checkpoint after {0} rows".format(self._counts["rows"]))
+        if self.progress is not None:
+            self.progress(self.stats)
+        return self.stats
+
+    def _expiry(self, text: Optional[str]) -> Optional[datetime]:
+        if not text:
+            return None
+        expiry = str_to_date(text)
+        if expiry is None:
+            raise ValueError("Invalid date time string: {0}".format(text))
+        return expiry
+
+    def _import_row(
+        self, path: str, expiry: Optional[datetime], tags: list[str], fields: Fields
+    ) -> str:
+        found = self.database.lookup_many([path], [USERNAME])[path][USERNAME]
+        if found.error:
+            self.database.store(path, expiry, tags, **fields)
+            return "added"
+        if self.policy == ERROR:
+            raise ValueError("Entry {0} already exists".format(path))
+        if self.policy == SKIP:
+            return "skipped"
+        if tags:
+            fields["tags"] = ",".join(tags)
+        if expiry is not None:
+            fields["expires"] = expiry.isoformat()
+        self.database.update(path, **fields)
+        return "overwritten"
+
+    def _parse_row(
+        self, record: Union[dict[str, Any], str]
+    ) -> Tuple[str, Optional[datetime], list[str], Fields]:
+        if isinstance(record, str):
+            raise ValueError(record)
+        path = record.get("path")
+        if not path or not str(path).strip("/"):
+            raise ValueError("Missing path")
+        tags = record.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        return (
+            str(path),
+            self._expiry(record.get("expiry")),
+            [str(tag) for tag in tags],
+            {name: str(record[name]) for name in FIELDS if record.get(name)},
+        )
+
+    def _read_csv(self, source: Iterable[str]) -> Iterator[Row]:
+        reader = csv.DictReader(source)
+        for record in reader:
+            yield reader.line_num, record
+
+    def _read_jsonl(self, source: Iterable[str]) -> Iterator[Row]:
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as ex:
+                yield number, "Invalid JSON: {0}".format(ex)
+                continue
+            yield number, record if isinstance(record, dict) else "Invalid row"
+
+    def _read_keepassxc(self, source: Iterable[str]) -> Iterator[Row]:
+        reader = csv.DictReader(source)
+        for record in reader:
+            # the first group of an export is the root group, not in paths
+            parts = [
+                part for part in (record.get("Group") or "").split("/")[1:] if part
+            ]
+            row = {
+                field: record.get(column) for column, field in KEEPASSXC_COLUMNS.items()
+            }
+            if record.get("Title"):
+                row["path"] = "/{0}".format("/".join([*parts, record["Title"]]))
+            yield reader.line_num, row
+
+    def _run_chunk(self, rows: Iterator[Row]) -> int:
+        count = 0
+        for number, record in rows:
+            self._counts["rows"] += 1
+            try:
+                parsed = self._parse_row(record)
+            except ValueError as ex:
+                self._counts["failed"] += 1
+                logger.error("row {0}: {1}".format(number, ex))
+            else:
+                self._counts[self._import_row(*parsed)] += 1
+            if self.progress is not None and not self._counts["rows"] % self.every:
+                self.progress(self.stats)
+            count += 1
+            if count == self.checkpoint:
+                break
+        return count
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Import a CSV, JSON Lines or KeePassXC CSV file into a database.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: Optional[list[str]]
+    :returns: 0 when every row was imported or skipped, 1 otherwise
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(
+        prog="sterces.importer", description="import entries into a database"
+    )
+    parser.add_argument("source", help="file to import, - for stdin")
+    parser.add_argument("--format", choices=FORMATS, default=CSV, help="file format")
+    parser.add_argument(
+        "--policy",
+        choices=POLICIES,
+        default=SKIP,
+        help="what to do with an entry that already exists",
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_FN, help="database file")
+    parser.add_argument("--pwd", default=DEFAULT_PWD_FN, help="passphrase file")
+    parser.add_argument("--key", default="", help="key file")
+    parser.add_argument(
+        "--checkpoint",
+        type=int,
+        default=CHECKPOINT,
+        help="save after this many rows",
+    )
+    parser.add_argument(
+        "--tf-cache", action="store_true", help="cache the transformed key"
+    )
+    args = parser.parse_args(argv)
+    database = StercesDatabase(
+        db_fn=args.db,
+        pwd_fn=args.pwd,
+        key_fn=args.key,
+        tf_cache=args.tf_cache,
+        quiet=True,
+    )
+    importer = Importer(database, args.policy, args.checkpoint, _report)
+    with database:
+        if args.source == "-":
+            importer.run(sys.stdin, args.format)
+        else:
+            with open(args.source, newline="") as source:
+                importer.run(source, args.format)
+    return 1 if importer.stats.failed else 0
+
+
+def _report(stats: ImportStats) -> None:
+    print(  # noqa: WPS421
+        "{0} rows: {1} added, {2} overwritten, {3} skipped, {4} failed".format(*stats),
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
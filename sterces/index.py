@@ -0,0 +1,389 @@
+"""Index module for package sterces."""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from lxml.etree import _Element  # type: ignore[import-untyped]  # noqa: WPS450
+from pykeepass.entry import Entry  # type: ignore[import-untyped]
+from pykeepass.group import Group  # type: ignore[import-untyped]
+from pykeepass.pykeepass import PyKeePass  # type: ignore[import-untyped]
+
+PathKey = Tuple[str, ...]
+# tags, username, URL host and expiry timestamp of an entry
+Terms = Tuple[frozenset[str], Optional[str], Optional[str], Optional[float]]
+
+ENTRY_TAG = "Entry"
+GROUP_TAG = "Group"
+
+
+def element_title(element: _Element) -> Optional[str]:
+    """Return the title of an entry element without an XPath query.
+
+    :param element: Entry element
+    :type element: _Element
+    :returns: title of the entry when it has one
+    :rtype: Optional[str]
+    """
+    for field in element.iterfind("String"):
+        if field.findtext("Key") == "Title":
+            title: Optional[str] = field.findtext("Value")
+            return title
+    return None
+
+
+def element_fields(element: _Element) -> dict[str, Optional[str]]:
+    """Return the string fields of an entry element in a single pass.
+
+    :param element: Entry element
+    :type element: _Element
+    :returns: field values keyed by field name
+    :rtype: dict[str, Optional[str]]
+    """
+    return {
+        str(field.findtext("Key")): field.findtext("Value")
+        for field in element.iterfind("String")
+    }
+
+
+def element_path(element: _Element) -> PathKey:
+    """Return the path of an entry or group element below the root group.
+
+    :param element: Entry or Group element
+    :type element: _Element
+    :returns: names of the enclosing groups and the element
+    :rtype: PathKey
+    """
+    names = []
+    if element.tag == ENTRY_TAG:
+        names.append(element_title(element) or "")
+        element = element.getparent()
+    while element is not None and element.tag == GROUP_TAG:
+        parent = element.getparent()
+        if parent is None or parent.tag != GROUP_TAG:
+            break  # the root group is not part of paths
+        names.append(element.findtext("Name") or "")
+        element = parent
+    return tuple(reversed(names))
+
+
+def entry_elements(element: _Element) -> Iterator[_Element]:
+    """Yield the entry elements below a group element, skipping history.
+
+    :param element: Group element
+    :type element: _Element
+    :yields: Entry elements in document order
+    :ytype: _Element
+    """
+    for child in element.iter(ENTRY_TAG):
+        if child.getparent().tag != "History":
+            yield child
+
+
+def url_host(url: Optional[str]) -> Optional[str]:
+    """Return the lower case host name of a URL.
+
+    :param url: URL, with or without a scheme
+    :type url: Optional[str]
+    :returns: host name or None
+    :rtype: Optional[str]
+    """
+    if not url:
+        return None
+    split = urlsplit(url if "//" in url else "//{0}".format(url))
+    try:
+        return split.hostname
+    except ValueError:
+        return None
+
+
+class PathIndex:
+    """In-memory path index of a KeePass database.
+
+    Maps the path of every entry and group to its pykeepass object, so that
+    path resolution is a dictionary lookup instead of an XPath query over the
+    whole tree. When several elements share a path the first one in document
+    order wins, which is what ``find_entries(path=...)`` returns as well.
+    """
+
+    entries: dict[PathKey, Entry]
+    groups: dict[PathKey, Group]
+
+    def __init__(self) -> None:
+        """Construct an empty PathIndex."""
+        self.entries = {}
+        self.groups = {}
+        self._kpo: Optional[PyKeePass] = None
+
+    def build(self, kpo: PyKeePass) -> None:
+        """(Re)build the index with a single walk of the XML tree.
+
+        :param kpo: opened KeePass database
+        :type kpo: PyKeePass
+        """
+        self._kpo = kpo
+        self.entries.clear()
+        self.groups.clear()
+        self._walk(kpo.root_group._element, ())  # noqa: WPS437
+
+    def entry(self, key: PathKey) -> Optional[Entry]:
+        """Return the entry at path key.
+
+        :param key: path of the entry
+        :type key: PathKey
+        :returns: the entry or None
+        :rtype: Optional[Entry]
+        """
+        return self.entries.get(key)
+
+    def group(self, key: PathKey) -> Optional[Group]:
+        """Return the group at path key.
+
+        :param key: path of the group
+        :type key: PathKey
+        :returns: the group or None
+        :rtype: Optional[Group]
+        """
+        return self.groups.get(key)
+
+    def add_entry(self, key: PathKey, entry: Entry) -> None:
+        """Index a new entry.
+
+        :param key: path of the entry
+        :type key: PathKey
+        :param entry: the entry
+        :type entry: Entry
+        """
+        self.entries.setdefault(key, entry)
+
+    def add_group(self, key: PathKey, group: Group) -> None:
+        """Index a new group.
+
+        :param key: path of the group
+        :type key: PathKey
+        :param group: the group
+        :type group: Group
+        """
+        self.groups.setdefault(key, group)
+
+    def drop_entry(self, key: PathKey, entry: Entry) -> None:
+        """Forget an entry that is about to be removed or renamed.
+
+        A sibling with the same title, if any, takes over the path.
+
+        :param key: path the entry is indexed under
+        :type key: PathKey
+        :param entry: the entry
+        :type entry: Entry
+        """
+        if self.entries.get(key) != entry:
+            return
+        del self.entries[key]  # noqa: WPS420
+        parent = entry._element.getparent()  # noqa: WPS437
+        if parent is None:
+            return
+        for sibling in parent.iterchildren(ENTRY_TAG):
+            if sibling is not entry._element:  # noqa: WPS437
+                if element_title(sibling) == key[-1]:
+                    self.entries[key] = Entry(element=sibling, kp=self._kpo)
+                    return
+
+    def drop_group(self, key: PathKey, group: Group) -> None:
+        """Forget a group that is about to be removed and everything below it.
+
+        Sibling groups with the same name, if any, are indexed again.
+
+        :param key: path of the group
+        :type key: PathKey
+        :param group: the group
+        :type group: Group
+        """
+        self._prune(key)
+        parent = group._element.getparent()  # noqa: WPS437
+        if parent is None or not key:
+            return
+        for sibling in parent.iterchildren(GROUP_TAG):
+            if sibling is not group._element:  # noqa: WPS437
+                if sibling.findtext("Name") == key[-1]:
+                    self._walk(sibling, key)
+
+    def _prune(self, key: PathKey) -> None:
+        depth = len(key)
+        for index in (self.entries, self.groups):
+            stale = [path for path in index if path[:depth] == key]
+            for path in stale:
+                del index[path]  # noqa: WPS420
+
+    def _walk(self, element: _Element, key: PathKey) -> None:
+        self.groups.setdefault(key, Group(element=element, kp=self._kpo))
+        for child in element:
+            if child.tag == ENTRY_TAG:
+                title = element_title(child)
+                if title is not None:
+                    self.entries.setdefault(
+                        key + (title,), Entry(element=child, kp=self._kpo)
+                    )
+            elif child.tag == GROUP_TAG:
+                name = child.findtext("Name")
+                if name is not None:
+                    self._walk(child, key + (name,))
+
+
+class AttributeIndex:
+    """Inverted indexes of entry tags, usernames and URL hosts.
+
+    Every index maps a term to the set of entry elements carrying it, so a
+    query intersects a few posting sets instead of reading every entry.
+    Expiring entries are also kept ordered by expiry time, so a time range
+    is found by bisection.
+    """
+
+    tags: dict[str, set[_Element]]
+    usernames: dict[str, set[_Element]]
+    hosts: dict[str, set[_Element]]
+    expiry_times: list[float]
+    expiry_elements: list[_Element]
+    _terms: dict[_Element, Terms]
+
+    def __init__(self) -> None:
+        """Construct an empty AttributeIndex."""
+        self.tags = {}
+        self.usernames = {}
+        self.hosts = {}
+        self.expiry_times = []
+        self.expiry_elements = []
+        self._terms = {}
+        self._kpo: Optional[PyKeePass] = None
+
+    def add(self, element: _Element) -> None:
+        """Index an entry element, replacing its previous terms.
+
+        :param element: Entry element
+        :type element: _Element
+        """
+        self.discard(element)
+        fields = element_fields(element)
+        tags = element.findtext("Tags")
+        terms: Terms = (
+            frozenset(tags.replace(",", ";").split(";")) if tags else frozenset(),
+            fields.get("UserName"),
+            url_host(fields.get("URL")),
+            self._expiry(element),
+        )
+        self._terms[element] = terms
+        for tag in terms[0]:
+            self.tags.setdefault(tag, set()).add(element)
+        if terms[1] is not None:
+            self.usernames.setdefault(terms[1], set()).add(element)
+        if terms[2] is not None:
+            self.hosts.setdefault(terms[2], set()).add(element)
+        if terms[3] is not None:
+            pos = bisect_right(self.expiry_times, terms[3])
+            self.expiry_times.insert(pos, terms[3])
+            self.expiry_elements.insert(pos, element)
+
+    def build(self, kpo: PyKeePass) -> None:
+        """(Re)build the indexes from all entries of a database.
+
+        :param kpo: opened KeePass database
+        :type kpo: PyKeePass
+        """
+        self._kpo = kpo
+        for index in (self.tags, self.usernames, self.hosts, self._terms):
+            index.clear()
+        self.expiry_times.clear()
+        self.expiry_elements.clear()
+        for element in entry_elements(kpo.root_group._element):  # noqa: WPS437
+            self.add(element)
+
+    def discard(self, element: _Element) -> None:
+        """Forget an entry element.
+
+        :param element: Entry element
+        :type element: _Element
+        """
+        terms = self._terms.pop(element, None)
+        if terms is None:
+            return
+        self._drop(self.tags, terms[0], element)
+        self._drop(self.usernames, () if terms[1] is None else (terms[1],), element)
+        self._drop(self.hosts, () if terms[2] is None else (terms[2],), element)
+        if terms[3] is not None:
+            lo = bisect_left(self.expiry_times, terms[3])
+            hi = bisect_right(self.expiry_times, terms[3], lo)
+            for pos in range(lo, hi):
+                if self.expiry_elements[pos] is element:
+                    del self.expiry_times[pos]  # noqa: WPS420
+                    del self.expiry_elements[pos]  # noqa: WPS420
+                    break
+
+    def discard_tree(self, element: _Element) -> None:
+        """Forget all entry elements below a group element.
+
+        :param element: Group element
+        :type element: _Element
+        """
+        for child in entry_elements(element):
+            self.discard(child)
+
+    def expiring(self, start: float, end: float) -> list[Tuple[float, _Element]]:
+        """Return the entries expiring in a time range, soonest first.
+
+        :param start: lower bound, POSIX timestamp inclusive
+        :type start: float
+        :param end: upper bound, POSIX timestamp inclusive
+        :type end: float
+        :returns: expiry timestamps and entry elements
+        :rtype: list[Tuple[float, _Element]]
+        """
+        lo = bisect_left(self.expiry_times, start)
+        hi = bisect_right(self.expiry_times, end, lo)
+        return list(zip(self.expiry_times[lo:hi], self.expiry_elements[lo:hi]))
+
+    def query(
+        self,
+        tags: Iterable[str] = (),
+        username: Optional[str] = None,
+        host: Optional[str] = None,
+    ) -> Optional[set[_Element]]:
+        """Return the entry elements matching every given criterion.
+
+        :param tags: tags the entries must all carry
+        :type tags: Iterable[str]
+        :param username: exact username
+        :type username: Optional[str]
+        :param host: host name of the URL, case insensitive
+        :type host: Optional[str]
+        :returns: matching elements or None when no criterion was given
+        :rtype: Optional[set[_Element]]
+        """
+        postings = [self.tags.get(tag, set()) for tag in tags]
+        if username is not None:
+            postings.append(self.usernames.get(username, set()))
+        if host is not None:
+            postings.append(self.hosts.get(host.lower(), set()))
+        if not postings:
+            return None
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _expiry(self, element: _Element) -> Optional[float]:
+        times = element.find("Times")
+        if times is None or times.findtext("Expires") != "True":
+            return None
+        text = times.findtext("ExpiryTime")
+        if not text or self._kpo is None:
+            return None
+        expiry: datetime = self._kpo._decode_time(text)  # noqa: WPS437
+        return expiry.timestamp()
+
+    def _drop(
+        self, index: dict[str, set[_Element]], terms: Iterable[str], element: _Element
+    ) -> None:
+        for term in terms:
+            posting = index.get(term)
+            if posting is not None:
+                posting.discard(element)
+                if not posting:
+                    del index[term]  # noqa: WPS420
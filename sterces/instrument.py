@@ -0,0 +1,138 @@
+"""Instrument module for package sterces."""
+
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+from types import TracebackType
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from loguru import logger
+
+SpanHook = Callable[[str, float], None]
+
+# hook called with the span name and its duration in seconds
+SPAN_HOOK: ContextVar[Optional[SpanHook]] = ContextVar("SPAN_HOOK", default=None)
+NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class SpanStats(NamedTuple):
+    """Summary of the spans recorded under one name.
+
+    :ivar calls: number of spans
+    :vartype calls: int
+    :ivar total: total duration in seconds
+    :vartype total: float
+    :ivar max: longest duration in seconds
+    :vartype max: float
+    """
+
+    calls: int
+    total: float
+    max: float
+
+
+@contextmanager
+def span_hook(hook: SpanHook) -> Iterator[SpanHook]:
+    """Call hook for every span finished in the current context.
+
+    Spans are timed while a hook is installed even when the database was
+    not opened with ``instrument=True``.
+
+    :param hook: callable receiving the span name and duration in seconds
+    :type hook: SpanHook
+    :yields: the installed hook
+    :ytype: SpanHook
+    """
+    token = SPAN_HOOK.set(hook)
+    try:
+        yield hook
+    finally:
+        SPAN_HOOK.reset(token)
+
+
+class Instrument:
+    """Timing spans of the hot paths of a database.
+
+    When disabled and no hook is installed, span returns a shared no-op
+    context manager, so an uninstrumented database pays one attribute test
+    and one context variable read per span.
+
+    :param enabled: record span statistics
+    :type enabled: bool
+    """
+
+    enabled: bool
+    _stats: dict[str, list[float]]
+
+    def __init__(self, enabled: bool = False) -> None:
+        """Construct an Instrument class."""
+        self.enabled = enabled
+        self._stats = {}
+
+    def record(self, name: str, duration: float) -> None:
+        """Record a finished span.
+
+        :param name: span name
+        :type name: str
+        :param duration: duration in seconds
+        :type duration: float
+        """
+        if self.enabled:
+            stat = self._stats.get(name)
+            if stat is None:
+                self._stats[name] = [1, duration, duration]
+            else:
+                stat[0] += 1
+                stat[1] += duration
+                stat[2] = max(stat[2], duration)
+        hook = SPAN_HOOK.get()
+        if hook is not None:
+            hook(name, duration)
+        logger.debug("span {0} took {1:.6f}s".format(name, duration))
+
+    def reset(self) -> None:
+        """Forget all recorded statistics."""
+        self._stats.clear()
+
+    def span(self, name: str) -> AbstractContextManager[None]:
+        """Return a context manager timing the enclosed block.
+
+        :param name: span name
+        :type name: str
+        :returns: timing context manager or a no-op one when disabled
+        :rtype: AbstractContextManager[None]
+        """
+        if not self.enabled and SPAN_HOOK.get() is None:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def stats(self) -> dict[str, SpanStats]:
+        """Return the recorded statistics keyed by span name.
+
+        :returns: calls, total and max duration of every span name
+        :rtype: dict[str, SpanStats]
+        """
+        return {
+            name: SpanStats(int(stat[0]), stat[1], stat[2])
+            for name, stat in self._stats.items()
+        }
+
+
+class _Span(AbstractContextManager[None]):
+    __slots__ = ("_instrument", "_name", "_start")
+
+    def __init__(self, instrument: Instrument, name: str) -> None:
+        self._instrument = instrument
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self._instrument.record(self._name, perf_counter() - self._start)
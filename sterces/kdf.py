@@ -0,0 +1,337 @@
+"""Kdf module for package sterces."""
+
+# mypy: disable-error-code="explicit-any"
+
+import argparse
+import io
+import os
+import sys
+from time import perf_counter
+from typing import Any, NamedTuple, Optional, Tuple
+
+from argon2.low_level import Type, hash_secret_raw
+from pykeepass.kdbx_parsing.common import aes_kdf  # type: ignore[import-untyped]
+from pykeepass.kdbx_parsing.kdbx4 import kdf_uuids  # type: ignore[import-untyped]
+from pykeepass.pykeepass import (  # type: ignore[import-untyped]
+    BLANK_DATABASE_LOCATION,
+    BLANK_DATABASE_PASSWORD,
+    PyKeePass,
+)
+
+ARGON2D = "argon2d"
+ARGON2ID = "argon2id"
+AESKDF = "aeskdf"
+KDFS = {
+    ARGON2D: kdf_uuids["argon2"],
+    ARGON2ID: kdf_uuids["argon2id"],
+    AESKDF: kdf_uuids["aeskdf"],
+}
+ARGON2_VERSION = 19
+DEFAULT_TARGET = 0.2
+DEFAULT_MEMORY = 64 * 2**20
+DEFAULT_PARALLELISM = 2
+MIN_MEMORY = 8 * 2**20
+# AES-KDF rounds of the probe derivation
+AES_PROBE = 10000
+
+
+class KdfParams(NamedTuple):
+    """Key derivation parameters of a KDBX 4 database.
+
+    :ivar kdf: argon2d, argon2id or aeskdf
+    :ivar iterations: Argon2 iterations or AES-KDF rounds
+    :ivar memory: Argon2 memory in bytes, 0 for AES-KDF
+    :ivar parallelism: Argon2 lanes, 0 for AES-KDF
+    """
+
+    kdf: str
+    iterations: int
+    memory: int = 0
+    parallelism: int = 0
+
+    def __str__(self) -> str:
+        """Return the parameters for humans."""
+        if self.kdf == AESKDF:
+            return "{0} rounds={1}".format(self.kdf, self.iterations)
+        return "{0} iterations={1} memory={2}MiB parallelism={3}".format(
+            self.kdf, self.iterations, self.memory // 2**20, self.parallelism
+        )
+
+
+class KdfTimings(NamedTuple):
+    """Seconds to open and to save a database without a transformed key.
+
+    :ivar open: seconds to open, the unlock latency
+    :ivar save: seconds to save
+    """
+
+    open: float
+    save: float
+
+
+class RekeyReport(NamedTuple):
+    """Parameters and timings of a database before and after a rekey.
+
+    :ivar old_params: parameters before
+    :ivar new_params: parameters after
+    :ivar old_timings: timings before
+    :ivar new_timings: timings after
+    """
+
+    old_params: KdfParams
+    new_params: KdfParams
+    old_timings: KdfTimings
+    new_timings: KdfTimings
+
+
+def measure(params: KdfParams) -> float:
+    """Return the seconds one key derivation with params takes here.
+
+    :param params: key derivation parameters
+    :type params: KdfParams
+    :returns: seconds
+    :rtype: float
+    """
+    secret = os.urandom(32)
+    salt = os.urandom(32)
+    start = perf_counter()
+    if params.kdf == AESKDF:
+        aes_kdf(salt, params.iterations, secret)
+    else:
+        hash_secret_raw(
+            secret=secret,
+            salt=salt,
+            time_cost=params.iterations,
+            memory_cost=params.memory // 1024,
+            parallelism=params.parallelism,
+            hash_len=32,
+            type=Type.ID if params.kdf == ARGON2ID else Type.D,
+            version=ARGON2_VERSION,
+        )
+    return perf_counter() - start
+
+
+def calibrate(
+    target: float = DEFAULT_TARGET,
+    memory_cap: int = DEFAULT_MEMORY,
+    kdf: str = ARGON2ID,
+    parallelism: int = DEFAULT_PARALLELISM,
+) -> KdfParams:
+    """Return the parameters whose key derivation takes about target here.
+
+    Argon2 uses as much memory as the cap allows, halved while a single
+    iteration is slower than target, then as many iterations as fit from the
+    cost of one more pass. AES-KDF scales the rounds of a probe derivation.
+
+    :param target: seconds one derivation should take
+    :type target: float
+    :param memory_cap: most Argon2 memory in bytes
+    :type memory_cap: int
+    :param kdf: argon2d, argon2id or aeskdf
+    :type kdf: str
+    :param parallelism: Argon2 lanes
+    :type parallelism: int
+    :raises ValueError: When kdf is invalid or memory_cap is below MIN_MEMORY
+    :returns: calibrated parameters
+    :rtype: KdfParams
+    """
+    if kdf not in KDFS:
+        raise ValueError(
+            "Invalid kdf '{0}' not one of ({1}).".format(kdf, ",".join(KDFS))
+        )
+    if kdf == AESKDF:
+        elapsed = measure(KdfParams(kdf, AES_PROBE))
+        return KdfParams(kdf, max(AES_PROBE, int(AES_PROBE * target / elapsed)))
+    if memory_cap < MIN_MEMORY:
+        raise ValueError(
+            "Invalid memory cap {0}, below {1} bytes.".format(memory_cap, MIN_MEMORY)
+        )
+    memory = memory_cap // 1024 * 1024
+    # the best of two runs, the first one also pays for the page faults
+    one = min(measure(KdfParams(kdf, 1, memory, parallelism)) for _ in range(2))
+    while one > target and memory > MIN_MEMORY:
+        memory //= 2
+        one = measure(KdfParams(kdf, 1, memory, parallelism))
+    # every further iteration costs one pass over the memory
+    per_pass = max(measure(KdfParams(kdf, 2, memory, parallelism)) - one, 1e-6)
+    params = KdfParams(
+        kdf, max(1, round((target - one) / per_pass) + 1), memory, parallelism
+    )
+    elapsed = measure(params)
+    if elapsed > target * 1.25 and params.iterations > 1:
+        params = params._replace(
+            iterations=max(1, int(params.iterations * target / elapsed))
+        )
+    return params
+
+
+def read_params(kpo: PyKeePass) -> KdfParams:
+    """Return the key derivation parameters of a database.
+
+    :param kpo: open database
+    :type kpo: PyKeePass
+    :returns: key derivation parameters
+    :rtype: KdfParams
+    """
+    data = _kdf_data(kpo)
+    kdf = _kdf_name(data)
+    if kdf == AESKDF:
+        return KdfParams(kdf, data["R"].value)
+    return KdfParams(kdf, data["I"].value, data["M"].value, data["P"].value)
+
+
+def write_params(kpo: PyKeePass, params: KdfParams) -> None:
+    """Set the key derivation parameters used by the next save.
+
+    The next save must derive the key again, a transformed key of the old
+    parameters does not open the saved file.
+
+    :param kpo: open database
+    :type kpo: PyKeePass
+    :param params: key derivation parameters
+    :type params: KdfParams
+    :raises ValueError: When switching between Argon2 and AES-KDF
+    """
+    data = _kdf_data(kpo)
+    if (_kdf_name(data) == AESKDF) != (params.kdf == AESKDF):
+        raise ValueError("Cannot switch between Argon2 and AES-KDF")
+    if params.kdf == AESKDF:
+        data["R"].value = params.iterations
+        return
+    data["$UUID"].value = KDFS[params.kdf]
+    data["I"].value = params.iterations
+    data["M"].value = params.memory
+    data["P"].value = params.parallelism
+
+
+def create_database(
+    db_fn: str, password: str, key_fn: Optional[str], params: KdfParams
+) -> PyKeePass:
+    """Create a database with the given key derivation parameters.
+
+    Same as pykeepass create_database, with the parameters set before the
+    first save.
+
+    :param db_fn: path of the database to create
+    :type db_fn: str
+    :param password: passphrase
+    :type password: str
+    :param key_fn: path of a key file
+    :type key_fn: Optional[str]
+    :param params: key derivation parameters
+    :type params: KdfParams
+    :returns: the open database
+    :rtype: PyKeePass
+    """
+    kpo = PyKeePass(BLANK_DATABASE_LOCATION, BLANK_DATABASE_PASSWORD)
+    kpo.filename = db_fn
+    kpo.password = password
+    kpo.keyfile = key_fn or None
+    write_params(kpo, params)
+    kpo.save()
+    return kpo
+
+
+def time_open(
+    db_fn: str, password: Optional[str], key_fn: Optional[str]
+) -> Tuple[float, PyKeePass]:
+    """Time an open of a database deriving the key, the unlock latency.
+
+    :param db_fn: path of the database
+    :type db_fn: str
+    :param password: passphrase
+    :type password: Optional[str]
+    :param key_fn: path of a key file
+    :type key_fn: Optional[str]
+    :returns: seconds and the open database
+    :rtype: Tuple[float, PyKeePass]
+    """
+    start = perf_counter()
+    kpo = PyKeePass(db_fn, password, key_fn)
+    return perf_counter() - start, kpo
+
+
+def time_save(kpo: PyKeePass) -> float:
+    """Time a save of a database deriving the key, written to memory.
+
+    The save rotates the KDF salt of kpo, only its file stays valid.
+
+    :param kpo: open database
+    :type kpo: PyKeePass
+    :returns: seconds
+    :rtype: float
+    """
+    start = perf_counter()
+    kpo.save(io.BytesIO())
+    return perf_counter() - start
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Calibrate the key derivation and optionally rekey a database.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: Optional[list[str]]
+    :returns: return code
+    :rtype: int
+    """
+    from sterces.constants import DEFAULT_DB_FN, DEFAULT_PWD_FN  # noqa: WPS433
+    from sterces.db import StercesDatabase  # noqa: WPS433
+
+    parser = argparse.ArgumentParser(
+        prog="sterces.kdf", description="calibrate the key derivation"
+    )
+    parser.add_argument(
+        "--target", type=float, default=DEFAULT_TARGET, help="unlock seconds"
+    )
+    parser.add_argument(
+        "--memory",
+        type=int,
+        default=DEFAULT_MEMORY // 2**20,
+        help="most Argon2 memory in MiB",
+    )
+    parser.add_argument("--kdf", choices=list(KDFS), default=ARGON2ID)
+    parser.add_argument(
+        "--rekey", action="store_true", help="apply the parameters to the database"
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_FN, help="database file")
+    parser.add_argument("--pwd", default=DEFAULT_PWD_FN, help="passphrase file")
+    parser.add_argument("--key", default="", help="key file")
+    args = parser.parse_args(argv)
+    if not args.rekey:
+        params = calibrate(args.target, args.memory * 2**20, args.kdf)
+        print("{0} ({1:.3f}s)".format(params, measure(params)))  # noqa: WPS421
+        return 0
+    with StercesDatabase(db_fn=args.db, pwd_fn=args.pwd, key_fn=args.key) as db:
+        report = db.rekey(args.target, args.memory * 2**20)
+    _print_report(report)
+    return 0
+
+
+def _kdf_data(kpo: PyKeePass) -> Any:
+    if kpo.version < (4, 0):
+        raise ValueError("Key derivation parameters need a KDBX 4 database")
+    return kpo.kdbx.header.value.dynamic_header.kdf_parameters.data.dict
+
+
+def _kdf_name(data: Any) -> str:
+    ident = data["$UUID"].value
+    for name, uuid in KDFS.items():
+        if uuid == ident:
+            return name
+    raise ValueError("Unsupported key derivation")
+
+
+def _print_report(report: RekeyReport) -> None:
+    for label, params, timings in (
+        ("before", report.old_params, report.old_timings),
+        ("after", report.new_params, report.new_timings),
+    ):
+        print(  # noqa: WPS421
+            "{0:<7} {1}  open {2:.3f}s  save {3:.3f}s".format(
+                label, params, timings.open, timings.save
+            )
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Keycache module for package sterces."""
+
+import base64
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from loguru import logger
+
+KDBX_SIGNATURE = b"\x03\xd9\xa2\x9a\x67\xfb\x4b\xb5"
+# header fields holding the key derivation parameters
+KDF_FIELDS = {3: frozenset((5, 6)), 4: frozenset((11,))}  # noqa: WPS432
+HEADER_END = 0
+
+
+def kdf_fingerprint(db_fn: str) -> Optional[str]:
+    """Return a digest of the key derivation parameters of a database.
+
+    Only the plaintext outer header is read, so this costs one small read and
+    no key derivation. The digest changes whenever the KDF algorithm, its
+    cost parameters or its salt change.
+
+    :param db_fn: path of the database
+    :type db_fn: str
+    :returns: hex digest or None when the file is not a KDBX database
+    :rtype: Optional[str]
+    """
+    try:
+        with open(db_fn, "rb") as fd:
+            if fd.read(8) != KDBX_SIGNATURE:  # noqa: WPS432
+                return None
+            _, major = struct.unpack("<HH", fd.read(4))
+            wanted = KDF_FIELDS.get(major)
+            if wanted is None:
+                return None
+            return _header_digest(fd, wanted, "<I" if major >= 4 else "<H")
+    except (OSError, IndexError, struct.error):
+        return None
+
+
+def cache_binding(db_fn: str, key_fn: Optional[str]) -> str:
+    """Return a digest of the database and key file a cached key belongs to.
+
+    Only the paths are bound, never the passphrase: a digest of the
+    passphrase next to the transformed key would let anyone who reads the
+    cache test guesses at hash speed instead of key derivation speed. A new
+    master key is saved with a new KDF salt, which changes the fingerprint,
+    and a rejected key falls back to the full key derivation.
+
+    :param db_fn: path of the database
+    :type db_fn: str
+    :param key_fn: path of the key file
+    :type key_fn: Optional[str]
+    :returns: hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256(str(Path(db_fn).resolve()).encode("utf-8"))
+    if key_fn:
+        digest.update(b"\0")
+        digest.update(str(Path(key_fn).resolve()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class KeyCache:
+    """On disk cache of the transformed key of one database.
+
+    The transformed key is the output of the key derivation function, the
+    expensive part of opening a database. With a cached key later opens skip
+    the KDF entirely. The cache is only used while the KDF parameters in the
+    database header, the database and the key file are unchanged. Anyone who
+    can read the cache can open the database, it is written with mode 0600.
+
+    :param cache_fn: path of the cache file
+    :type cache_fn: str
+    """
+
+    cache_fn: str
+
+    def __init__(self, cache_fn: str) -> None:
+        """Construct a KeyCache class."""
+        self.cache_fn = cache_fn
+
+    @classmethod
+    def default_fn(cls, db_fn: str) -> str:
+        """Return the default cache file for a database.
+
+        :param db_fn: path of the database
+        :type db_fn: str
+        :returns: path of the cache file next to the database
+        :rtype: str
+        """
+        dp = Path(db_fn)
+        return str(dp.parent / ".{0}.tfk".format(dp.name))
+
+    def discard(self) -> None:
+        """Remove the cache file."""
+        Path(self.cache_fn).unlink(missing_ok=True)
+
+    def load(self, db_fn: str, key_fn: Optional[str]) -> Optional[bytes]:
+        """Return the cached transformed key when it is still valid.
+
+        :param db_fn: path of the database
+        :type db_fn: str
+        :param key_fn: path of the key file
+        :type key_fn: Optional[str]
+        :returns: transformed key or None
+        :rtype: Optional[bytes]
+        """
+        try:
+            with open(self.cache_fn) as fd:
+                cached = json.load(fd)
+            tf_key = base64.b64decode(cached["key"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if cached.get("kdf") != kdf_fingerprint(db_fn):
+            logger.debug("kdf parameters changed, discarding transformed key")
+            self.discard()
+            return None
+        if cached.get("binding") != cache_binding(db_fn, key_fn):
+            logger.debug("database or key file changed, discarding transformed key")
+            self.discard()
+            return None
+        return tf_key
+
+    def save(self, db_fn: str, tf_key: bytes, key_fn: Optional[str]) -> None:
+        """Write the transformed key to the cache file with mode 0600.
+
+        :param db_fn: path of the database
+        :type db_fn: str
+        :param tf_key: transformed key
+        :type tf_key: bytes
+        :param key_fn: path of the key file
+        :type key_fn: Optional[str]
+        """
+        cached = {
+            "kdf": kdf_fingerprint(db_fn),
+            "binding": cache_binding(db_fn, key_fn),
+            "key": base64.b64encode(tf_key).decode("ascii"),
+        }
+        tmp_fn = "{0}.tmp".format(self.cache_fn)
+        Path(tmp_fn).unlink(missing_ok=True)
+        fd = os.open(tmp_fn, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(cached, tmp)
+        os.replace(tmp_fn, self.cache_fn)
+
+
+def _header_digest(fd: BinaryIO, wanted: frozenset[int], size_fmt: str) -> str:
+    digest = hashlib.sha256()
+    size_len = struct.calcsize(size_fmt)
+    while True:
+        field = fd.read(1)[0]
+        (size,) = struct.unpack(size_fmt, fd.read(size_len))
+        data = fd.read(size)
+        if field == HEADER_END:
+            return digest.hexdigest()
+        if field in wanted:
+            digest.update(bytes((field,)) + data)
@@ -0,0 +1,79 @@
+"""Otp module for package sterces."""
+
+from typing import Optional
+
+import pyotp
+
+
+class OtpCache:
+    """Parsed TOTP objects keyed by their otpauth URI.
+
+    Each URI is parsed once. The last code generated for a URI is kept
+    with its time step, so polling every entry once per step computes
+    every HMAC once. Changing the secret changes the URI, the old one is
+    dropped with discard.
+    """
+
+    _totps: dict[str, pyotp.TOTP]
+    _codes: dict[str, tuple[int, str]]
+
+    def __init__(self) -> None:
+        """Construct an OtpCache class."""
+        self._totps = {}
+        self._codes = {}
+
+    def __len__(self) -> int:
+        """Return the number of cached TOTP objects."""
+        return len(self._totps)
+
+    def clear(self) -> None:
+        """Forget all cached objects and codes."""
+        self._totps.clear()
+        self._codes.clear()
+
+    def code(self, uri: str, for_time: float) -> str:
+        """Return the code of the time step holding for_time.
+
+        :param uri: otpauth URI
+        :type uri: str
+        :param for_time: POSIX timestamp
+        :type for_time: float
+        :returns: the one time password
+        :rtype: str
+        """
+        totp = self.totp(uri)
+        counter = int(for_time // totp.interval)
+        cached = self._codes.get(uri)
+        if cached is not None and cached[0] == counter:
+            return cached[1]
+        code = totp.generate_otp(counter)
+        self._codes[uri] = (counter, code)
+        return code
+
+    def discard(self, uri: Optional[str]) -> None:
+        """Drop the object and code of a URI.
+
+        :param uri: otpauth URI
+        :type uri: Optional[str]
+        """
+        if uri is not None:
+            self._totps.pop(uri, None)
+            self._codes.pop(uri, None)
+
+    def totp(self, uri: str) -> pyotp.TOTP:
+        """Return the TOTP object of a URI, parsing it on first use.
+
+        :param uri: otpauth URI
+        :type uri: str
+        :raises ValueError: When the URI is not a TOTP otpauth URI
+        :returns: TOTP object
+        :rtype: pyotp.TOTP
+        """
+        totp = self._totps.get(uri)
+        if totp is None:
+            parsed = pyotp.parse_uri(uri)
+            if not isinstance(parsed, pyotp.TOTP):
+                raise ValueError("Not a TOTP otpauth URI")
+            totp = parsed
+            self._totps[uri] = totp
+        return totp
@@ -0,0 +1,183 @@
+"""Pool module for package sterces."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Mapping, Optional, Tuple, Union
+
+from loguru import logger
+from pykeepass.pykeepass import PyKeePass  # type: ignore[import-untyped]
+
+from sterces.constants import DEFAULT_DB_FN, DEFAULT_PWD_FN
+from sterces.db import ENTRY_NOT_EXIST, USERNAME, StercesDatabase
+
+VaultConfig = Mapping[str, Union[bool, int, float, str, bytes]]
+# database, passphrase and key file of one key derivation
+DerivationJob = Tuple[str, str, Optional[str]]
+
+
+def derive_transformed_key(db_fn: str, pwd_fn: str, key_fn: Optional[str]) -> bytes:
+    """Run the key derivation of a database and return the transformed key.
+
+    Only the header is read and the KDF computed, the payload is neither
+    decrypted nor parsed. Runs in a worker process of DatabasePool.
+
+    :param db_fn: path of the database
+    :type db_fn: str
+    :param pwd_fn: path of the passphrase file
+    :type pwd_fn: str
+    :param key_fn: path of the key file
+    :type key_fn: Optional[str]
+    :returns: transformed key
+    :rtype: bytes
+    """
+    with open(pwd_fn) as fd:
+        password = fd.readline().strip()
+    kpo = PyKeePass(db_fn, password, key_fn or None, decrypt=False)
+    tf_key: bytes = kpo.transformed_key
+    return tf_key
+
+
+class DatabasePool:
+    """Registry of several databases opened in parallel.
+
+    The key derivation of every database that is not open yet runs in a
+    process pool, then the databases are opened in this process with their
+    transformed keys, which leaves only decryption and parsing. Open
+    databases are cached until closed. Lookups search the databases in
+    the order of configs, the first database holding the entry wins.
+
+    :param configs: StercesDatabase keyword arguments keyed by name
+    :type configs: Mapping[str, VaultConfig]
+    :param max_workers: maximum number of worker processes
+    :type max_workers: Optional[int]
+    """
+
+    configs: dict[str, VaultConfig]
+    max_workers: Optional[int]
+    _open: dict[str, StercesDatabase]
+
+    def __init__(
+        self, configs: Mapping[str, VaultConfig], max_workers: Optional[int] = None
+    ) -> None:
+        """Construct a DatabasePool class."""
+        self.configs = dict(configs)
+        self.max_workers = max_workers
+        self._open = {}
+
+    @property
+    def names(self) -> list[str]:
+        """Return the database names in precedence order."""
+        return list(self.configs)
+
+    def close(self, name: Optional[str] = None) -> None:
+        """Save pending changes and drop cached databases.
+
+        :param name: database to close, defaults to all
+        :type name: Optional[str]
+        """
+        for key in [name] if name else list(self._open):
+            database = self._open.pop(key, None)
+            if database is not None:
+                database.close()
+
+    def get(self, name: str) -> StercesDatabase:
+        """Return the open database, opening it when necessary.
+
+        :param name: database name
+        :type name: str
+        :returns: open database
+        :rtype: StercesDatabase
+        """
+        return self.open([name])[name]
+
+    def locate(self, path: str) -> Optional[str]:
+        """Return the name of the first database holding an entry.
+
+        :param path: path of the entry
+        :type path: str
+        :returns: database name or None when no database holds the entry
+        :rtype: Optional[str]
+        """
+        missing = ENTRY_NOT_EXIST.format(path)
+        for name in self.names:
+            found = self.get(name).lookup_many([(path, USERNAME)])
+            if found[path][USERNAME].error != missing:
+                return name
+        return None
+
+    def lookup(self, path: str, attr: str) -> Optional[str]:
+        """Return the attribute of the entry in the first database holding it.
+
+        :param path: path of the entry
+        :type path: str
+        :param attr: attribute to lookup
+        :type attr: str
+        :returns: value of found attribute or None
+        :rtype: Optional[str]
+        """
+        missing = ENTRY_NOT_EXIST.format(path)
+        for name in self.names:
+            found = self.get(name).lookup_many([(path, attr)])[path][attr]
+            if found.error == missing:
+                continue
+            if found.error:
+                logger.error(found.error)
+            return found.value
+        logger.error(missing)
+        return None
+
+    def open(self, names: Optional[Iterable[str]] = None) -> dict[str, StercesDatabase]:
+        """Open databases, deriving their keys in parallel.
+
+        :param names: databases to open, defaults to all
+        :type names: Optional[Iterable[str]]
+        :raises ValueError: When a name is not configured
+        :returns: open databases keyed by name
+        :rtype: dict[str, StercesDatabase]
+        """
+        wanted = list(names) if names is not None else self.names
+        for name in wanted:
+            if name not in self.configs:
+                raise ValueError("Unknown database: {0}".format(name))
+        pending = [name for name in wanted if name not in self._open]
+        tf_keys = self._derive_keys(pending)
+        for name in pending:
+            kwargs = dict(self.configs[name])
+            if name in tf_keys:
+                kwargs["tf_key"] = tf_keys[name]
+            self._open[name] = StercesDatabase(**kwargs)
+        return {name: self._open[name] for name in wanted}
+
+    def _derivation_jobs(self, names: list[str]) -> dict[str, DerivationJob]:
+        jobs = {}
+        for name in names:
+            config = self.configs[name]
+            # a given or cached key needs no derivation, a new one no key
+            if config.get("tf_key") or config.get("tf_cache"):
+                continue
+            db_fn = str(config.get("db_fn", DEFAULT_DB_FN))
+            if os.path.exists(db_fn):
+                jobs[name] = (
+                    db_fn,
+                    str(config.get("pwd_fn", DEFAULT_PWD_FN)),
+                    str(config.get("key_fn", "")) or None,
+                )
+        return jobs
+
+    def _derive_keys(self, names: list[str]) -> dict[str, bytes]:
+        jobs = self._derivation_jobs(names)
+        if len(jobs) < 2:
+            return {}
+        workers = min(len(jobs), self.max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(derive_transformed_key, *job)
+                for name, job in jobs.items()
+            }
+        tf_keys = {}
+        for name, future in futures.items():
+            try:
+                tf_keys[name] = future.result()
+            except Exception as ex:  # noqa: B902 - open reports the error
+                logger.debug("key derivation of {0} failed: {1}".format(name, ex))
+        return tf_keys
@@ -0,0 +1,236 @@
+"""Render module for package sterces."""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from typing import IO, Iterator, Mapping, NoReturn, Optional, Tuple
+
+from sterces.constants import DEFAULT_DB_FN, DEFAULT_PWD_FN
+from sterces.db import ATTRIBUTES, PASSWORD, StercesDatabase
+
+Reference = Tuple[str, str]
+
+CHUNK_SIZE = 65536
+# a placeholder longer than this is not one, it is copied as text
+MAX_PLACEHOLDER = 4096
+PLACEHOLDER = re.compile(r"\{\{\s*(/[^#{}]*?)\s*(?:#\s*(\w+)\s*)?\}\}")
+
+
+def parse_reference(text: str) -> Reference:
+    """Split a ``/path#attr`` reference, the attribute defaults to password.
+
+    :param text: reference
+    :type text: str
+    :raises ValueError: When the attribute is invalid
+    :returns: path and attribute
+    :rtype: Reference
+    """
+    path, _, attr = text.strip().partition("#")
+    attr = attr.strip() or PASSWORD
+    if attr not in ATTRIBUTES:
+        raise ValueError("Invalid attribute in reference: {0}".format(text))
+    return path.strip(), attr
+
+
+def collect_references(source: IO[str], chunk_size: int = CHUNK_SIZE) -> set[Reference]:
+    """Return the distinct references of a template, read in chunks.
+
+    :param source: template
+    :type source: IO[str]
+    :param chunk_size: characters read at a time
+    :type chunk_size: int
+    :returns: referenced paths and attributes
+    :rtype: set[Reference]
+    """
+    refs: set[Reference] = set()
+    for chunk in _chunks(source, chunk_size):
+        for match in PLACEHOLDER.finditer(chunk):
+            refs.add(_match_reference(match))
+    return refs
+
+
+def resolve(database: StercesDatabase, refs: set[Reference]) -> dict[Reference, str]:
+    """Resolve every reference in a single lookup_many pass.
+
+    Unset attributes resolve to an empty string.
+
+    :param database: open database
+    :type database: StercesDatabase
+    :param refs: paths and attributes
+    :type refs: set[Reference]
+    :raises ValueError: When a reference cannot be resolved
+    :returns: values keyed by reference
+    :rtype: dict[Reference, str]
+    """
+    found = database.lookup_many(sorted(refs))
+    errors = sorted(
+        str(found[path][attr].error) for path, attr in refs if found[path][attr].error
+    )
+    if errors:
+        raise ValueError("Unresolved references: {0}".format("; ".join(errors)))
+    return {(path, attr): found[path][attr].value or "" for path, attr in refs}
+
+
+def render(
+    database: StercesDatabase,
+    source: IO[str],
+    sink: IO[str],
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Render a template, replacing ``{{ /path#attr }}`` with secrets.
+
+    The seekable source is read twice in chunks: once to collect the
+    references, which are then resolved together, and once to write the
+    output. Nothing is written when a reference cannot be resolved.
+
+    :param database: open database
+    :type database: StercesDatabase
+    :param source: seekable template
+    :type source: IO[str]
+    :param sink: text file object receiving the output
+    :type sink: IO[str]
+    :param chunk_size: characters read at a time
+    :type chunk_size: int
+    :returns: number of distinct references
+    :rtype: int
+    """
+    start = source.tell()
+    secrets = resolve(database, collect_references(source, chunk_size))
+    source.seek(start)
+    for chunk in _chunks(source, chunk_size):
+        sink.write(
+            PLACEHOLDER.sub(lambda match: secrets[_match_reference(match)], chunk)
+        )
+    return len(secrets)
+
+
+def resolve_env(
+    database: StercesDatabase, mapping: Mapping[str, str]
+) -> dict[str, str]:
+    """Resolve a mapping of environment variable to ``/path#attr``.
+
+    :param database: open database
+    :type database: StercesDatabase
+    :param mapping: references keyed by variable name
+    :type mapping: Mapping[str, str]
+    :returns: values keyed by variable name
+    :rtype: dict[str, str]
+    """
+    refs = {name: parse_reference(ref) for name, ref in mapping.items()}
+    secrets = resolve(database, set(refs.values()))
+    return {name: secrets[ref] for name, ref in refs.items()}
+
+
+def exec_with_env(
+    database: StercesDatabase, mapping: Mapping[str, str], argv: list[str]
+) -> NoReturn:
+    """Replace this process by a command with secrets in its environment.
+
+    :param database: open database
+    :type database: StercesDatabase
+    :param mapping: references keyed by variable name
+    :type mapping: Mapping[str, str]
+    :param argv: command and its arguments
+    :type argv: list[str]
+    :raises ValueError: When no command is given
+    """
+    if not argv:
+        raise ValueError("No command to run")
+    env = dict(os.environ)
+    env.update(resolve_env(database, mapping))
+    os.execvpe(argv[0], argv, env)  # noqa: S606
+
+
+def main(argv: Optional[list[str]] = None) -> int:  # noqa: WPS213
+    """Render a template or run a command with secrets in its environment.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: Optional[list[str]]
+    :returns: return code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(
+        prog="sterces.render",
+        description="render secrets into a template or a command environment",
+    )
+    parser.add_argument("--db", default=DEFAULT_DB_FN, help="database file")
+    parser.add_argument("--pwd", default=DEFAULT_PWD_FN, help="passphrase file")
+    parser.add_argument("--key", default="", help="key file")
+    parser.add_argument(
+        "--agent", action="store_true", help="use a running agent when available"
+    )
+    parser.add_argument("-t", "--template", help="template file, - for stdin")
+    parser.add_argument("-o", "--output", help="output file, defaults to stdout")
+    parser.add_argument(
+        "-e",
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=/path#attr",
+        help="environment variable of the command",
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.env and not args.command:
+        parser.error("-e/--env needs a command after --")
+    mapping = dict(item.partition("=")[::2] for item in args.env)
+    database = StercesDatabase(
+        db_fn=args.db, pwd_fn=args.pwd, key_fn=args.key, agent=args.agent
+    )
+    if args.template:
+        with _open_template(args.template) as source:
+            if args.output:
+                with open(args.output, "w") as sink:
+                    render(database, source, sink)
+            else:
+                render(database, source, sys.stdout)
+    if args.command:
+        command = args.command[1:] if args.command[0] == "--" else args.command
+        exec_with_env(database, mapping, command)
+    return 0
+
+
+def _chunks(source: IO[str], chunk_size: int) -> Iterator[str]:
+    carry = ""
+    while True:
+        text = source.read(chunk_size)
+        buffer = carry + text
+        if not text:
+            if buffer:
+                yield buffer
+            return
+        cut = _cut(buffer)
+        carry = buffer[cut:]
+        if cut:
+            yield buffer[:cut]
+
+
+def _cut(buffer: str) -> int:
+    # hold back a trailing placeholder start, so none is split in two
+    cut = buffer.rfind("{{")
+    if cut == -1 or "}}" in buffer[cut:]:
+        return len(buffer) - 1 if buffer.endswith("{") else len(buffer)
+    if len(buffer) - cut > MAX_PLACEHOLDER:
+        return len(buffer)
+    return cut
+
+
+def _match_reference(match: "re.Match[str]") -> Reference:
+    return parse_reference("{0}#{1}".format(match.group(1), match.group(2) or ""))
+
+
+def _open_template(fn: str) -> IO[str]:
+    if fn != "-":
+        return open(fn)
+    # the template is read twice, spool a non seekable stdin
+    spool = tempfile.TemporaryFile("w+")
+    shutil.copyfileobj(sys.stdin, spool)
+    spool.seek(0)
+    return spool
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Sync module for package sterces."""
+
+import hashlib
+import uuid
+from copy import deepcopy
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+from lxml.etree import _Element  # type: ignore[import-untyped]  # noqa: WPS450
+from pykeepass.entry import Entry  # type: ignore[import-untyped]
+from pykeepass.pykeepass import PyKeePass  # type: ignore[import-untyped]
+
+from sterces.index import ENTRY_TAG, PathKey
+from sterces.view import decode_time
+
+NEWER = "newer"
+THEIRS = "theirs"
+OURS = "ours"
+STRATEGIES = (NEWER, THEIRS, OURS)
+# children referring to the Meta of their own database are not copied
+FOREIGN_REFS = ("Binary", "CustomIconUUID")
+# fields of Times that are part of the entry content
+TIMES_FIELDS = ("Expires", "ExpiryTime", "LastModificationTime")
+
+
+class EntryPrint(NamedTuple):
+    """Content fingerprint of one entry.
+
+    :ivar digest: hash of the path, fields, tags, times and UUID
+    :ivar mtime: text of the last modification time
+    :ivar uuid: text of the UUID
+    :ivar element: Entry element
+    """
+
+    digest: bytes
+    mtime: Optional[str]
+    uuid: Optional[str]
+    element: _Element
+
+
+class DiffResult(NamedTuple):
+    """Entry paths that differ between two databases.
+
+    :ivar added: paths only the other database has
+    :ivar removed: paths only this database has
+    :ivar changed: paths both have with different fingerprints
+    """
+
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+
+
+def fingerprint(key: PathKey, element: _Element) -> EntryPrint:
+    """Return the fingerprint of an entry element in a single pass.
+
+    :param key: path of the entry
+    :type key: PathKey
+    :param element: Entry element
+    :type element: _Element
+    :returns: fingerprint of the entry
+    :rtype: EntryPrint
+    """
+    mtime = None
+    ident = None
+    fields = []
+    parts = list(key)
+    for child in element.iterchildren("UUID", "String", "Tags", "Times"):
+        if child.tag == "UUID":
+            ident = child.text
+        elif child.tag == "String":
+            # Key and Value, iterating is cheaper than findtext
+            fields.append("=".join([field.text or "" for field in child]))
+        elif child.tag == "Tags":
+            parts.append(child.text or "")
+        else:
+            mtime = _times_parts(child, parts)
+    # the order of the string fields is not part of the content
+    parts.extend(sorted(fields))
+    parts.append(ident or "")
+    digest = hashlib.blake2b("\0".join(parts).encode(), digest_size=16).digest()
+    return EntryPrint(digest, mtime, ident, element)
+
+
+def fingerprints(entries: Mapping[PathKey, Entry]) -> dict[PathKey, EntryPrint]:
+    """Return the fingerprint of every entry of a path index.
+
+    :param entries: entries keyed by path
+    :type entries: Mapping[PathKey, Entry]
+    :returns: fingerprints keyed by path
+    :rtype: dict[PathKey, EntryPrint]
+    """
+    return {
+        key: fingerprint(key, entry._element)  # noqa: WPS437
+        for key, entry in entries.items()
+    }
+
+
+def compare(
+    ours: Mapping[PathKey, EntryPrint], theirs: Mapping[PathKey, EntryPrint]
+) -> Tuple[list[PathKey], list[PathKey], list[PathKey]]:
+    """Compare two sets of fingerprints.
+
+    :param ours: fingerprints of this database
+    :type ours: Mapping[PathKey, EntryPrint]
+    :param theirs: fingerprints of the other database
+    :type theirs: Mapping[PathKey, EntryPrint]
+    :returns: sorted paths added, removed and changed
+    :rtype: Tuple[list[PathKey], list[PathKey], list[PathKey]]
+    """
+    changed = [
+        key
+        for key in ours.keys() & theirs.keys()
+        if ours[key].digest != theirs[key].digest
+    ]
+    return (
+        sorted(theirs.keys() - ours.keys()),
+        sorted(ours.keys() - theirs.keys()),
+        sorted(changed),
+    )
+
+
+def entry_copy(element: _Element, new_uuid: bool = False) -> _Element:
+    """Return a copy of an entry element to insert into another database.
+
+    References to binaries and custom icons of the source database are
+    dropped, they would point to the wrong attachment or icon.
+
+    :param element: Entry element
+    :type element: _Element
+    :param new_uuid: give the copy and its history a new UUID
+    :type new_uuid: bool
+    :returns: detached copy of the element
+    :rtype: _Element
+    """
+    copy = deepcopy(element)
+    for ref in list(copy.iter(*FOREIGN_REFS)):
+        if ref.getparent().tag == ENTRY_TAG:
+            ref.getparent().remove(ref)
+    if new_uuid:
+        Entry(element=copy).uuid = uuid.uuid4()
+        ident = copy.findtext("UUID")
+        for history in copy.iterfind("History/Entry/UUID"):
+            history.text = ident
+    return copy
+
+
+def key_path(key: PathKey) -> str:
+    """Return the path string of a path key.
+
+    :param key: path key
+    :type key: PathKey
+    :returns: path starting with a slash
+    :rtype: str
+    """
+    return "/{0}".format("/".join(key))
+
+
+def is_newer(
+    theirs: EntryPrint, their_kpo: PyKeePass, ours: EntryPrint, our_kpo: PyKeePass
+) -> bool:
+    """Return whether their entry was modified after ours.
+
+    :param theirs: fingerprint of the other entry
+    :type theirs: EntryPrint
+    :param their_kpo: database of the other entry
+    :type their_kpo: PyKeePass
+    :param ours: fingerprint of this entry
+    :type ours: EntryPrint
+    :param our_kpo: database of this entry
+    :type our_kpo: PyKeePass
+    :returns: True when the other entry is newer
+    :rtype: bool
+    """
+    if not theirs.mtime:
+        return False
+    if not ours.mtime:
+        return True
+    # the texts are compared decoded, the two files may differ in version
+    return decode_time(theirs.mtime, their_kpo) > decode_time(ours.mtime, our_kpo)
+
+
+def _times_parts(times: _Element, parts: list[str]) -> Optional[str]:
+    mtime = None
+    for stamp in times.iterchildren(*TIMES_FIELDS):
+        if stamp.tag == "LastModificationTime":
+            mtime = stamp.text
+        parts.append(stamp.text or "")
+    return mtime
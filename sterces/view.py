@@ -0,0 +1,264 @@
+"""View module for package sterces."""
+
+import base64
+import binascii
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, TextIO
+
+from lxml.etree import _Element  # type: ignore[import-untyped]  # noqa: WPS450
+from pykeepass.pykeepass import PyKeePass  # type: ignore[import-untyped]
+
+from sterces.index import GROUP_TAG, PathKey, entry_elements
+
+EXPIRY_FORMAT = "%Y-%m-%d %H:%M:%S"
+KDBX4_EPOCH = datetime(1, 1, 1, tzinfo=timezone.utc)
+# String field keys of an entry element and the EntryView slot they fill
+STRING_FIELDS = {
+    "Title": "title",
+    "UserName": "username",
+    "Password": "password",
+    "URL": "url",
+    "Notes": "notes",
+    "otp": "otp",
+}
+
+
+class EntryView:
+    """Compact read only record of one entry.
+
+    All fields are read in a single pass over the entry element instead of
+    one XPath query per pykeepass property.
+    """
+
+    __slots__ = (
+        "path",
+        "title",
+        "username",
+        "password",
+        "url",
+        "notes",
+        "otp",
+        "tags",
+        "expiry",
+    )
+
+    path: Optional[list[Optional[str]]]
+    title: Optional[str]
+    username: Optional[str]
+    password: Optional[str]
+    url: Optional[str]
+    notes: Optional[str]
+    otp: Optional[str]
+    tags: Optional[str]
+    expiry: Optional[str]
+
+    def __init__(
+        self, element: _Element, kpo: PyKeePass, group: Optional[PathKey] = None
+    ) -> None:
+        """Construct an EntryView from an Entry element.
+
+        :param element: Entry element
+        :type element: _Element
+        :param kpo: database the element belongs to
+        :type kpo: PyKeePass
+        :param group: path of the parent group when already known
+        :type group: Optional[PathKey]
+        """
+        self.title = None
+        self.username = None
+        self.password = None
+        self.url = None
+        self.notes = None
+        self.otp = None
+        self.tags = None
+        self.expiry = None
+        # filtering by tag and indexing children avoids creating a proxy
+        # object for every child and the path search of findtext
+        for child in element.iterchildren("String", "Tags", "Times"):
+            if child.tag == "String":
+                key, valor = _key_value(child)
+                slot = STRING_FIELDS.get(key or "")
+                if slot is not None:
+                    setattr(self, slot, valor)
+            elif child.tag == "Tags":
+                self.tags = child.text
+            else:
+                self.expiry = _expiry(child, kpo)
+        if group is None:
+            self.path = _entry_path(element, self.title)
+        else:
+            self.path = [*group, self.title]
+
+    def to_dict(self, mask: bool = True) -> dict[str, str]:
+        """Return the entry as a dictionary.
+
+        The password mask preserves the length of the password.
+
+        :param mask: mask the password when True
+        :type mask: bool
+        :returns: entry dictionary
+        :rtype: dict[str, str]
+        """
+        password = self.password or ""
+        ed = {
+            "path": self.path,
+            "title": self.title,
+            "username": self.username,
+            "password": "*" * len(password) if mask else password,
+        }
+        if self.tags:
+            ed["tags"] = ",".join(self.tags.replace(",", ";").split(";"))
+        if self.url is not None:
+            ed["url"] = self.url
+        if self.notes is not None:
+            ed["notes"] = self.notes
+        if self.expiry is not None:
+            ed["expiry"] = self.expiry
+        if self.otp is not None:
+            ed["otp"] = self.otp
+        return ed  # type: ignore[return-value]
+
+
+class ViewIndex:
+    """EntryView records of every entry keyed by path, without the tree.
+
+    Only the fields of the lookup attributes are kept. Group names are
+    interned and every group path is one tuple shared by its entries, so
+    the index holds no reference to the XML tree or the database object.
+
+    :param kpo: database to index
+    :type kpo: PyKeePass
+    """
+
+    __slots__ = ("entries", "groups")
+
+    entries: dict[PathKey, EntryView]
+    groups: set[PathKey]
+
+    def __init__(self, kpo: PyKeePass) -> None:
+        """Construct a ViewIndex class."""
+        root = kpo.root_group._element  # noqa: WPS437
+        keys: dict[_Element, PathKey] = {root: ()}
+        for group in root.iterdescendants(GROUP_TAG):
+            name = next(group.iterchildren("Name"), None)
+            parent = keys[group.getparent()]
+            keys[group] = parent
+            if name is not None and name.text is not None:
+                keys[group] = (*parent, sys.intern(name.text))
+        self.groups = set(keys.values())
+        self.entries = {}
+        for element in entry_elements(root):
+            group_key = keys[element.getparent()]
+            view = EntryView(element, kpo, group_key)
+            if view.title is not None:
+                self.entries.setdefault((*group_key, view.title), view)
+
+    def below(self, prefix: PathKey) -> list[EntryView]:
+        """Return the records below a group path in document order.
+
+        :param prefix: group path
+        :type prefix: PathKey
+        :returns: records of the entries in the group and its subgroups
+        :rtype: list[EntryView]
+        """
+        size = len(prefix)
+        return [view for key, view in self.entries.items() if key[:size] == prefix]
+
+
+def decode_time(text: str, kpo: PyKeePass) -> datetime:
+    """Decode a time of the XML tree without the pykeepass property lookup.
+
+    KDBX 4 stores base64 encoded seconds since 0001-01-01, KDBX 3 text.
+
+    :param text: text of a time element
+    :type text: str
+    :param kpo: database the element belongs to
+    :type kpo: PyKeePass
+    :returns: timezone aware datetime
+    :rtype: datetime
+    """
+    try:
+        raw = base64.b64decode(text, validate=True)
+    except binascii.Error:
+        raw = b""
+    if len(raw) == 8:
+        return KDBX4_EPOCH + timedelta(seconds=int.from_bytes(raw, "little"))
+    decoded: datetime = kpo._decode_time(text)  # noqa: WPS437
+    return decoded
+
+
+def write_json(
+    fd: TextIO, views: Iterable[EntryView], mask: bool = True, indent: int = 0
+) -> None:
+    """Serialize views as one JSON list.
+
+    :param fd: text file object to write to
+    :type fd: TextIO
+    :param views: entries to serialize
+    :type views: Iterable[EntryView]
+    :param mask: mask passwords when True
+    :type mask: bool
+    :param indent: indent size when > 0
+    :type indent: int
+    """
+    e_list = [view.to_dict(mask) for view in views]
+    fd.write(json.dumps(e_list, indent=4 if indent > 0 else None))
+    fd.write("\n")
+
+
+def write_reprs(fd: TextIO, views: Iterable[EntryView], mask: bool = True) -> int:
+    """Write the dictionary of every view on a line of its own.
+
+    :param fd: text file object to write to
+    :type fd: TextIO
+    :param views: entries to write
+    :type views: Iterable[EntryView]
+    :param mask: mask passwords when True
+    :type mask: bool
+    :returns: number of entries written
+    :rtype: int
+    """
+    lines = [repr(view.to_dict(mask)) for view in views]
+    if lines:
+        fd.write("\n".join(lines))
+        fd.write("\n")
+    return len(lines)
+
+
+def _entry_path(
+    element: _Element, title: Optional[str]
+) -> Optional[list[Optional[str]]]:
+    # same as pykeepass Entry.path: parent group names without the root group
+    group = element.getparent()
+    if group is None or group.tag != GROUP_TAG:
+        return None
+    path: list[Optional[str]] = [title]
+    parent = group.getparent()
+    while parent is not None and parent.tag == GROUP_TAG:
+        name = next(group.iterchildren("Name"), None)
+        if name is not None and name.text is not None:
+            path.insert(0, name.text)
+        group = parent
+        parent = group.getparent()
+    return path
+
+
+def _expiry(times: _Element, kpo: PyKeePass) -> Optional[str]:
+    expires = None
+    expiry_time = None
+    for child in times.iterchildren("Expires", "ExpiryTime"):
+        if child.tag == "Expires":
+            expires = child.text
+        else:
+            expiry_time = child.text
+    if expires != "True" or not expiry_time:
+        return None
+    return decode_time(expiry_time, kpo).strftime(EXPIRY_FORMAT)
+
+
+def _key_value(field: _Element) -> tuple[Optional[str], Optional[str]]:
+    if len(field) == 2 and field[0].tag == "Key":
+        return field[0].text, field[1].text
+    return field.findtext("Key"), field.findtext("Value")
@@ -1,15 +1,29 @@
 """Tests level module conftest for package sterces."""
 
 from datetime import datetime, timezone
+from pathlib import Path
 from shutil import rmtree
 from tempfile import mkdtemp
-from typing import Generator, Optional
+from typing import Callable, Generator, Optional, Protocol, Union
 
 import pytest
 from pykeepass.pykeepass import PyKeePass  # type: ignore[import-untyped]
 
 from sterces.db import StercesDatabase
 
+PASSPHRASE = "abc1234567890def\n"
+
+CountSaves = Callable[[StercesDatabase], list[int]]
+
+
+class OpenVault(Protocol):
+    """Factory of the open_vault fixture."""
+
+    def __call__(
+        self, **kwargs: Union[bool, int, float, str, bytes]
+    ) -> StercesDatabase:
+        """Open the database with the StercesDatabase keyword arguments."""
+
 
 @pytest.fixture(scope="session")
 def expiry() -> datetime:
@@ -26,12 +40,54 @@ def db() -> Generator[Optional[PyKeePass], None, None]:
     ppf = "{0}/.ssapeek".format(td)
     dbf = "{0}/db.kdbx".format(td)
     with open(ppf, "w") as fd:
-        fd.write("abc1234567890def\n")
+        fd.write(PASSPHRASE)
     database: Optional[PyKeePass] = StercesDatabase(
-        db_fn=str(dbf), pwd_fn=str(ppf), warn=True
+        db_fn=str(dbf), pwd_fn=str(ppf), warn=True, check_index=True
     )
 
     yield database
 
     database = None
     rmtree(td)
+
+
+@pytest.fixture
+def open_vault(tmp_path: Path) -> OpenVault:
+    """Return a factory opening the database of a temporary directory.
+
+    Every call opens the same database file, keyword arguments are passed
+    on to StercesDatabase.
+    """
+    ppf = tmp_path / ".ssapeek"
+    ppf.write_text(PASSPHRASE)
+
+    def opener(**kwargs: Union[bool, int, float, str, bytes]) -> StercesDatabase:
+        return StercesDatabase(
+            db_fn=str(tmp_path / "db.kdbx"), pwd_fn=str(ppf), **kwargs
+        )
+
+    return opener
+
+
+@pytest.fixture
+def count_saves(monkeypatch: pytest.MonkeyPatch) -> CountSaves:
+    """Return a function recording the pending changes of every save."""
+
+    def counter(database: StercesDatabase) -> list[int]:
+        saves: list[int] = []
+        save = database.kpo.save
+
+        def counting_save(*args: object, **kwargs: object) -> None:
+            save(*args, **kwargs)
+            saves.append(database._dirty)  # noqa: WPS437
+
+        monkeypatch.setattr(database.kpo, "save", counting_save)
+        return saves
+
+    return counter
+
+
+@pytest.fixture
+def vault(open_vault: OpenVault) -> StercesDatabase:
+    """Create an empty StercesDatabase in a temporary directory."""
+    return open_vault(check_index=True)
@@ -0,0 +1,192 @@
+"""Tests module test_agent for sterces library."""
+
+import io
+import json
+import socket
+from pathlib import Path
+from threading import Thread
+from time import monotonic
+from typing import Generator
+
+import pyotp
+import pytest
+
+from sterces.agent import StercesAgent
+from sterces.client import read_message, write_message
+from sterces.db import StercesDatabase
+from tests.conftest import PASSPHRASE, OpenVault
+
+
+def _agent(tmp_path: Path, idle_timeout: float) -> StercesAgent:
+    ppf = tmp_path / ".ssapeek"
+    ppf.write_text(PASSPHRASE)
+    return StercesAgent(
+        db_fn=str(tmp_path / "db.kdbx"),
+        pwd_fn=str(ppf),
+        sock_fn=str(tmp_path / "agent.sock"),
+        idle_timeout=idle_timeout,
+    )
+
+
+def _client(tmp_path: Path, open_vault: OpenVault) -> StercesDatabase:
+    return open_vault(agent=str(tmp_path / "agent.sock"))
+
+
+@pytest.fixture
+def agent(tmp_path: Path) -> Generator[StercesAgent, None, None]:
+    """Run a sterces agent in a background thread."""
+    server = _agent(tmp_path, 30)
+    worker = Thread(target=server.serve, daemon=True)
+    worker.start()
+    while not Path(server.sock_fn).exists():
+        worker.join(0.01)
+    yield server
+    server.stop()
+    worker.join()
+
+
+def test_agent_roundtrip(
+    agent: StercesAgent, tmp_path: Path, open_vault: OpenVault
+) -> None:
+    """Test a client database talks to the agent instead of opening."""
+    client = _client(tmp_path, open_vault)
+    assert client._kpobj is None
+    assert client.store("/svc/api", None, ["prod"], password="tok3n") == 0
+    assert client.update("/svc/api", username="svc") == 0
+    assert client.lookup("/svc/api", "password") == "tok3n"
+    assert client.lookup("/svc/missing", "password") is None
+    results = client.lookup_many(["/svc/api"], ["username", "tags"])
+    assert results["/svc/api"]["username"].value == "svc"
+    assert results["/svc/api"]["tags"].value == "prod"
+    uri = pyotp.TOTP(pyotp.random_base32()).provisioning_uri("svc")
+    assert client.update("/svc/api", otp=uri) == 0
+    otp = pyotp.parse_uri(uri)
+    assert isinstance(otp, pyotp.TOTP)
+    assert client.otp_now("/svc/api") == otp.now()
+    assert oct(Path(agent.sock_fn).stat().st_mode & 0o777) == "0o600"
+
+
+def test_agent_reloads_changed_file(
+    agent: StercesAgent, tmp_path: Path, open_vault: OpenVault
+) -> None:
+    """Test the agent notices writes made without it."""
+    open_vault().store("/outside", None, None, password="direct")
+    assert _client(tmp_path, open_vault).lookup("/outside", "password") == "direct"
+
+
+@pytest.mark.parametrize("line", [b"[1, 2]\n", b"not json\n", b"\xff\n"])
+def test_agent_malformed_request(
+    agent: StercesAgent, tmp_path: Path, open_vault: OpenVault, line: bytes
+) -> None:
+    """Test a malformed request gets an error reply and the agent keeps serving."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(agent.sock_fn)
+        with sock.makefile("rwb") as fd:
+            fd.write(line)
+            fd.flush()
+            reply = json.loads(fd.readline())
+            write_message(fd, {"op": "ping"})
+            assert read_message(fd) == {"ok": True, "result": agent._ping()}
+    assert reply["ok"] is False
+    assert reply["error"]
+    assert _client(tmp_path, open_vault).lookup("/missing", "password") is None
+    assert Path(agent.sock_fn).exists()
+
+
+def test_agent_drops_stalled_connection(tmp_path: Path, open_vault: OpenVault) -> None:
+    """Test a silent client is dropped after conn_timeout."""
+    server = _agent(tmp_path, 30)
+    server.conn_timeout = 0.2
+    worker = Thread(target=server.serve, daemon=True)
+    worker.start()
+    while not Path(server.sock_fn).exists():
+        worker.join(0.01)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled:
+        stalled.connect(server.sock_fn)
+        start = monotonic()
+        client = _client(tmp_path, open_vault)
+        assert client._agent is not None
+        assert client.lookup("/missing", "password") is None
+        assert monotonic() - start < 5
+    server.stop()
+    worker.join(5)
+    assert not worker.is_alive()
+
+
+def test_agent_fallback(tmp_path: Path, open_vault: OpenVault) -> None:
+    """Test the client opens the database itself when no agent runs."""
+    client = _client(tmp_path, open_vault)
+    assert client._agent is None
+    assert client.kpo is not None
+
+
+def test_agent_idle_timeout(tmp_path: Path) -> None:
+    """Test the agent exits after the idle timeout."""
+    server = _agent(tmp_path, 0.2)
+    server.serve()
+    assert not Path(server.sock_fn).exists()
+
+
+def test_agent_unsupported(
+    agent: StercesAgent, tmp_path: Path, open_vault: OpenVault
+) -> None:
+    """Test methods the agent does not serve raise instead of misbehaving."""
+    client = _client(tmp_path, open_vault)
+    client.store("/svc/api", None, None, password="tok3n")
+    for call in (
+        client.show,
+        lambda: client.show("/svc/api"),
+        lambda: client.dump(None),
+        lambda: client.dump_jsonl(io.StringIO()),
+        lambda: client.group("/svc", "remove"),
+        lambda: client.diff(client),
+        lambda: client.sync(client, prune=True),
+    ):
+        with pytest.raises(ValueError, match="not supported through the agent"):
+            call()
+    with pytest.raises(ValueError, match="not supported through the agent"):
+        with client.transaction():
+            client.remove("/svc/api")
+    with pytest.raises(ValueError, match="Invalid update fields: __class__"):
+        client.update("/svc/api", __class__="x")
+    assert client.lookup("/svc/api", "password") == "tok3n"
+
+
+def test_agent_stop_while_idle(tmp_path: Path) -> None:
+    """Test stopping an idle agent ends serve without a socket error."""
+    server = _agent(tmp_path, 30)
+    errors: list[BaseException] = []
+
+    def serve() -> None:
+        try:
+            server.serve()
+        except BaseException as ex:  # noqa: B902, WPS424
+            errors.append(ex)
+
+    for _ in range(20):
+        worker = Thread(target=serve, daemon=True)
+        worker.start()
+        while not Path(server.sock_fn).exists():
+            worker.join(0.001)
+        server.stop()
+        worker.join(5)
+        assert not worker.is_alive()
+    assert not errors
+
+
+def test_agent_stop_while_starting(tmp_path: Path) -> None:
+    """Test a stop between the bind and the accept loop ends serve."""
+    server = _agent(tmp_path, 30)
+    listen = server._listen  # noqa: WPS437
+
+    def listen_then_stop() -> socket.socket:
+        sock = listen()
+        server.stop()
+        return sock
+
+    server._listen = listen_then_stop  # type: ignore[method-assign]  # noqa: WPS437
+    start = monotonic()
+    server.serve()
+    assert monotonic() - start < 5
+    assert not Path(server.sock_fn).exists()
@@ -0,0 +1,73 @@
+"""Tests module test_aio for sterces library."""
+
+import asyncio
+from pathlib import Path
+from time import perf_counter
+
+from sterces.aio import AsyncStercesDatabase
+from sterces.db import PASSWORD
+from tests.conftest import OpenVault
+
+
+async def _ticker(gaps: list[float], stop: asyncio.Event) -> None:
+    last = perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.005)
+        now = perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+def test_loop_responsive_during_save(tmp_path: Path, open_vault: OpenVault) -> None:
+    """Test the event loop keeps running while a store is saved."""
+    open_vault().close()
+
+    async def scenario() -> tuple[float, list[float], int]:  # noqa: WPS430
+        adb = await AsyncStercesDatabase.open(
+            db_fn=str(tmp_path / "db.kdbx"),
+            pwd_fn=str(tmp_path / ".ssapeek"),
+            check_index=True,
+        )
+        gaps: list[float] = []
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(_ticker(gaps, stop))
+        start = perf_counter()
+        rc = await adb.store("/infra/db", None, None, password="s3cret")
+        elapsed = perf_counter() - start
+        stop.set()
+        await ticker
+        return elapsed, gaps, rc
+
+    elapsed, gaps, rc = asyncio.run(scenario())
+    assert rc == 0
+    assert len(gaps) > 5
+    assert max(gaps) < min(0.25, elapsed / 2)  # noqa: WPS432
+
+
+def test_reads_do_not_wait_for_writers(open_vault: OpenVault) -> None:
+    """Test a lookup issued during a save finishes before the save."""
+
+    async def scenario() -> list[str]:  # noqa: WPS430
+        adb = AsyncStercesDatabase(open_vault(check_index=True))
+        await adb.store("/infra/db", None, None, password="s3cret")
+        events: list[str] = []
+
+        async def write() -> None:  # noqa: WPS430
+            await adb.update("/infra/db", password="rotated")
+            events.append("saved")
+
+        async def read() -> None:  # noqa: WPS430
+            await asyncio.sleep(0.01)
+            events.append(str(await adb.lookup("/infra/db", PASSWORD)))
+
+        async with adb._lock:  # noqa: WPS437
+            events.append(str(await adb.lookup("/infra/db", PASSWORD)))
+        await asyncio.gather(write(), read())
+        events.append(str(open_vault().lookup("/infra/db", PASSWORD)))
+        return events
+
+    events = asyncio.run(scenario())
+    assert events[0] == "s3cret"
+    assert events[1] in {"s3cret", "rotated"}
+    assert events[2] == "saved"
+    assert events[3] == "rotated"
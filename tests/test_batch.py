@@ -0,0 +1,74 @@
+"""Tests module test_batch for sterces library."""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from sterces.batch import BatchRunner, main
+from sterces.db import StercesDatabase
+from tests.conftest import OpenVault
+
+OPS = (
+    {"op": "store", "path": "/svc/api", "tags": "prod,api", "password": "tok3n"},
+    {"op": "lookup", "path": "/svc/api", "attr": "password", "id": 7},
+    {"op": "update", "path": "/svc/api", "username": "svc"},
+    {"op": "lookup", "path": "/svc/api", "attrs": ["username", "tags"]},
+    {"op": "update", "path": "/svc/api", "__class__": "x"},
+    {"op": "store", "path": "/svc/api"},
+    {"op": "remove", "path": "/svc/missing"},
+    {"op": "bogus"},
+)
+
+
+def test_batch_runner(vault: StercesDatabase, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a batch streams one reply per operation and saves at checkpoints."""
+    writes: list[int] = []
+    write_file = vault._write_file  # noqa: WPS437
+
+    def counting_write() -> None:
+        writes.append(vault._dirty)  # noqa: WPS437
+        write_file()
+
+    monkeypatch.setattr(vault, "_write_file", counting_write)
+    source = io.StringIO("\n".join(json.dumps(op) for op in OPS) + "\n\nnot json\n")
+    sink = io.StringIO()
+    runner = BatchRunner(vault, checkpoint=3)
+    assert runner.run(source, sink) == len(OPS) + 1
+    replies = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert replies[0] == {"ok": True, "result": 0}
+    assert replies[1] == {"id": 7, "ok": True, "result": "tok3n"}
+    assert replies[3]["result"] == {"username": "svc", "tags": "prod,api"}
+    assert "Invalid update fields: __class__" in replies[4]["error"]
+    assert replies[5] == {"ok": False, "error": "Entry /svc/api already exists"}
+    assert replies[6]["error"] == "Entry /svc/missing does not exist"
+    assert replies[7]["error"] == "Invalid operation"
+    assert replies[8]["error"].startswith("Invalid JSON")
+    assert runner.failed == 5
+    assert writes == [3]  # changes of the first checkpoint, one save
+
+
+def test_batch_main(
+    vault: StercesDatabase,
+    open_vault: OpenVault,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test the command line runs a file of operations in one open."""
+    ops_fp = tmp_path / "ops.jsonl"
+    ops_fp.write_text(
+        "".join(
+            json.dumps(op) + "\n"
+            for op in (
+                {"op": "group", "path": "/svc", "action": "add"},
+                {"op": "store", "path": "/svc/db", "password": "pw"},
+            )
+        )
+    )
+    db_fn = str(vault.kpo.filename)
+    args = [str(ops_fp), "--db", db_fn, "--pwd", str(tmp_path / ".ssapeek")]
+    assert main(args) == 0
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == ['{"ok": true, "result": 0}'] * 2
+    assert open_vault().lookup("/svc/db", "password") == "pw"
@@ -1,7 +1,15 @@
 """Tests module test_database for sterces library."""
 
-from datetime import datetime, timezone
-from typing import Generator
+import io
+import json
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from multiprocessing.synchronize import Barrier
+from pathlib import Path
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import Callable, Generator
+from unittest.mock import Mock
 
 import pytest
 from _pytest.logging import LogCaptureFixture
@@ -9,11 +17,14 @@ from loguru import logger
 from pykeepass.pykeepass import PyKeePass  # type: ignore[import-untyped]
 
 from sterces.constants import ADD, REMOVE, VERSION
-from sterces.db import ATTRIBUTES, ENTRY_NOT_EXIST
+from sterces.db import ATTRIBUTES, ENTRY_NOT_EXIST, PASSWORD, StercesDatabase
+from tests.conftest import CountSaves, OpenVault
 
 ENTRY_TEST_UNO = "/test/test1"
 ENTRY_TEST_DOS = "/test/test2"
 ENTRY_TEST_TRES = "/test/test2"
+WRITERS = 16
+WRITES = 3
 
 
 @pytest.fixture
@@ -87,6 +98,22 @@ def test_entry_lookup(
     assert match in caplog.text
 
 
+def test_entry_lookup_many(db: PyKeePass, caplog: LogCaptureFixture) -> None:
+    """Test batch lookup of several entries and attributes."""
+    results = db.lookup_many(
+        [ENTRY_TEST_UNO, (ENTRY_TEST_DOS, "username")], ["username", "tags", "bogus"]
+    )
+    assert results[ENTRY_TEST_UNO]["username"] == ("undef", None)
+    assert results[ENTRY_TEST_UNO]["tags"].value == "test,uno"
+    assert results[ENTRY_TEST_UNO]["bogus"].value is None
+    assert "Invalid attribute 'bogus'" in str(results[ENTRY_TEST_UNO]["bogus"].error)
+    assert results[ENTRY_TEST_DOS]["username"] == (
+        None,
+        ENTRY_NOT_EXIST.format(ENTRY_TEST_DOS),
+    )
+    assert ENTRY_NOT_EXIST.format(ENTRY_TEST_DOS) not in caplog.text
+
+
 def test_entry_add_dup(
     db: PyKeePass,
     expiry: datetime,
@@ -157,6 +184,18 @@ def test_entry_show_one(
     assert match not in out
 
 
+def test_entry_show_one_quiet(
+    open_vault: OpenVault, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test show of one entry prints it even when the database is quiet."""
+    quiet = open_vault(quiet=True)
+    quiet.store("/svc/api", None, None, username="svc")
+    capsys.readouterr()
+    assert quiet.show("/svc/api") == 0
+    out, _ = capsys.readouterr()
+    assert "'title': 'api', 'username': 'svc'" in out
+
+
 def test_entry_remove(db: PyKeePass, caplog: LogCaptureFixture) -> None:
     """Test entry remove."""
     db.remove(ENTRY_TEST_UNO)
@@ -173,3 +212,348 @@ def test_entry_show_none(db: PyKeePass, caplog: LogCaptureFixture) -> None:
     """Test show none."""
     db.show()
     assert "No entries found" in caplog.text
+
+
+def test_transaction_single_save(
+    vault: StercesDatabase, count_saves: CountSaves
+) -> None:
+    """Test N writes inside a transaction cost one save."""
+    saves = count_saves(vault)
+    writes = 50
+    with vault.transaction():
+        for idx in range(writes):
+            vault.store("/bulk/entry{0}".format(idx), None, ["bulk"])
+        vault.update("/bulk/entry0", username="first")
+        vault.remove("/bulk/entry1")
+        assert not saves
+    assert saves == [1]
+    assert vault.lookup("/bulk/entry0", "username") == "first"
+    with vault.defer_save():
+        with pytest.raises(ValueError, match="inside defer_save"):
+            with vault.transaction():
+                vault.remove("/bulk/entry0")
+    assert vault.lookup("/bulk/entry0", "username") == "first"
+
+
+def test_transaction_rollback(vault: StercesDatabase) -> None:
+    """Test a failing transaction discards all of its changes."""
+    vault.store("/keep", None, None, password="kept")
+    with pytest.raises(RuntimeError):
+        with vault.transaction():
+            vault.store("/discard", None, None)
+            vault.update("/keep", password="changed")
+            raise RuntimeError("abort")
+    assert vault.lookup("/discard", "password") is None
+    assert vault.lookup("/keep", "password") == "kept"
+    assert vault._dirty == 0
+
+
+def test_dump_jsonl(vault: StercesDatabase) -> None:
+    """Test streaming JSON Lines dump with projection and prefix filter."""
+    with vault.transaction():
+        vault.store("/prod/db", None, ["prod"], password="one")
+        vault.store("/prod/web/api", None, None, password="two")
+        vault.store("/dev/db", None, None, password="three")
+    out = io.StringIO()
+    assert vault.dump_jsonl(out, prefix="/prod", fields=["title", "password"]) == 0
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert lines == [
+        {"title": "db", "password": "***"},
+        {"title": "api", "password": "***"},
+    ]
+    out = io.StringIO()
+    assert vault.dump_jsonl(out, mask=False) == 0
+    assert len(out.getvalue().splitlines()) == 3
+    assert '"password": "three"' in out.getvalue()
+    assert vault.dump_jsonl(out, prefix="/missing") == 1
+
+
+def test_autosave_changes(open_vault: OpenVault, count_saves: CountSaves) -> None:
+    """Test changes are written once autosave_changes are pending."""
+    database = open_vault(autosave_changes=3)
+    saves = count_saves(database)
+    database.store("/one", None, None)
+    database.update("/one", username="uno")
+    assert not saves
+    database.store("/two", None, None)
+    assert saves == [3]
+    database.remove("/two")
+    database.close()
+    assert saves == [3, 1]
+    database.close()
+    assert saves == [3, 1]
+
+
+def test_closed_raises(open_vault: OpenVault) -> None:
+    """Test every method needing the database raises after close."""
+    database = open_vault()
+    database.store("/one", None, None)
+    database.close()
+    for call in (
+        lambda: database.lookup("/one", PASSWORD),
+        lambda: database.lookup_many(["/one"], [PASSWORD]),
+        lambda: database.store("/two", None, None),
+        lambda: database.update("/one", username="uno"),
+        lambda: database.remove("/one"),
+        lambda: database.group("/g", ADD),
+        lambda: database.find(tags="x"),
+        lambda: database.otp_now("/one"),
+        database.show,
+        database.flush,
+        database.reload,
+    ):
+        with pytest.raises(ValueError, match="closed database"):
+            call()
+    with pytest.raises(ValueError, match="closed database"):
+        with database.transaction():
+            database.store("/three", None, None)
+
+
+def test_flush_inside_defer_save(
+    vault: StercesDatabase, count_saves: CountSaves
+) -> None:
+    """Test flush writes the changes of an open defer_save block."""
+    saves = count_saves(vault)
+    with vault.defer_save():
+        vault.store("/deferred", None, None)
+        assert not saves
+        vault.flush()
+        assert saves == [1]
+    assert saves == [1]
+
+
+@pytest.mark.parametrize(
+    "read",
+    [
+        lambda db: db.lookup("/svc/api", PASSWORD),
+        lambda db: db.find(tags="prod"),
+        lambda db: db.expiring(timedelta(days=1)),
+        lambda db: db.otp_many(["/svc/api"]),
+        lambda db: list(db.iter_entries()),
+        lambda db: db.dump(None),
+        lambda db: db.show("/svc/api"),
+    ],
+)
+def test_readers_wait_for_tree_lock(
+    vault: StercesDatabase, read: Callable[[StercesDatabase], object]
+) -> None:
+    """Test readers do not look at the tree while it is being changed."""
+    vault.store("/svc/api", None, ["prod"], password="tok3n")
+    done = Event()
+
+    def run() -> None:  # noqa: WPS430
+        read(vault)
+        done.set()
+
+    reader = Thread(target=run, daemon=True)
+    with vault._tree_lock:  # noqa: WPS437
+        reader.start()
+        assert not done.wait(0.2)
+    assert done.wait(5)
+
+
+def test_autosave_delay(open_vault: OpenVault, count_saves: CountSaves) -> None:
+    """Test a burst of changes is written once after the quiet period."""
+    database = open_vault(autosave_delay=0.2)
+    saves = count_saves(database)
+    for idx in range(5):
+        database.store("/entry{0}".format(idx), None, None)
+    assert not saves
+    deadline = perf_counter() + 10
+    while not saves and perf_counter() < deadline:
+        sleep(0.05)
+    assert saves == [5]
+    with open_vault(autosave_delay=60) as reopened:
+        assert reopened.lookup("/entry4", "username") == "undef"
+        reopened.update("/entry4", username="cuatro")
+    assert open_vault().lookup("/entry4", "username") == "cuatro"
+
+
+def test_save_is_atomic(
+    vault: StercesDatabase, open_vault: OpenVault, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a failing save leaves the database file and its directory intact."""
+    db_fp = Path(vault.kpo.filename)
+    before = db_fp.read_bytes()
+
+    def crashing_save(stream: io.BufferedWriter, **kwargs: object) -> None:
+        stream.write(before[: len(before) // 2])
+        raise OSError("disk full")
+
+    monkeypatch.setattr(vault.kpo, "save", crashing_save)
+    with pytest.raises(OSError, match="disk full"):
+        vault.store("/atomic/entry", None, None, password="s3cret")
+    assert db_fp.read_bytes() == before
+    names = sorted(fp.name for fp in db_fp.parent.iterdir())
+    assert names == [".db.kdbx.lock", ".ssapeek", "db.kdbx"]
+    monkeypatch.undo()
+    vault.flush()
+    assert open_vault().lookup("/atomic/entry", PASSWORD) == "s3cret"
+
+
+def test_reload_on_change(
+    open_vault: OpenVault, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test an auto_reload database picks up writes without a new KDF."""
+    import argon2  # noqa: WPS433
+
+    open_vault()
+    reader = open_vault(auto_reload=True, tf_cache=True, instrument=True)
+    writer = open_vault(tf_cache=True)
+    writer.store("/outside", None, None, password="first")
+    counting_kdf = Mock(wraps=argon2.low_level.hash_secret_raw)
+    monkeypatch.setattr(argon2.low_level, "hash_secret_raw", counting_kdf)
+    assert reader.lookup("/outside", PASSWORD) == "first"
+    assert reader.lookup("/outside", PASSWORD) == "first"
+    assert reader.stats()["reload"].calls == 1
+    assert not counting_kdf.called
+    writer.update("/outside", password="second")
+    assert reader.lookup("/outside", PASSWORD) == "second"
+    assert reader.stats()["reload"].calls == 2
+    assert not counting_kdf.called
+
+
+def test_reload_keeps_pending_changes(open_vault: OpenVault) -> None:
+    """Test unsaved changes are replayed onto a reloaded database."""
+    reader = open_vault(auto_reload=True, autosave_changes=10)
+    reader.store("/pending", None, None, password="mine")
+    open_vault().store("/outside", None, None)
+    assert reader.reload()
+    assert reader.lookup("/pending", PASSWORD) == "mine"
+    assert reader.lookup("/outside", PASSWORD) == "undef"
+    reader.flush()
+    assert open_vault().lookup("/pending", PASSWORD) == "mine"
+    assert open_vault().lookup("/outside", PASSWORD) == "undef"
+
+
+def _writer(tmp_path: Path, idx: int, barrier: Barrier) -> None:
+    # runs in a spawned process, fixtures are not available there
+    database = StercesDatabase(
+        db_fn=str(tmp_path / "db.kdbx"),
+        pwd_fn=str(tmp_path / ".ssapeek"),
+        tf_cache=True,
+    )
+    barrier.wait(timeout=120)
+    for num in range(WRITES):
+        database.store("/w{0}/e{1}".format(idx, num), None, None, password=str(idx))
+    database.update("/shared", notes="writer {0}".format(idx))
+
+
+def test_concurrent_writers(tmp_path: Path, open_vault: OpenVault) -> None:
+    """Test concurrent writers merge their changes instead of losing them."""
+    with open_vault(tf_cache=True) as first:
+        first.store("/shared", None, None)
+    open_vault(tf_cache=True)  # caches the transformed key
+    # spawn, forking while another thread holds a lock can deadlock the child
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(WRITERS + 1)
+    workers = [
+        ctx.Process(target=_writer, args=(tmp_path, idx, barrier))
+        for idx in range(WRITERS)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait(timeout=120)
+    start = perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = perf_counter() - start
+    assert [worker.exitcode for worker in workers] == [0] * WRITERS
+    saves = WRITERS * (WRITES + 1)
+    logger.info(
+        "{0} writers: {1} saves in {2:.2f}s, {3:.1f} saves/s".format(
+            WRITERS, saves, elapsed, saves / elapsed
+        )
+    )
+    merged = open_vault()
+    found = merged.find(group_prefix="/")
+    assert len(found) == WRITERS * WRITES + 1
+    assert str(merged.lookup("/shared", "notes")).startswith("writer ")
+
+
+def _conflicting_writer(tmp_path: Path) -> None:
+    # runs in a spawned process, fixtures are not available there
+    database = StercesDatabase(
+        db_fn=str(tmp_path / "db.kdbx"), pwd_fn=str(tmp_path / ".ssapeek")
+    )
+    with database.transaction():
+        database.store("/x", None, None, password="theirs")
+        database.remove("/y")
+
+
+def test_concurrent_writers_conflict(tmp_path: Path, open_vault: OpenVault) -> None:
+    """Test changes another writer made impossible are reported, not lost."""
+    with open_vault() as first:
+        first.store("/y", None, None, password="old")
+    pending = open_vault(autosave_changes=10)
+    pending.store("/x", None, None, password="mine")
+    pending.update("/y", password="mine")
+    pending.store("/z", None, None, password="mine")
+    worker = multiprocessing.get_context("spawn").Process(
+        target=_conflicting_writer, args=(tmp_path,)
+    )
+    worker.start()
+    worker.join()
+    assert worker.exitcode == 0
+    with pytest.raises(ValueError, match="dropped: store /x, update /y$"):
+        pending.flush()
+    assert pending._dirty == 0  # noqa: WPS437
+    merged = open_vault()
+    assert merged.lookup("/x", PASSWORD) == "theirs"
+    assert merged.lookup("/y", PASSWORD) is None
+    assert merged.lookup("/z", PASSWORD) == "mine"
+    pending.store("/w", None, None)
+    with open_vault() as other:
+        other.store("/w", None, None)
+    with pytest.raises(ValueError, match="dropped: store /w$"):
+        pending.reload()
+    pending.flush()
+    assert pending._dirty == 0  # noqa: WPS437
+
+
+def test_read_only(
+    tmp_path: Path, open_vault: OpenVault, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test a read only database answers lookups without the XML tree."""
+    with open_vault() as writer, writer.transaction():
+        writer.store("/svc/api", None, ["prod", "api"], password="tok3n", url="u")
+        writer.store("/svc/db/main", None, None, username="dba")
+        writer.group("/empty", ADD)
+    capsys.readouterr()
+    lean = open_vault(read_only=True)
+    assert lean._kpobj is None  # noqa: WPS437
+    assert lean.lookup("/svc/api", PASSWORD) == "tok3n"
+    assert lean.lookup("/svc/api", "tags") == "prod,api"
+    results = lean.lookup_many(["/svc/db/main", "/svc/none"], ["username", "url"])
+    assert results["/svc/db/main"]["username"].value == "dba"
+    assert results["/svc/db/main"]["url"] == (None, None)
+    assert results["/svc/none"]["url"].error == ENTRY_NOT_EXIST.format("/svc/none")
+    titles = [ed["title"] for ed in lean.iter_entries("/svc", ["title"])]
+    assert titles == ["api", "main"]
+    assert not list(lean.iter_entries("/empty"))
+    with pytest.raises(ValueError, match="Group not found"):
+        lean.iter_entries("/missing")
+    assert lean.show("/svc/api") == 0
+    full = open_vault()
+    assert full.show("/svc/api") == 0
+    shown, _ = capsys.readouterr()
+    assert shown.splitlines()[0] == shown.splitlines()[1]
+    lean.dump(None)
+    full.dump(None)
+    dumped, _ = capsys.readouterr()
+    assert dumped.splitlines()[0] == dumped.splitlines()[1]
+    for method, args in (
+        (lean.store, ("/new", None, None)),
+        (lean.update, ("/svc/api",)),
+        (lean.remove, ("/svc/api",)),
+        (lean.group, ("/new", ADD)),
+        (lean.find, ()),
+    ):
+        with pytest.raises(ValueError, match="read only"):
+            method(*args)
+    with pytest.raises(ValueError, match="does not exist"):
+        StercesDatabase(
+            db_fn=str(tmp_path / "missing.kdbx"),
+            pwd_fn=str(tmp_path / ".ssapeek"),
+            read_only=True,
+        )
@@ -0,0 +1,63 @@
+"""Tests module test_foos for sterces library."""
+
+import subprocess  # noqa: S404
+import sys
+from datetime import datetime, timedelta, timezone
+
+import dateparser
+import pytest
+
+from sterces.foos import _parse_memo, str_to_date
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "2025-03-04",
+        "2025-03-04 10:11",
+        "2025-03-04 10:11:12",
+        "2025-03-04T10:11:12+00:00",
+        "2025-03-04T10:11:12Z",
+        "1700000000",
+        "March 3 2025",
+    ],
+)
+def test_str_to_date_matches_dateparser(text: str) -> None:
+    """Test fast paths and memoized parsing agree with dateparser."""
+    assert str_to_date(text) == dateparser.parse(text)
+
+
+def test_str_to_date_relative() -> None:
+    """Test relative expressions are memoized as an offset from now."""
+    _parse_memo.cache_clear()
+    first = str_to_date("in 2 days")
+    second = str_to_date("in 2 days")
+    assert _parse_memo.cache_info().hits == 1
+    assert first is not None and second is not None
+    assert second - first < timedelta(seconds=5)
+    assert abs(first - datetime.now() - timedelta(days=2)) < timedelta(seconds=5)
+    expected = dateparser.parse("in 1 month")
+    found = str_to_date("in 1 month")
+    assert expected is not None and found is not None
+    assert abs(found - expected) < timedelta(seconds=5)
+    assert str_to_date("not a date at all") is None
+
+
+def test_str_to_date_aware() -> None:
+    """Test ISO strings with a UTC designator are timezone aware."""
+    assert str_to_date("2025-03-04T10:11:12Z") == datetime(
+        2025, 3, 4, 10, 11, 12, tzinfo=timezone.utc
+    )
+
+
+def test_import_does_not_load_dateparser() -> None:
+    """Test importing sterces.db stays free of dateparser (-X importtime)."""
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", "import sterces.db"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = [line.rsplit("|", 1)[-1].strip() for line in proc.stderr.splitlines()]
+    assert "sterces.db" in modules
+    assert not [name for name in modules if name.startswith("dateparser")]
@@ -0,0 +1,105 @@
+"""Tests module test_importer for sterces library."""
+
+import io
+import json
+
+import pytest
+
+from sterces.db import PASSWORD, TAGS, USERNAME, StercesDatabase
+from sterces.importer import Importer, ImportStats
+from tests.conftest import CountSaves
+
+CSV_ROWS = (
+    "path,username,password,url,tags,expiry\n"
+    "/svc/db,dbuser,dbpass,,prod,2031-01-02 03:04:05\n"
+    '/svc/api,,tok3n,https://api.example.com,"a,b",\n'
+    ",nobody,,,,\n"
+    "/svc/bad,,,,,not a date at all\n"
+)
+KEEPASSXC_ROWS = (
+    '"Group","Title","Username","Password","URL","Notes","TOTP","Icon",'
+    '"Last Modified","Created"\n'
+    '"Root/web","mail","me","secret","https://mail.example.com","",'
+    '"","0","2024-01-01T00:00:00Z","2024-01-01T00:00:00Z"\n'
+    '"Root","top","you","pw","","note","","0","",""\n'
+)
+
+
+def test_import_csv(vault: StercesDatabase, count_saves: CountSaves) -> None:
+    """Test a CSV import stores valid rows, reports invalid ones, saves once."""
+    saves = count_saves(vault)
+    reports: list[ImportStats] = []
+    importer = Importer(vault, progress=reports.append, every=2)
+    assert importer.run(io.StringIO(CSV_ROWS)) == ImportStats(4, 2, 0, 0, 2)
+    assert len(saves) == 1
+    assert [report.rows for report in reports] == [2, 4, 4]
+    assert vault.lookup("/svc/db", "expiry") == "2031-01-02 03:04:05"
+    assert vault.lookup("/svc/api", TAGS) == "a,b"
+    assert vault.lookup("/svc/api", USERNAME) == "undef"
+    assert vault.lookup("/svc/bad", PASSWORD) is None
+
+
+def test_import_keepassxc(vault: StercesDatabase) -> None:
+    """Test a KeePassXC export is mapped below the root group."""
+    importer = Importer(vault)
+    assert importer.run(io.StringIO(KEEPASSXC_ROWS), "keepassxc").added == 2
+    assert vault.lookup("/web/mail", PASSWORD) == "secret"
+    assert vault.lookup("/top", "notes") == "note"
+
+
+@pytest.mark.parametrize(
+    ("policy", "password", "counts"),
+    [("skip", "old", (0, 1)), ("overwrite", "new", (1, 0))],
+)
+def test_import_policy(
+    vault: StercesDatabase, policy: str, password: str, counts: tuple[int, int]
+) -> None:
+    """Test existing entries are skipped or overwritten by the policy."""
+    vault.store("/svc/db", None, None, password="old")
+    rows = "\n".join(
+        json.dumps({"path": path, PASSWORD: "new", TAGS: ["x"]})
+        for path in ("/svc/db", "/svc/new")
+    )
+    stats = Importer(vault, policy).run(io.StringIO(rows), "jsonl")
+    assert (stats.overwritten, stats.skipped) == counts
+    assert stats.added == 1
+    assert vault.lookup("/svc/db", PASSWORD) == password
+
+
+def test_import_error_policy(vault: StercesDatabase) -> None:
+    """Test the error policy stops at the first existing entry."""
+    vault.store("/b", None, None)
+    rows = "\n".join(json.dumps({"path": path}) for path in ("/a", "/b", "/c"))
+    with pytest.raises(ValueError, match="already exists"):
+        Importer(vault, "error").run(io.StringIO(rows), "jsonl")
+    assert vault.lookup("/a", USERNAME) == "undef"
+    assert vault.lookup("/c", USERNAME) is None
+
+
+def test_import_checkpoint(vault: StercesDatabase, count_saves: CountSaves) -> None:
+    """Test a checkpoint saves every few rows."""
+    saves = count_saves(vault)
+    rows = "\n".join(json.dumps({"path": "/g/e{0}".format(idx)}) for idx in range(5))
+    rows += "\n[1]\n{broken\n"
+    stats = Importer(vault, checkpoint=2).run(io.StringIO(rows), "jsonl")
+    assert stats == ImportStats(7, 5, 0, 0, 2)
+    assert len(saves) == 3
+    with pytest.raises(ValueError, match="Invalid format"):
+        Importer(vault).run(io.StringIO(rows), "xml")
+
+
+def test_import_journal_bounded(vault: StercesDatabase) -> None:
+    """Test the pending changes never outgrow a checkpoint."""
+    journal: list[int] = []
+    rows = "\n".join(json.dumps({"path": "/j/e{0}".format(idx)}) for idx in range(10))
+    importer = Importer(
+        vault,
+        checkpoint=3,
+        progress=lambda _: journal.append(len(vault._journal)),
+        every=1,
+    )
+    assert importer.run(io.StringIO(rows), "jsonl").added == 10
+    assert max(journal) == 3
+    assert journal[-1] == 0
+    with pytest.raises(ValueError, match="Invalid checkpoint 0"):
+        Importer(vault, checkpoint=0)
@@ -0,0 +1,178 @@
+"""Tests module test_index for sterces library."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from sterces.constants import ADD, REMOVE
+from sterces.db import StercesDatabase
+from sterces.index import AttributeIndex, PathIndex, url_host
+
+
+def test_index_matches_xpath(vault: StercesDatabase) -> None:
+    """Test the path index resolves the same objects as XPath."""
+    vault.store("/infra/db/primary", None, ["prod"], password="s3cret")
+    vault.store("/infra/db/replica", None, None)
+    vault.store("/infra/web", None, None)
+    vault.group("/empty/leaf", ADD)
+    for key in vault._index.entries:
+        assert vault.kpo.find_entries(path=list(key)) == vault._index.entry(key)
+    for group_key in vault._index.groups:
+        assert vault.kpo.find_groups(path=list(group_key)) == vault._index.group(
+            group_key
+        )
+    rebuilt = PathIndex()
+    rebuilt.build(vault.kpo)
+    assert rebuilt.entries.keys() == vault._index.entries.keys()
+    assert rebuilt.groups.keys() == vault._index.groups.keys()
+
+
+def test_index_follows_mutations(vault: StercesDatabase) -> None:
+    """Test the path index is kept up to date by update, remove and group."""
+    vault.store("/infra/db/primary", None, None, password="s3cret")
+    vault.update("/infra/db/primary", title="main")
+    assert vault.lookup("/infra/db/primary", "password") is None
+    assert vault.lookup("/infra/db/main", "password") == "s3cret"
+    vault.remove("/infra/db/main")
+    assert ("infra", "db", "main") not in vault._index.entries
+    vault.group("/infra", REMOVE)
+    assert ("infra", "db") not in vault._index.groups
+    assert list(vault._index.groups) == [()]
+
+
+def test_index_mismatch_detected(vault: StercesDatabase) -> None:
+    """Test check_index reports an index that disagrees with XPath."""
+    vault.store("/stale", None, None)
+    vault._index.entries.clear()
+    with pytest.raises(ValueError, match="Index mismatch"):
+        vault.lookup("/stale", "username")
+
+
+def test_ensure_group_uses_index(
+    vault: StercesDatabase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test deep group creation and reuse never query the XML tree."""
+    monkeypatch.setattr(vault, "_check_index", False)
+    calls: list[object] = []
+    monkeypatch.setattr(vault.kpo, "find_groups", lambda **kw: calls.append(kw))
+    deep = "/".join("level{0}".format(level) for level in range(10))
+    with vault.transaction():
+        vault.store("/{0}/first".format(deep), None, None)
+        vault.store("/{0}/second".format(deep), None, None)
+        vault.store("/level0/level1/side/third", None, None)
+    assert not calls
+    assert len(vault._index.groups) == 12
+    vault.group("/level0/level1", REMOVE)
+    assert ("level0", "level1") not in vault._index.groups
+    vault.store("/level0/level1/again", None, None)
+    assert not calls
+
+
+def test_ensure_group_empty_index(
+    vault: StercesDatabase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test group creation falls back to the root group on an empty index."""
+    monkeypatch.setattr(vault, "_check_index", False)
+    vault._index.groups.clear()
+    assert vault._ensure_group(["fresh"]).name == "fresh"
+    vault._kpobj = None
+    with pytest.raises(ValueError, match="_kpobj is None"):
+        vault._ensure_group(["other"])
+
+
+def _brute_force(vault: StercesDatabase, tag: str, host: str) -> list[str]:
+    return sorted(
+        "/{0}".format("/".join(entry.path))
+        for entry in vault.kpo.entries
+        if tag in entry.tags and url_host(entry.url) == host
+    )
+
+
+def test_find_queries(vault: StercesDatabase) -> None:
+    """Test find intersects tag, username and URL host postings."""
+    with vault.transaction():
+        vault.store(
+            "/infra/db/primary", None, ["prod", "db"], url="https://DB.example.com/x"
+        )
+        vault.store(
+            "/infra/db/replica", None, ["prod", "db"], url="db.example.com:5432"
+        )
+        vault.store("/infra/web", None, ["prod", "web"], username="www")
+        vault.store("/lab/db", None, ["dev", "db"], url="https://db.example.com")
+    assert vault.find(tags="prod,db") == ["/infra/db/primary", "/infra/db/replica"]
+    assert vault.find(tags=["db"], url_host="db.example.com") == [
+        "/infra/db/primary",
+        "/infra/db/replica",
+        "/lab/db",
+    ]
+    assert vault.find(tags=["db"], group_prefix="/lab") == ["/lab/db"]
+    assert vault.find(username="www") == ["/infra/web"]
+    assert vault.find(tags=["prod"], username="nobody") == []
+    assert vault.find(group_prefix="/infra/db") == [
+        "/infra/db/primary",
+        "/infra/db/replica",
+    ]
+    assert vault.find(group_prefix="/missing") == []
+    assert vault.find(tags="db", url_host="db.example.com") == _brute_force(
+        vault, "db", "db.example.com"
+    )
+
+
+def test_find_follows_mutations(vault: StercesDatabase) -> None:
+    """Test the attribute indexes are kept up to date by every mutation."""
+    vault.store("/infra/db", None, ["prod"], url="https://db.example.com")
+    vault.store("/infra/cache", None, ["prod"])
+    vault.update("/infra/db", tags="dev", url="https://db2.example.com")
+    assert vault.find(tags="prod") == ["/infra/cache"]
+    assert vault.find(tags="dev", url_host="db2.example.com") == ["/infra/db"]
+    assert vault.find(url_host="db.example.com") == []
+    vault.update("/infra/db", title="primary", username="admin")
+    assert vault.find(username="admin") == ["/infra/primary"]
+    vault.remove("/infra/cache")
+    assert vault.find(tags="prod") == []
+    with pytest.raises(RuntimeError):
+        with vault.transaction():
+            vault.group("/infra", REMOVE)
+            assert vault.find(username="admin") == []
+            raise RuntimeError("rollback")
+    assert vault.find(username="admin") == ["/infra/primary"]
+    vault.group("/infra", REMOVE)
+    assert vault.find(tags="dev") == []
+    assert not vault._attrs._terms
+
+
+def test_find_empty_username(vault: StercesDatabase) -> None:
+    """Test an empty username is indexed and forgotten like any other."""
+    vault.store("/blank", None, None, username="")
+    assert vault.find(username="") == ["/blank"]
+    vault.update("/blank", username="set")
+    assert vault.find(username="") == []
+    assert "" not in vault._attrs.usernames
+    assert vault.find(username="set") == ["/blank"]
+
+
+def test_expiring(vault: StercesDatabase) -> None:
+    """Test expiring answers range queries from the expiry index."""
+    now = datetime.now(timezone.utc)
+    with vault.transaction():
+        vault.store("/rotate/soon", now + timedelta(days=1), None)
+        vault.store("/rotate/later", now + timedelta(days=40), None)
+        vault.store("/rotate/week", now + timedelta(days=5), None)
+        vault.store("/rotate/past", now - timedelta(days=1), None)
+        vault.store("/rotate/never", None, None)
+    week = timedelta(days=7)
+    assert [found["path"] for found in vault.expiring(week)] == [
+        "/rotate/soon",
+        "/rotate/week",
+    ]
+    assert vault.expiring(week, include_expired=True)[0]["path"] == "/rotate/past"
+    in_three_days = (now + timedelta(days=3)).strftime("%Y-%m-%d %H:%M:%S+00:00")
+    vault.update("/rotate/later", expires=in_three_days)
+    vault.update("/rotate/soon", expires=None)
+    vault.remove("/rotate/week")
+    found = vault.expiring(week)
+    assert [item["path"] for item in found] == ["/rotate/later"]
+    assert found[0]["expiry"] == vault.lookup("/rotate/later", "expiry")
+    rebuilt = AttributeIndex()
+    rebuilt.build(vault.kpo)
+    assert rebuilt.expiry_times == vault._attrs.expiry_times
@@ -0,0 +1,37 @@
+"""Tests module test_instrument for sterces library."""
+
+from sterces.db import PASSWORD, StercesDatabase
+from sterces.instrument import NULL_SPAN, Instrument, span_hook
+from tests.conftest import OpenVault
+
+
+def test_instrument_disabled() -> None:
+    """Test a disabled instrument hands out the shared no-op span."""
+    instrument = Instrument()
+    assert instrument.span("save") is NULL_SPAN
+    with instrument.span("save"):
+        pass  # noqa: WPS420
+    assert instrument.stats() == {}
+
+
+def test_instrument_stats(open_vault: OpenVault) -> None:
+    """Test the database records spans of its hot paths."""
+    database = open_vault(instrument=True)
+    database.store("/infra/db", None, None, password="s3cret")
+    assert database.lookup("/infra/db", PASSWORD) == "s3cret"
+    stats = database.stats()
+    for name in ("pre_flight", "initialize_kpdb", "find_entry", "save"):
+        assert stats[name].calls >= 1
+    assert stats["save"].max <= stats["save"].total
+    assert "find_entries" not in stats
+
+
+def test_span_hook(vault: StercesDatabase) -> None:
+    """Test an installed hook receives spans of an uninstrumented database."""
+    seen: list[tuple[str, float]] = []
+    with span_hook(lambda name, duration: seen.append((name, duration))):
+        vault.lookup("/missing", PASSWORD)
+    vault.lookup("/missing", PASSWORD)
+    names = [name for name, _ in seen]
+    assert names == ["find_entry", "find_entries"]
+    assert vault.stats() == {}
@@ -0,0 +1,57 @@
+"""Tests module test_kdf for sterces library."""
+
+import pytest
+
+from sterces.kdf import (
+    AESKDF,
+    ARGON2D,
+    ARGON2ID,
+    MIN_MEMORY,
+    KdfParams,
+    calibrate,
+    read_params,
+    write_params,
+)
+from tests.conftest import OpenVault
+
+
+def test_calibrate() -> None:
+    """Test calibration stays within the memory cap."""
+    params = calibrate(0.01, MIN_MEMORY * 2)
+    assert params.kdf == ARGON2ID
+    assert MIN_MEMORY <= params.memory <= MIN_MEMORY * 2
+    assert params.iterations >= 1
+    assert calibrate(0.01, kdf=AESKDF).iterations >= 10000
+    with pytest.raises(ValueError, match="Invalid kdf"):
+        calibrate(kdf="scrypt")
+    with pytest.raises(ValueError, match="Invalid memory cap"):
+        calibrate(0.01, MIN_MEMORY - 1024)
+
+
+def test_create_calibrated(open_vault: OpenVault) -> None:
+    """Test a new database gets the calibrated parameters."""
+    database = open_vault(quiet=True, kdf_target=0.01, kdf_memory=MIN_MEMORY)
+    params = read_params(database.kpo)
+    assert params.kdf == ARGON2ID
+    assert params.memory == MIN_MEMORY
+    with pytest.raises(ValueError, match="Cannot switch"):
+        write_params(database.kpo, KdfParams(AESKDF, 10000))
+
+
+@pytest.mark.parametrize("tf_cache", [False, True])
+def test_rekey(open_vault: OpenVault, tf_cache: bool) -> None:
+    """Test rekey applies new parameters and keeps the database usable."""
+    database = open_vault(quiet=True, tf_cache=tf_cache)
+    database.store("/svc/db", None, None, password="dbpass")
+    report = database.rekey(0.01, MIN_MEMORY)
+    assert report.old_params == KdfParams(ARGON2D, 14, 64 * 2**20, 2)
+    assert report.new_params[::2] == (ARGON2D, MIN_MEMORY)
+    assert report.new_timings.open < report.old_timings.open
+    database.store("/svc/api", None, None, password="tok3n")
+    reopened = open_vault(quiet=True, tf_cache=tf_cache)
+    assert read_params(reopened.kpo) == report.new_params
+    assert reopened.lookup("/svc/db", "password") == "dbpass"
+    assert reopened.lookup("/svc/api", "password") == "tok3n"
+    with pytest.raises(ValueError, match="transaction"):
+        with reopened.transaction():
+            reopened.rekey(0.01, MIN_MEMORY)
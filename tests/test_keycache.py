@@ -0,0 +1,68 @@
+"""Tests module test_keycache for sterces library."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from sterces.keycache import KeyCache, kdf_fingerprint
+from tests.conftest import OpenVault
+
+
+def _no_kdf(*args: object, **kwargs: object) -> bytes:
+    raise AssertionError("key derivation was not skipped")
+
+
+@pytest.fixture
+def cache_fn(tmp_path: Path, open_vault: OpenVault) -> Path:
+    """Create a database and open it once to fill the key cache."""
+    open_vault(tf_cache=True)
+    open_vault(tf_cache=True).store("/cached", None, None, password="fast")
+    return Path(KeyCache.default_fn(str(tmp_path / "db.kdbx")))
+
+
+def test_keycache_skips_kdf(
+    cache_fn: Path, open_vault: OpenVault, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test later opens and saves reuse the cached transformed key."""
+    assert oct(cache_fn.stat().st_mode & 0o777) == "0o600"
+    monkeypatch.setattr("argon2.low_level.hash_secret_raw", _no_kdf)
+    db = open_vault(tf_cache=True)
+    assert db.lookup("/cached", "password") == "fast"
+    db.update("/cached", password="faster")
+    assert open_vault(tf_cache=True).lookup("/cached", "password") == "faster"
+
+
+def test_keycache_discarded_on_kdf_change(
+    cache_fn: Path, tmp_path: Path, open_vault: OpenVault
+) -> None:
+    """Test a cache whose KDF fingerprint no longer matches is dropped."""
+    cached = json.loads(cache_fn.read_text())
+    assert "abc1234567890def" not in cache_fn.read_text()
+    assert set(cached) == {"kdf", "binding", "key"}
+    assert cached["kdf"] == kdf_fingerprint(str(tmp_path / "db.kdbx"))
+    cached["kdf"] = "0" * 64
+    cache_fn.write_text(json.dumps(cached))
+    assert open_vault(tf_cache=True).lookup("/cached", "password") == "fast"
+    assert json.loads(cache_fn.read_text())["kdf"] != cached["kdf"]
+
+
+def test_keycache_wrong_key_falls_back(
+    cache_fn: Path, tmp_path: Path, open_vault: OpenVault
+) -> None:
+    """Test a rejected cached key falls back to the full key derivation."""
+    cache = KeyCache(str(cache_fn))
+    db_fn = str(tmp_path / "db.kdbx")
+    cache.save(db_fn, b"\1" * 32, None)
+    db = open_vault(tf_cache=True)
+    assert db.lookup("/cached", "password") == "fast"
+    assert cache.load(db_fn, None) == db.kpo.transformed_key
+    assert cache.load(db_fn, str(tmp_path / "other.key")) is None
+    assert not cache_fn.exists()
+
+
+def test_keycache_unsafe_mode(cache_fn: Path, open_vault: OpenVault) -> None:
+    """Test a cache readable by others is never used."""
+    cache_fn.chmod(0o644)
+    open_vault(tf_cache=True)
+    assert oct(cache_fn.stat().st_mode & 0o777) == "0o600"
@@ -0,0 +1,39 @@
+"""Tests module test_otp for sterces library."""
+
+from datetime import datetime, timezone
+
+import pyotp
+
+from sterces.db import ENTRY_NO_OTP, ENTRY_NOT_EXIST, StercesDatabase
+
+URI_UNO = pyotp.TOTP(pyotp.random_base32()).provisioning_uri("uno")
+URI_DOS = pyotp.TOTP(pyotp.random_base32(), digits=8).provisioning_uri("dos")
+
+
+def _totp(uri: str) -> pyotp.TOTP:
+    otp = pyotp.parse_uri(uri)
+    assert isinstance(otp, pyotp.TOTP)
+    return otp
+
+
+def test_otp_many(vault: StercesDatabase) -> None:
+    """Test batch codes are computed from cached TOTP objects."""
+    with vault.transaction():
+        vault.store("/svc/uno", None, None, otp=URI_UNO)
+        vault.store("/svc/dos", None, None, otp=URI_DOS)
+        vault.store("/svc/tres", None, None)
+        vault.store("/svc/hotp", None, None, otp="otpauth://hotp/x?secret=ABCD")
+    when = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    paths = ["/svc/uno", "/svc/dos", "/svc/tres", "/svc/hotp", "/svc/none"]
+    results = vault.otp_many(paths, when)
+    assert results["/svc/uno"].value == _totp(URI_UNO).at(when)
+    assert results["/svc/dos"].value == _totp(URI_DOS).at(when)
+    assert len(str(results["/svc/dos"].value)) == 8
+    assert results["/svc/tres"].error == ENTRY_NO_OTP.format("/svc/tres")
+    assert "Not a TOTP" in str(results["/svc/hotp"].error)
+    assert results["/svc/none"].error == ENTRY_NOT_EXIST.format("/svc/none")
+    assert len(vault._otp) == 2  # noqa: WPS437
+    assert vault.otp_now("/svc/uno") == _totp(URI_UNO).now()
+    vault.update("/svc/uno", otp=URI_DOS)
+    assert len(vault._otp) == 1  # noqa: WPS437
+    assert vault.otp_many(["/svc/uno"], when)["/svc/uno"] == results["/svc/dos"]
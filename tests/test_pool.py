@@ -0,0 +1,42 @@
+"""Tests module test_pool for sterces library."""
+
+from pathlib import Path
+
+import pytest
+
+from sterces.db import PASSWORD, USERNAME, StercesDatabase
+from sterces.pool import DatabasePool, VaultConfig, derive_transformed_key
+
+
+def _config(tmp_path: Path, name: str) -> VaultConfig:
+    ppf = tmp_path / ".{0}".format(name)
+    ppf.write_text("{0}-passphrase\n".format(name))
+    return {"db_fn": str(tmp_path / "{0}.kdbx".format(name)), "pwd_fn": str(ppf)}
+
+
+def test_pool_precedence(tmp_path: Path) -> None:
+    """Test lookups follow the configured order and handles are cached."""
+    configs = {name: _config(tmp_path, name) for name in ("prod", "dev")}
+    prod = StercesDatabase(**configs["prod"])
+    prod.store("/shared/db", None, None, username="prod-user")
+    dev = StercesDatabase(**configs["dev"])
+    with dev.transaction():
+        dev.store("/shared/db", None, None, username="dev-user")
+        dev.store("/dev/only", None, None, password="d3v")
+    tf_key = derive_transformed_key(
+        str(configs["dev"]["db_fn"]), str(configs["dev"]["pwd_fn"]), None
+    )
+    pool = DatabasePool(configs)
+    opened = pool.open()
+    assert list(opened) == ["prod", "dev"]
+    assert opened["dev"].kpo.transformed_key == tf_key
+    assert pool.get("prod") is opened["prod"]
+    assert pool.lookup("/shared/db", USERNAME) == "prod-user"
+    assert pool.lookup("/dev/only", PASSWORD) == "d3v"
+    assert pool.lookup("/nowhere", PASSWORD) is None
+    assert pool.locate("/dev/only") == "dev"
+    assert pool.locate("/nowhere") is None
+    pool.close("prod")
+    assert pool.get("prod") is not opened["prod"]
+    with pytest.raises(ValueError, match="Unknown database"):
+        pool.get("stage")
@@ -0,0 +1,126 @@
+"""Tests module test_render for sterces library."""
+
+import io
+import os
+import sys
+from pathlib import Path
+from typing import NoReturn
+
+import pytest
+
+from sterces.db import StercesDatabase
+from sterces.render import exec_with_env, main, render, resolve_env
+
+TEMPLATE = (
+    "user: {{ /svc/db#username }}\n"
+    "password: {{/svc/db}}\n"
+    "token: {{ /svc/api # password }} {{ not a reference }}\n"
+    "url: {{ /svc/api#url }}\n"
+) * 3
+RENDERED = (
+    "user: dbuser\n"
+    "password: dbpass\n"
+    "token: tok3n {{ not a reference }}\n"
+    "url: \n"
+) * 3
+
+ExecCall = tuple[str, list[str], dict[str, str]]
+
+
+@pytest.fixture
+def secrets(vault: StercesDatabase) -> StercesDatabase:
+    """Create a vault with two entries."""
+    with vault.transaction():
+        vault.store("/svc/db", None, None, username="dbuser", password="dbpass")
+        vault.store("/svc/api", None, None, password="tok3n")
+    return vault
+
+
+@pytest.mark.parametrize("chunk_size", [3, 7, 64, 65536])
+def test_render(secrets: StercesDatabase, chunk_size: int) -> None:
+    """Test placeholders are replaced, whatever the chunk boundaries."""
+    sink = io.StringIO()
+    assert render(secrets, io.StringIO(TEMPLATE), sink, chunk_size) == 4
+    assert sink.getvalue() == RENDERED
+
+
+def test_render_unresolved(secrets: StercesDatabase) -> None:
+    """Test nothing is written when a reference cannot be resolved."""
+    sink = io.StringIO()
+    with pytest.raises(ValueError, match="Entry /svc/missing does not exist"):
+        render(secrets, io.StringIO(TEMPLATE + "{{ /svc/missing }}"), sink)
+    assert not sink.getvalue()
+
+
+def test_exec_with_env(
+    secrets: StercesDatabase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the command runs with the resolved secrets in its environment."""
+    mapping = {"DB_USER": "/svc/db#username", "API_TOKEN": "/svc/api"}
+    assert resolve_env(secrets, mapping) == {
+        "DB_USER": "dbuser",
+        "API_TOKEN": "tok3n",
+    }
+    calls = _fake_exec(monkeypatch)
+    with pytest.raises(SystemExit):
+        exec_with_env(secrets, mapping, ["env"])
+    assert calls[0][:2] == ("env", ["env"])
+    assert calls[0][2]["API_TOKEN"] == "tok3n"
+    assert "PATH" in calls[0][2]
+
+
+def test_main_template(
+    secrets: StercesDatabase,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test main renders a template file to a file and stdin to stdout."""
+    template = tmp_path / "template.txt"
+    template.write_text(TEMPLATE)
+    output = tmp_path / "output.txt"
+    assert main(_db_args(tmp_path) + ["-t", str(template), "-o", str(output)]) == 0
+    assert output.read_text() == RENDERED
+    monkeypatch.setattr(sys, "stdin", io.StringIO(TEMPLATE))
+    assert main(_db_args(tmp_path) + ["-t", "-"]) == 0
+    assert capsys.readouterr().out == RENDERED
+
+
+def test_main_env(
+    secrets: StercesDatabase, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test main runs the command after -- with the -e variables."""
+    calls = _fake_exec(monkeypatch)
+    argv = _db_args(tmp_path) + ["-e", "DB_USER=/svc/db#username"]
+    with pytest.raises(SystemExit):
+        main(argv + ["--", "env", "-0"])
+    assert calls[0][:2] == ("env", ["env", "-0"])
+    assert calls[0][2]["DB_USER"] == "dbuser"
+
+
+def test_main_env_without_command(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test -e without a command is an error instead of doing nothing."""
+    argv = _db_args(tmp_path) + ["-e", "DB_USER=/svc/db#username"]
+    with pytest.raises(SystemExit, match="2"):
+        main(argv)
+    assert "-e/--env needs a command" in capsys.readouterr().err
+    assert not (tmp_path / "db.kdbx").exists()
+
+
+def _db_args(path: Path) -> list[str]:
+    return ["--db", str(path / "db.kdbx"), "--pwd", str(path / ".ssapeek")]
+
+
+def _fake_exec(monkeypatch: pytest.MonkeyPatch) -> list[ExecCall]:
+    calls: list[ExecCall] = []
+
+    def fake_execvpe(  # noqa: WPS430
+        file: str, args: list[str], env: dict[str, str]
+    ) -> NoReturn:
+        calls.append((file, args, env))
+        raise SystemExit(0)
+
+    monkeypatch.setattr(os, "execvpe", fake_execvpe)
+    return calls
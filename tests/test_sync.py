@@ -0,0 +1,109 @@
+"""Tests module test_sync for sterces library."""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from pykeepass.entry import Entry  # type: ignore[import-untyped]
+
+from sterces.db import StercesDatabase
+from sterces.sync import DiffResult
+from tests.conftest import CountSaves, OpenVault
+
+PASSWORD = "password"
+
+
+def _entry(database: StercesDatabase, path: str) -> Entry:
+    entry = database._find_entry(path)  # noqa: WPS437
+    assert entry is not None
+    return entry
+
+
+@pytest.fixture
+def pair(
+    vault: StercesDatabase, tmp_path: Path
+) -> tuple[StercesDatabase, StercesDatabase]:
+    """Create two vaults sharing one entry, the other one newer."""
+    other_dir = tmp_path / "other"
+    other_dir.mkdir(mode=0o700)
+    ppf = other_dir / ".ssapeek"
+    ppf.write_text("fed0987654321cba\n")
+    other = StercesDatabase(db_fn=str(other_dir / "db.kdbx"), pwd_fn=str(ppf))
+    with vault.transaction():
+        vault.store("/svc/shared", None, None, password="old")
+        vault.store("/svc/mine", None, None, password="mine")
+    with other.transaction():
+        other.store("/svc/shared", None, None, password="new")
+        other.store("/deep/er/theirs", None, None, password="theirs")
+        _entry(other, "/svc/shared").mtime = datetime.now(timezone.utc) + timedelta(
+            hours=1
+        )
+    return vault, other
+
+
+def test_diff(pair: tuple[StercesDatabase, StercesDatabase]) -> None:
+    """Test diff reports the paths whose fingerprints differ."""
+    vault, other = pair
+    assert vault.diff(other) == DiffResult(
+        ["/deep/er/theirs"], ["/svc/mine"], ["/svc/shared"]
+    )
+    assert vault.diff(vault) == DiffResult([], [], [])
+
+
+@pytest.mark.parametrize(
+    ("strategy", "prune", "shared", "changed"),
+    [
+        ("newer", False, "new", ["/svc/shared"]),
+        ("theirs", True, "new", ["/svc/shared"]),
+        ("ours", False, "old", []),
+    ],
+)
+def test_sync(
+    pair: tuple[StercesDatabase, StercesDatabase],
+    count_saves: CountSaves,
+    open_vault: OpenVault,
+    strategy: str,
+    prune: bool,
+    shared: str,
+    changed: list[str],
+) -> None:
+    """Test sync copies what the strategy selects and saves once."""
+    vault, other = pair
+    saves = count_saves(vault)
+    removed = ["/svc/mine"] if prune else []
+    assert vault.sync(other, strategy, prune) == DiffResult(
+        ["/deep/er/theirs"], removed, changed
+    )
+    assert len(saves) == 1
+    assert vault.lookup("/svc/shared", PASSWORD) == shared
+    assert vault.lookup("/deep/er/theirs", PASSWORD) == "theirs"
+    assert (vault.lookup("/svc/mine", PASSWORD) is None) is prune
+    assert "/deep/er/theirs" in vault.find(username="undef")
+    assert open_vault().diff(vault) == DiffResult([], [], [])
+
+
+def test_sync_uuid_clash(pair: tuple[StercesDatabase, StercesDatabase]) -> None:
+    """Test a copied entry gets a new UUID when another entry has its UUID."""
+    vault, other = pair
+    mine = _entry(vault, "/svc/mine")
+    _entry(other, "/deep/er/theirs").uuid = mine.uuid
+    vault.sync(other, "ours")
+    assert _entry(vault, "/deep/er/theirs").uuid != mine.uuid
+
+
+def test_sync_invalid(pair: tuple[StercesDatabase, StercesDatabase]) -> None:
+    """Test sync rejects an unknown strategy."""
+    vault, other = pair
+    with pytest.raises(ValueError, match="Invalid strategy"):
+        vault.sync(other, "mine")
+
+
+def test_sync_closed(pair: tuple[StercesDatabase, StercesDatabase]) -> None:
+    """Test a closed database is never mistaken for an empty one."""
+    vault, other = pair
+    other.close()
+    with pytest.raises(ValueError, match="closed database"):
+        vault.sync(other, prune=True)
+    with pytest.raises(ValueError, match="closed database"):
+        vault.diff(other)
+    assert vault.lookup("/svc/mine", PASSWORD) == "mine"
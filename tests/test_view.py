@@ -0,0 +1,52 @@
+"""Tests module test_view for sterces library."""
+
+import io
+from datetime import datetime, timedelta, timezone
+
+from sterces.db import StercesDatabase
+from sterces.index import entry_elements
+from sterces.view import EntryView, write_reprs
+
+
+def test_entry_view_matches_pykeepass(vault: StercesDatabase) -> None:
+    """Test an EntryView reads the same values as the pykeepass properties."""
+    expiry = datetime.now(timezone.utc) + timedelta(days=3)
+    with vault.transaction():
+        vault.store(
+            "/infra/db/primary",
+            expiry,
+            ["prod", "db"],
+            username="admin",
+            password="s3cret",
+            url="https://db.example.com",
+            notes="primary database",
+            otp="otpauth://totp/db?secret=JBSWY3DPEHPK3PXP",
+        )
+        vault.store("/bare", None, None)
+    for entry in vault.kpo.entries:
+        view = EntryView(entry._element, vault.kpo)
+        assert view.path == entry.path
+        assert view.title == entry.title
+        assert view.username == entry.username
+        assert view.password == entry.password
+        assert view.url == entry.url
+        assert view.notes == entry.notes
+        assert view.otp == entry.otp
+        path = "/{0}".format("/".join(entry.path))
+        assert view.expiry == vault.lookup(path, "expiry")
+
+
+def test_entry_view_dict(vault: StercesDatabase) -> None:
+    """Test masking keeps the length and otp has a key of its own."""
+    vault.store(
+        "/svc", None, ["a"], password="x" * 40, notes="n", otp="otpauth://totp/x"
+    )
+    element = next(entry_elements(vault.kpo.root_group._element))
+    ed = EntryView(element, vault.kpo).to_dict()
+    assert ed["password"] == "*" * 40
+    assert ed["notes"] == "n"
+    assert ed["otp"] == "otpauth://totp/x"
+    assert EntryView(element, vault.kpo).to_dict(mask=False)["password"] == "x" * 40
+    out = io.StringIO()
+    assert write_reprs(out, [EntryView(element, vault.kpo)] * 2) == 2
+    assert out.getvalue().count("\n") == 2